@@ -1,12 +1,9 @@
 import streamlit as st
 import os
-import shutil
-import tempfile
+import queue
 import time
-from autosub_mac.transcriber import WhisperTranscriber
-from autosub_mac.audio import extract_audio, split_audio
-from autosub_mac.translator import SubtitleTranslator
-from autosub_mac.utils import write_srt
+from autosub_mac.webjobs import JobExecutor, WorkDirPool, SubtitlePager, save_upload, cli_task, service_task, main_command
+from autosub_mac.models import QUANTIZATIONS, ENGLISH_ONLY_SIZES, resolve_model, ensure_model, default_models_dir
 import traceback
 
 st.set_page_config(
@@ -24,15 +21,37 @@ with st.sidebar:
     
     model_size = st.selectbox(
         "Whisper 模型大小",
-        options=["tiny", "base", "small", "medium", "large"],
+        options=list(QUANTIZATIONS),
         index=1,
         help="越大越准，但速度越慢。"
     )
+    english_only = st.checkbox(
+        "仅英语模型 (.en)",
+        value=False,
+        disabled=model_size not in ENGLISH_ONLY_SIZES,
+        help="视频为英语时更快也更准。"
+    )
+    model_quant = st.selectbox(
+        "量化 (Quantization)",
+        options=["无"] + list(QUANTIZATIONS[model_size]),
+        index=0,
+        help="量化模型 (q5_0/q5_1/q8_0) 体积更小，在纯 CPU 上显著更快，精度略有下降。"
+    )
+    model_name = resolve_model(
+        f"{model_size}.en" if english_only and model_size in ENGLISH_ONLY_SIZES else model_size,
+        None if model_quant == "无" else model_quant,
+    )
+    
+    source_lang = st.text_input(
+        "视频语言 (Source Language)",
+        value="auto",
+        help="视频中说话的语言，例如 en、ja。auto 表示只在音频中部取样检测一次，并固定用于所有分段和翻译；与目标语言相同时不再翻译。"
+    )
     
     target_lang = st.text_input(
         "目标语言 (Target Language)",
         value="zh-CN",
-        help="例如: zh-CN (简体中文), en (英语), es (西班牙语)。留空则不翻译。"
+        help="例如: zh-CN (简体中文), en (英语), es (西班牙语)。多个语言用逗号分隔 (zh-CN,en,ja)。留空则不翻译。"
     )
     
     trans_provider = st.selectbox(
@@ -57,29 +76,109 @@ with st.sidebar:
         help="0 表示不分段。分段处理可以减少长视频的内存压力。"
     )
     
-    # CoreML/Metal has crash issues with multi-threading.
-    # We disable this option for now to ensure stability.
-    st.info("ℹ️ 多线程已禁用 (CoreML 稳定性优化)")
+    # Sharing one model across threads crashes CoreML/Metal, so parallel
+    # transcription runs in separate processes, each with its own model.
     threads = st.number_input(
-        "并行线程数",
+        "并行 worker 数",
         min_value=1,
-        max_value=1,
+        max_value=os.cpu_count() or 1,
         value=1,
-        disabled=True,
-        help="因 CoreML 后端稳定性原因，暂时禁用多线程并行。但不用担心，Mac 本身的 GPU 加速已经非常快了！"
+        help="大于 1 时使用多进程并行转录（每个进程独立加载模型，CPU 核心平均分配）。需要开启分段。"
+    )
+    
+    service_url = st.text_input(
+        "常驻服务地址 (可选)",
+        value="",
+        placeholder="http://127.0.0.1:8765",
+        help="填写后任务会提交到 `python -m autosub_mac.service` 启动的常驻服务，模型常驻内存，无需每次重新加载。留空则每个任务单独启动子进程。"
     )
     
     st.divider()
-    if st.button("🗑️ 清除模型缓存 (修复启动失败)"):
-        cache_dir = os.path.expanduser("~/Library/Application Support/pywhispercpp/models")
-        if os.path.exists(cache_dir):
-            try:
-                shutil.rmtree(cache_dir)
-                st.success(f"已清理缓存: {cache_dir}。请重新运行任务，程序将自动重新下载/编译模型。")
-            except Exception as e:
-                st.error(f"清理失败: {e}")
-        else:
-            st.warning("缓存目录不存在，无需清理。")
+    if st.button("🩺 校验当前模型 (修复启动失败)"):
+        # Re-hash the selected model and re-download it only if it is corrupt,
+        # instead of wiping every cached model
+        try:
+            with st.spinner(f"正在校验 {model_name}..."):
+                path = ensure_model(model_name, default_models_dir(), rehash=True)
+            st.success(f"模型完好: {path}")
+        except Exception as e:
+            st.error(f"校验/下载失败: {e}")
+
+# --- Progress events ---
+STAGE_LABELS = {
+    "extract": "🎵 提取音频",
+    "transcribe": "🎙️ 转录",
+    "write": "📝 写入字幕",
+}
+
+def describe_progress(event):
+    """(fraction, label) for one progress event from autosub_mac.main --progress-fd."""
+    stage = event.get("stage") or ""
+    label = STAGE_LABELS.get(stage, f"🌍 翻译 ({stage.split(':', 1)[-1]})" if stage.startswith("translate:") else stage)
+    if event["event"] == "done":
+        return 1.0, "✅ 完成"
+    if event["event"] == "error":
+        return 1.0, f"❌ {event.get('message', '')}"
+    if event["event"] == "stage_start":
+        return 0.0, f"{label}..."
+    if event["event"] == "stage_end":
+        return 1.0, f"{label} ✓"
+
+    done, total = event.get("done") or 0, event.get("total")
+    fraction = min(1.0, done / total) if total else 0.0
+    text = f"{label}: {done}/{total}" if total else f"{label}: {done}"
+    if event.get("eta_sec") is not None:
+        text += f" · 剩余约 {event['eta_sec']:.0f}s"
+    return fraction, text
+
+# --- Background jobs ---
+# Jobs run on a bounded pool shared by every session of this app process, each in its own
+# work directory; finished directories are evicted by age and total size.
+MAX_CONCURRENT_JOBS = int(os.environ.get("AUTOSUB_WEB_WORKERS", "2"))
+MAX_QUEUED_JOBS = int(os.environ.get("AUTOSUB_WEB_QUEUE", "8"))
+WORK_DIR_MAX_GB = float(os.environ.get("AUTOSUB_WEB_MAX_GB", "20"))
+WORK_DIR_MAX_AGE_HOURS = float(os.environ.get("AUTOSUB_WEB_MAX_AGE_HOURS", "6"))
+POLL_INTERVAL = 1.0  # seconds between status refreshes while a job runs
+PREVIEW_PAGE_SIZE = 50  # subtitle cues per preview page
+
+@st.cache_resource
+def get_executor() -> JobExecutor:
+    workdirs = WorkDirPool(max_bytes=int(WORK_DIR_MAX_GB * (1 << 30)), max_age_sec=WORK_DIR_MAX_AGE_HOURS * 3600)
+    return JobExecutor(workdirs, max_workers=MAX_CONCURRENT_JOBS, queue_size=MAX_QUEUED_JOBS)
+
+@st.cache_resource(max_entries=32)
+def get_pager(path: str, mtime: float) -> SubtitlePager:
+    # mtime is part of the key so a rewritten file is indexed again
+    return SubtitlePager(path, page_size=PREVIEW_PAGE_SIZE)
+
+def show_results(job):
+    output_srt_paths = sorted(p for p in job["outputs"] if p.endswith(".srt") and os.path.exists(p))
+    if not output_srt_paths:
+        st.error("❌ 未找到生成的字幕文件。")
+        return
+
+    srt_path = st.selectbox("字幕文件", output_srt_paths, format_func=os.path.basename, key=f"file_{job['id']}")
+    srt_name = os.path.basename(srt_path)
+    # Only the selected file is handed to the download button
+    with open(srt_path, "rb") as f:
+        st.download_button(
+            label=f"📥 下载 SRT 字幕文件 ({srt_name})",
+            data=f,
+            file_name=srt_name,
+            mime="text/plain",
+            key=f"download_{job['id']}_{srt_name}"
+        )
+
+    pager = get_pager(srt_path, os.path.getmtime(srt_path))
+    st.subheader(f"📝 字幕预览 (Preview): {srt_name}")
+    page = st.number_input(
+        f"页码 (共 {pager.pages} 页，{len(pager.offsets)} 条字幕)",
+        min_value=1,
+        max_value=pager.pages,
+        value=1,
+        key=f"page_{job['id']}_{srt_name}"
+    )
+    st.text_area("Content", value=pager.page(page - 1), height=300, key=f"preview_{job['id']}_{srt_name}_{page}")
 
 # --- Main Interface ---
 st.info("💡 请上传视频文件，或输入本地文件绝对路径。")
@@ -88,9 +187,12 @@ tab1, tab2 = st.tabs(["📂 文件上传", "📍 本地路径"])
 
 filepath = None
 upload_mode = False
+# Changing the key clears the uploader once the file is on disk, so the session stops holding it
+st.session_state.setdefault("uploader_key", 0)
 
 with tab1:
-    uploaded_file = st.file_uploader("拖拽视频文件到此处", type=["mp4", "mov", "mkv", "avi"])
+    uploaded_file = st.file_uploader("拖拽视频文件到此处", type=["mp4", "mov", "mkv", "avi"],
+                                     key=f"uploader_{st.session_state['uploader_key']}")
     if uploaded_file:
         upload_mode = True
 
@@ -101,119 +203,109 @@ with tab2:
     elif local_path:
         st.error("❌ 文件不存在")
 
-# --- Processing Logic ---
 # --- Processing Logic ---
 if st.button("🚀 开始生成字幕 (Start Processing)", type="primary"):
     if not upload_mode and not filepath:
         st.warning("⚠️ 请先提供视频文件。")
         st.stop()
-        
-    status_container = st.status("正在处理...", expanded=True)
-    log_area = status_container.empty()
-    
-    def log(msg):
-        log_area.code(msg, language="text")
-        # print(msg) 
 
-    import subprocess
-    import sys
+    executor = get_executor()
+    try:
+        job = executor.create()
+    except queue.Full:
+        st.error("⏳ 排队中的任务已满，请稍后再试。")
+        st.stop()
 
+    # Until it's queued, the job and its work directory are ours to free, whatever interrupts us
+    # (an error, or the session rerunning while an upload is saved)
+    submitted = False
     try:
-        # Prepare working file
-        work_dir = tempfile.mkdtemp()
-        
+        work_dir = job["work_dir"]
         if upload_mode:
-            video_name = uploaded_file.name
+            video_name = os.path.basename(uploaded_file.name)
             video_path = os.path.join(work_dir, video_name)
-            with open(video_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            log(f"📥 已保存上传文件: {video_path}")
+            with st.spinner("📥 正在保存上传文件..."):
+                save_upload(uploaded_file, video_path, size=uploaded_file.size)
         else:
             video_name = os.path.basename(filepath)
             video_path = filepath
-            
+
         base_name = os.path.splitext(video_name)[0]
-        
-        # Build Command
-        # python3 -m autosub_mac.main video_path --model X --lang Y --segment-duration Z
-        cmd = [
-            sys.executable, "-m", "autosub_mac.main",
-            video_path,
-            "--model", model_size,
-            "--segment-duration", str(segment_duration),
-            # Threads are hardcoded to 1 to avoid internal crashes, but we pass the arg anyway if we re-enable it later
-            "--threads", str(threads),
-            "--output", os.path.join(work_dir, f"{base_name}.srt")
-        ]
-        
-        if target_lang:
-            cmd.extend(["--lang", target_lang])
-            cmd.extend(["--provider", trans_provider])
-            if api_key:
-                cmd.extend(["--api-key", api_key])
-        else:
-            cmd.append("--no-translate")
-            
-        log(f"Running command: {' '.join(cmd)}")
-        
-        # Run Subprocess
-        status_container.write("⚙️ 执行后台任务...")
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            cwd=os.getcwd()
-        )
-        
-        # Read output real-time
-        logs = []
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
-            if line:
-                line = line.strip()
-                logs.append(line)
-                # Keep only last 10 lines for cleanliness, or accumulate all? 
-                # Let's show last few lines to avoid UI lag
-                log_text = "\n".join(logs[-15:])
-                log(log_text)
-                
-        return_code = process.poll()
-        
-        if return_code == 0:
-            status_container.update(label="✅ 处理已完成!", state="complete", expanded=False)
-            st.success(f"🎉 字幕生成成功!")
-            
-            # Find generated file
-            # We forced output path in cmd
-            output_srt_path = os.path.join(work_dir, f"{base_name}.srt")
-            
-            if os.path.exists(output_srt_path):
-                with open(output_srt_path, "r", encoding='utf-8') as f:
-                    srt_content = f.read()
-                
-                st.download_button(
-                    label="📥 下载 SRT 字幕文件",
-                    data=srt_content,
-                    file_name=f"{base_name}.srt",
-                    mime="text/plain"
-                )
-                
-                st.subheader("📝 字幕预览 (Preview)")
-                st.text_area("Content", value=srt_content, height=300)
+        output_path = os.path.join(work_dir, f"{base_name}.srt")
+
+        if service_url:
+            # Submit to the resident service: models are already loaded there
+            options = {
+                "model": model_name,
+                "segment_duration": segment_duration,
+                "threads": threads,
+                "source_lang": source_lang or "auto",
+                "output": output_path,
+            }
+            if target_lang:
+                options.update({"lang": target_lang, "provider": trans_provider, "api_key": api_key or None})
             else:
-                st.error("❌ 未找到生成的字幕文件。")
+                options["no_translate"] = True
+            task = service_task(service_url, video_path, options)
         else:
-            status_container.update(label="❌ 处理失败", state="error")
-            st.error("任务执行失败，请检查上方日志。")
-        
-        # Cleanup temp dir? 
-        # shutil.rmtree(work_dir)
-        
+            # python3 -m autosub_mac.main video_path --model X --lang Y --segment-duration Z
+            options = [
+                "--model", model_name,
+                "--segment-duration", str(segment_duration),
+                "--threads", str(threads),
+                "--source-lang", source_lang or "auto",
+                "--output", output_path,
+            ]
+            if target_lang:
+                options.extend(["--lang", target_lang])
+                options.extend(["--provider", trans_provider])
+                if api_key:
+                    options.extend(["--api-key", api_key])
+            else:
+                options.append("--no-translate")
+            task = cli_task(main_command(video_path, options))
+
+        executor.submit(job["id"], task)
+        submitted = True
+    except queue.Full:
+        st.error("⏳ 排队中的任务已满，请稍后再试。")
+        st.stop()
     except Exception as e:
-        status_container.update(label="❌ 系统错误", state="error")
         st.error(f"发生错误: {str(e)}")
         st.code(traceback.format_exc())
+        st.stop()
+    finally:
+        if not submitted:
+            executor.discard(job["id"])
+
+    st.session_state["job_id"] = job["id"]
+    if upload_mode:
+        st.session_state["uploader_key"] += 1
+    st.rerun()
+
+# --- Job status ---
+job_id = st.session_state.get("job_id")
+if job_id:
+    executor = get_executor()
+    job = executor.get(job_id)
+    if job is None:
+        st.warning("⌛ 该任务的结果已过期并被清理，请重新生成。")
+    elif job["status"] in ("created", "queued", "running"):
+        status_container = st.status("正在处理...", expanded=True)
+        if job["status"] == "running":
+            fraction, text = describe_progress(job["event"]) if job["event"] else (0.0, "准备中...")
+            status_container.progress(fraction, text=text)
+        else:
+            stats = executor.stats()
+            status_container.write(f"⏳ 排队中：{stats['running']} 个任务正在运行，{stats['queued']} 个在等待。")
+        if job["log"]:
+            status_container.code(job["log"], language="text")
+        time.sleep(POLL_INTERVAL)
+        st.rerun()
+    elif job["status"] == "failed":
+        st.status("❌ 处理失败", state="error", expanded=True).code(job["log"] or job["error"], language="text")
+        st.error(f"任务执行失败: {job['error']}")
+    else:
+        st.status("✅ 处理已完成!", state="complete", expanded=False).code(job["log"], language="text")
+        st.success(f"🎉 字幕生成成功!")
+        show_results(job)
@@ -0,0 +1,202 @@
+"""
+asyncio transport for SubtitleTranslator: many provider requests in flight at once over one
+pooled keep-alive HTTP client, paced by a token bucket, with jittered exponential backoff
+that honours Retry-After. Results are placed by index, so segment order never depends on
+which request finished first.
+"""
+import asyncio
+import email.utils
+import html
+import random
+import re
+import sys
+import time
+from typing import Callable, List, Optional
+
+import httpx
+
+from .metrics import metrics
+
+# Statuses worth retrying: rate limited, or the provider is having a bad moment
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Google's mobile page puts the translation in one of these
+_GOOGLE_RESULT = re.compile(r'<div[^>]*class="(?:t0|result-container)"[^>]*>(.*?)</div>', re.DOTALL)
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay in seconds or an HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """
+    Wait before retry number `attempt` (0-based): what the server asked for if it said,
+    otherwise "full jitter" exponential backoff, so parallel requests don't retry in lockstep.
+    """
+    if retry_after is not None:
+        return min(cap, retry_after)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class AsyncTranslationEngine:
+    """
+    Sends translation requests for one provider and language pair concurrently.
+    base_url, source and target are the provider's own values (the deep_translator
+    translator's _base_url / _source / _target), so a local mock server can stand in.
+    """
+
+    def __init__(self, provider: str, base_url: str, source: str, target: str, api_key: Optional[str] = None,
+                 concurrency: int = 8, rate: float = 5.0, burst: Optional[float] = None, retries: int = 5,
+                 timeout: float = 60.0):
+        self.provider = provider
+        self.base_url = base_url
+        self.source = source
+        self.target = target
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.timeout = timeout
+
+    def translate_batches(self, texts: List[str], batches: List[List[int]],
+                          on_done: Optional[Callable[[int], None]] = None) -> List[Optional[str]]:
+        """
+        Translate texts grouped into batches of indices, one request per batch, all batches
+        in flight at once (within the concurrency and rate limits). Texts outside every batch
+        are returned unchanged. A batch that fails or can't be aligned is retried one text per
+        request; texts that still fail come back as None. on_done(n) reports n more texts finished.
+        """
+        return asyncio.run(self._translate_batches(texts, batches, on_done or (lambda n: None)))
+
+    async def _translate_batches(self, texts: List[str], batches: List[List[int]],
+                                 on_done: Callable[[int], None]) -> List[Optional[str]]:
+        results: List[Optional[str]] = list(texts)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate, self.burst)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            async def translate(indices: List[int]) -> List[str]:
+                async with semaphore:
+                    return await self._translate_list(client, bucket, [texts[i] for i in indices])
+
+            async def run_single(index: int):
+                try:
+                    results[index] = (await translate([index]))[0]
+                except Exception:
+                    print(f"\n⚠️ Translation failed for segment: '{texts[index]}'. Keeping original.", file=sys.stderr)
+                    results[index] = None
+                on_done(1)
+
+            async def run_batch(indices: List[int]):
+                try:
+                    translated = await translate(indices)
+                except Exception as e:
+                    if len(indices) == 1:
+                        await run_single(indices[0])
+                        return
+                    print(f"\n⚠️ Batch translation failed ({e}). Retrying {len(indices)} segments one by one.", file=sys.stderr)
+                    await asyncio.gather(*(run_single(i) for i in indices))
+                    return
+                # Placed by index: completion order doesn't matter
+                for i, text in zip(indices, translated):
+                    results[i] = text
+                on_done(len(indices))
+
+            await asyncio.gather(*(run_batch(indices) for indices in batches))
+        return results
+
+    async def _translate_list(self, client: httpx.AsyncClient, bucket: TokenBucket, texts: List[str]) -> List[str]:
+        """One request for the texts. Raises BatchAlignmentError if the response doesn't align."""
+        from .translator import BatchAlignmentError, BATCH_DELIMITER
+
+        if self.provider == 'deepl':
+            # Repeated 'text' fields, one translation per field
+            data = {'text': list(texts), 'target_lang': self.target}
+            if self.source and self.source != 'auto':
+                data['source_lang'] = self.source
+            response = await self._send(client, bucket, 'POST', self.base_url + "translate", data=data,
+                                        headers={'Authorization': f"DeepL-Auth-Key {self.api_key}"})
+            translated = [t['text'] for t in response.json()['translations']]
+        else:
+            lines = [" ".join(t.split()) for t in texts]
+            params = {'tl': self.target, 'sl': self.source, 'q': BATCH_DELIMITER.join(lines)}
+            response = await self._send(client, bucket, 'GET', self.base_url, params=params)
+            match = _GOOGLE_RESULT.search(response.text)
+            if match is None:
+                raise ValueError("no translation in Google's response")
+            text = html.unescape(match.group(1)).strip()
+            if len(texts) == 1:
+                translated = [text]
+            else:
+                translated = [line.strip() for line in text.split(BATCH_DELIMITER) if line.strip()]
+
+        if len(translated) != len(texts):
+            metrics.incr('translation_batch_misaligned')
+            raise BatchAlignmentError(f"sent {len(texts)} segments, got {len(translated)} back")
+        return translated
+
+    async def _send(self, client: httpx.AsyncClient, bucket: TokenBucket, method: str, url: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries):
+            await bucket.acquire()
+            metrics.incr('translation_requests')
+            retry_after = None
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    raise RetryableStatus(response)
+                response.raise_for_status()
+                return response
+            except (httpx.TransportError, RetryableStatus) as e:
+                if attempt == self.retries - 1:
+                    metrics.incr('translation_failures')
+                    raise
+                if isinstance(e, RetryableStatus) and e.response.status_code == 429:
+                    metrics.incr('translation_rate_limited')
+                delay = backoff_delay(attempt, retry_after=retry_after)
+                metrics.incr('translation_retries')
+                metrics.incr('translation_sleep_sec', delay)
+                await asyncio.sleep(delay)
+            except httpx.HTTPStatusError:
+                metrics.incr('translation_failures')
+                raise
@@ -1,13 +1,22 @@
-import ffmpeg
+import numpy as np
+import concurrent.futures
+import math
 import os
 import sys
-from typing import List
+from typing import List, Dict, Tuple, Iterator, Iterable, Optional
+from .metrics import metrics
 
+# Whisper expects 16kHz mono audio
+SAMPLE_RATE = 16000
+
+@metrics.timed("extract_audio", profile=True)
 def extract_audio(video_path: str, output_path: str = "temp_audio.wav") -> str:
     """
     Extract audio from video and convert to 16kHz mono WAV (Whisper friendly format).
     Returns the path to the extracted audio file.
     """
+    import ffmpeg
+
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video file not found: {video_path}")
 
@@ -29,11 +38,14 @@ def extract_audio(video_path: str, output_path: str = "temp_audio.wav") -> str:
         print(f"Detail: {e.stderr.decode() if e.stderr else 'Unknown error'}", file=sys.stderr)
         raise e
 
+@metrics.timed("split_audio")
 def split_audio(audio_path: str, segment_duration_sec: int = 600) -> List[str]:
     """
     Split audio file into chunks of segment_duration_sec.
     Returns a list of paths to the split audio files.
     """
+    import ffmpeg
+
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
@@ -79,3 +91,308 @@ def split_audio(audio_path: str, segment_duration_sec: int = 600) -> List[str]:
         print(f"❌ Audio splitting failed: {e.stderr.decode() if e.stderr else str(e)}", file=sys.stderr)
         raise e
 
+
+@metrics.timed("load_audio", profile=True)
+def load_audio(video_path: str, sample_rate: int = SAMPLE_RATE, duration_sec: Optional[float] = None) -> np.ndarray:
+    """
+    Decode the audio track of a video straight into memory as 16kHz mono float32 samples.
+    ffmpeg writes raw PCM to stdout, so no temporary WAV file is created.
+    duration_sec only decodes the first duration_sec seconds (e.g. for a calibration sample).
+    Returns a 1-D float32 NumPy array that can be passed directly to Model.transcribe.
+    """
+    import ffmpeg
+
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video file not found: {video_path}")
+
+    print(f"🎵 Decoding audio from {os.path.basename(video_path)} into memory...")
+
+    try:
+        out, _ = (
+            ffmpeg
+            .input(video_path, **({'t': duration_sec} if duration_sec else {}))
+            .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=str(sample_rate))
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        print("❌ FFmpeg error occurred. Please ensure ffmpeg is installed via 'brew install ffmpeg'.", file=sys.stderr)
+        print(f"Detail: {e.stderr.decode() if e.stderr else 'Unknown error'}", file=sys.stderr)
+        raise e
+
+    audio = np.frombuffer(out, dtype=np.float32)
+    print(f"✅ Audio decoded: {len(audio) / sample_rate:.1f}s ({audio.nbytes / 1e6:.1f} MB)")
+    return audio
+
+def split_samples(audio: np.ndarray, segment_duration_sec: float = 600, overlap_sec: float = 0.0,
+                  sample_rate: int = SAMPLE_RATE) -> List[Dict]:
+    """
+    In-memory counterpart of split_audio.
+    Consecutive chunks share overlap_sec of audio so that words at the cut appear whole in
+    at least one chunk (see stitch_segments).
+
+    Returns a list of chunks: [{'start': float, 'end': float, 'audio': np.ndarray}]
+    where 'start'/'end' are exact offsets computed from sample counts and 'audio' is a
+    view into the decoded buffer (no copies).
+    """
+    chunk_len = int(segment_duration_sec * sample_rate)
+    if chunk_len <= 0:
+        return [{'start': 0.0, 'end': len(audio) / sample_rate, 'audio': audio}]
+
+    overlap = int(overlap_sec * sample_rate)
+    if overlap >= chunk_len:
+        raise ValueError("Chunk overlap must be shorter than the chunk duration.")
+
+    chunks = []
+    for start in range(0, len(audio), chunk_len):
+        end = min(len(audio), start + chunk_len + overlap)
+        chunks.append({
+            'start': start / sample_rate,
+            'end': end / sample_rate,
+            'audio': audio[start:end],
+        })
+        if end == len(audio):
+            break
+
+    print(f"✅ Audio split into {len(chunks)} in-memory chunks.")
+    return chunks
+
+def probe_duration(path: str) -> float:
+    """Duration of a media file in seconds, from the container."""
+    import ffmpeg
+
+    try:
+        probe = ffmpeg.probe(path)
+    except ffmpeg.Error as e:
+        print(f"❌ Failed to probe duration: {e.stderr.decode() if e.stderr else str(e)}", file=sys.stderr)
+        raise e
+    return float(probe['format']['duration'])
+
+
+class ParallelChunkExtractor:
+    """
+    Decode fixed-length chunks of a video's audio with several ffmpeg processes at once.
+
+    The duration is probed once, then each chunk is decoded by its own ffmpeg seeking straight
+    to its range (input-side ss/t), so no full-length WAV is ever written or re-read. Chunk i
+    starts exactly at i * segment_duration_sec and carries overlap_sec of the next chunk, like
+    split_samples.
+
+    iter_ready() yields (index, samples) as each chunk finishes decoding, so transcription can
+    start on the first chunk while the others are still being decoded. At most 2 * workers
+    decoded chunks are held in memory at a time, as long as the consumer only pulls chunks as
+    it gets through them (the transcription process pool keeps at most 2 per worker queued).
+    WhisperTranscriber.transcribe_batch accepts an extractor in place of a list of inputs.
+    decode_all() decodes every chunk up front instead, for callers that decode on one thread
+    and transcribe on another (batch mode).
+    """
+
+    def __init__(self, video_path: str, segment_duration_sec: float, overlap_sec: float = 0.0,
+                 workers: int = 0, sample_rate: int = SAMPLE_RATE):
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+        if segment_duration_sec <= 0:
+            raise ValueError("Parallel extraction needs a positive chunk duration.")
+        if overlap_sec >= segment_duration_sec:
+            raise ValueError("Chunk overlap must be shorter than the chunk duration.")
+
+        self.video_path = video_path
+        self.segment_duration_sec = segment_duration_sec
+        self.overlap_sec = overlap_sec
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.sample_rate = sample_rate
+        self.duration = probe_duration(video_path)
+        num_chunks = max(1, math.ceil(self.duration / segment_duration_sec))
+        self.offsets = [i * segment_duration_sec for i in range(num_chunks)]
+        print(f"✂️  Decoding {num_chunks} chunks of {segment_duration_sec}s with {self.workers} ffmpeg workers...")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def decode_chunk(self, index: int) -> np.ndarray:
+        """Decode chunk `index` (plus its overlap) to 16kHz mono float32 samples."""
+        import ffmpeg
+
+        start = self.offsets[index]
+        length = min(self.segment_duration_sec + self.overlap_sec, self.duration - start)
+        try:
+            out, _ = (
+                ffmpeg
+                .input(self.video_path, ss=start, t=length)
+                .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=str(self.sample_rate))
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+        except ffmpeg.Error as e:
+            print(f"❌ Failed to decode chunk {index}: {e.stderr.decode() if e.stderr else str(e)}", file=sys.stderr)
+            raise e
+        return np.frombuffer(out, dtype=np.float32)
+
+    def iter_ready(self, skip: Iterable[int] = ()) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (index, samples) in completion order, skipping the given chunk indexes
+        (e.g. chunks a resumed job already transcribed). Chunks that fail to decode are
+        reported and left out.
+        """
+        skip = set(skip)
+        todo = iter([i for i in range(len(self)) if i not in skip])
+        window = 2 * self.workers
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for index in todo:
+                futures[pool.submit(self.decode_chunk, index)] = index
+                if len(futures) >= window:
+                    break
+            while futures:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    # Keep the decoders busy while the consumer works on this chunk
+                    next_index = next(todo, None)
+                    if next_index is not None:
+                        futures[pool.submit(self.decode_chunk, next_index)] = next_index
+                    try:
+                        samples = future.result()
+                    except Exception as e:
+                        print(f"❌ Skipping chunk {index}, decoding failed: {e}", file=sys.stderr)
+                        continue
+                    yield index, samples
+
+    def decode_all(self) -> 'DecodedChunks':
+        """Decode every chunk now, in parallel. Chunks that fail to decode are left out, as in iter_ready."""
+        return DecodedChunks(self.offsets, dict(self.iter_ready()))
+
+
+class DecodedChunks:
+    """
+    The chunks of a ParallelChunkExtractor, already decoded (see ParallelChunkExtractor.decode_all).
+    Same interface as the extractor, so it can take its place anywhere; nothing is decoded again.
+    """
+
+    def __init__(self, offsets: List[float], samples: Dict[int, np.ndarray]):
+        self.offsets = offsets
+        self.samples = samples
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def decode_chunk(self, index: int) -> np.ndarray:
+        return self.samples[index]
+
+    def iter_ready(self, skip: Iterable[int] = ()) -> Iterator[Tuple[int, np.ndarray]]:
+        skip = set(skip)
+        for index in sorted(self.samples):
+            if index not in skip:
+                yield index, self.samples[index]
+
+@metrics.timed("chunk_start_times")
+def chunk_start_times(chunk_paths: List[str], sample_rate: int = SAMPLE_RATE) -> List[float]:
+    """
+    Exact start time of each chunk produced by split_audio.
+    With c='copy' the segment muxer cuts on packet boundaries, so chunks are not exactly
+    segment_duration_sec long. Each chunk's sample count is probed and accumulated instead.
+    """
+    import ffmpeg
+
+    starts = []
+    total_samples = 0
+    for path in chunk_paths:
+        starts.append(total_samples / sample_rate)
+        try:
+            probe = ffmpeg.probe(path)
+        except ffmpeg.Error as e:
+            print(f"❌ Failed to probe chunk {path}: {e.stderr.decode() if e.stderr else str(e)}", file=sys.stderr)
+            raise e
+        stream = next(s for s in probe['streams'] if s.get('codec_type') == 'audio')
+        if stream.get('duration_ts') and stream.get('time_base') == f"1/{sample_rate}":
+            total_samples += int(stream['duration_ts'])
+        else:
+            total_samples += round(float(probe['format']['duration']) * sample_rate)
+    return starts
+
+@metrics.timed("detect_speech_chunks")
+def detect_speech_chunks(
+    audio: np.ndarray,
+    sample_rate: int = SAMPLE_RATE,
+    max_chunk_sec: float = 30.0,
+    threshold_db: float = -40.0,
+    min_silence_sec: float = 0.3,
+    max_gap_sec: float = 2.0,
+    pad_sec: float = 0.2,
+    frame_ms: int = 30,
+) -> List[Dict]:
+    """
+    Energy-based voice activity detection over decoded samples.
+    Cuts the audio into variable-length speech chunks at silences and drops
+    silent stretches longer than max_gap_sec entirely.
+
+    Returns a list of chunks: [{'start': float, 'end': float, 'audio': np.ndarray}]
+    where 'start'/'end' are the true offsets in seconds and 'audio' is a view into the buffer.
+    Raises ValueError when max_chunk_sec is shorter than two frames (a region couldn't be cut).
+    """
+    if max_chunk_sec * 1000 < 2 * frame_ms:
+        raise ValueError(f"max_chunk_sec must be at least {2 * frame_ms / 1000:g}s (two {frame_ms}ms frames).")
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(audio) // frame_len
+    if n_frames == 0:
+        return []
+
+    # Per-frame loudness in dBFS
+    frames = audio[:n_frames * frame_len].reshape(n_frames, frame_len)
+    energy_db = 10 * np.log10(np.mean(np.square(frames, dtype=np.float64), axis=1) + 1e-10)
+    speech = energy_db > threshold_db
+
+    # Short pauses between words belong to the speech around them
+    regions = _mask_to_regions(speech)
+    min_silence = int(min_silence_sec * 1000 / frame_ms)
+    merged = []
+    for start, end in regions:
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    # Regions longer than a chunk are cut at their quietest frame
+    max_frames = max(1, int(max_chunk_sec * 1000 / frame_ms))
+    bounded = []
+    for start, end in merged:
+        while end - start > max_frames:
+            window = energy_db[start + max_frames // 2:start + max_frames]
+            cut = start + max_frames // 2 + int(np.argmin(window))
+            bounded.append((start, cut))
+            start = cut
+        bounded.append((start, end))
+
+    # Pack neighbouring regions into evenly sized work units, skipping long silences
+    max_gap = int(max_gap_sec * 1000 / frame_ms)
+    packed = []
+    for start, end in bounded:
+        if packed and start - packed[-1][1] <= max_gap and end - packed[-1][0] <= max_frames:
+            packed[-1] = (packed[-1][0], end)
+        else:
+            packed.append((start, end))
+
+    # Pad into the surrounding silence, but never across a neighbouring chunk
+    # (chunks cut inside a long region touch each other and get no padding there)
+    pad = int(pad_sec * sample_rate)
+    bounds = [(start * frame_len, end * frame_len) for start, end in packed]
+    chunks = []
+    for i, (start, end) in enumerate(bounds):
+        prev_end = bounds[i - 1][1] if i > 0 else 0
+        next_start = bounds[i + 1][0] if i + 1 < len(bounds) else len(audio)
+        s = max(prev_end, start - pad)
+        e = min(next_start, end + pad)
+        chunks.append({
+            'start': s / sample_rate,
+            'end': e / sample_rate,
+            'audio': audio[s:e],
+        })
+
+    speech_sec = sum(c['end'] - c['start'] for c in chunks)
+    total_sec = len(audio) / sample_rate
+    print(f"✅ Found {len(chunks)} speech chunks ({speech_sec:.1f}s of {total_sec:.1f}s, {100 * (1 - speech_sec / total_sec):.0f}% silence skipped).")
+    return chunks
+
+def _mask_to_regions(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """Convert a boolean frame mask into [start, end) index pairs of True runs."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
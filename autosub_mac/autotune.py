@@ -0,0 +1,186 @@
+"""
+Hardware-aware calibration of the transcription settings.
+
+Transcribes a short sample clip with every combination of worker processes, whisper.cpp threads
+per worker and chunk length, and saves the fastest one for this model and host to
+<cache dir>/autotune.json. main.py uses it for --threads, --n-threads and --segment-duration
+whenever they aren't given:
+
+    python -m autosub_mac.autotune sample.mp4 --model base --quant q5_1
+"""
+import argparse
+import itertools
+import json
+import os
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .cache import default_cache_dir
+from .models import ALL_QUANTIZATIONS, resolve_model
+
+TUNING_FILE = "autotune.json"
+
+
+def host_id() -> str:
+    return socket.gethostname()
+
+
+def _tuning_path(cache_dir: Optional[str]) -> str:
+    return os.path.join(cache_dir or default_cache_dir(), TUNING_FILE)
+
+
+def _read_tunings(cache_dir: Optional[str]) -> Dict:
+    try:
+        with open(_tuning_path(cache_dir), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_tuning(model_name: str, cache_dir: Optional[str] = None) -> Optional[Dict]:
+    """
+    Saved configuration for model_name on this host, or None. A configuration tuned
+    for a different core count (e.g. a resized VM with the same name) is ignored.
+    """
+    config = _read_tunings(cache_dir).get(host_id(), {}).get(model_name)
+    if config is None or config.get('cpu_count') != os.cpu_count():
+        return None
+    return config
+
+
+def save_tuning(model_name: str, config: Dict, cache_dir: Optional[str] = None):
+    """Record config for model_name on this host, keeping the entries of other hosts and models."""
+    tunings = _read_tunings(cache_dir)
+    tunings.setdefault(host_id(), {})[model_name] = config
+
+    path = _tuning_path(cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(tunings, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def candidate_grid(cpu_count: int, workers: Optional[List[int]] = None, threads: Optional[List[int]] = None,
+                   chunk_lengths: Optional[List[int]] = None) -> List[Dict]:
+    """
+    Combinations to try. By default: 1, 2, 4, ... workers up to the core count, each with all
+    cores or half of them split between the workers, and 30s / 60s / 120s chunks.
+    Combinations that use more threads than there are cores are left out.
+    """
+    if workers is None:
+        workers = [w for w in (2 ** i for i in range(cpu_count.bit_length())) if w <= cpu_count]
+    chunk_lengths = chunk_lengths or [30, 60, 120]
+
+    grid = []
+    for w in workers:
+        if threads is None:
+            options = sorted({max(1, cpu_count // w), max(1, cpu_count // (2 * w))}, reverse=True)
+        else:
+            options = [t for t in threads if t * w <= cpu_count]
+        for t, chunk in itertools.product(options, chunk_lengths):
+            grid.append({'workers': w, 'n_threads': t, 'segment_duration': chunk})
+    return grid
+
+
+def calibrate(sample, model_name: str, grid: List[Dict], models_dir: Optional[str] = None) -> List[Dict]:
+    """
+    Transcribe the sample once per configuration and return the results, fastest first.
+    Timings include model loading (once per worker), as a real job pays it too. A configuration
+    where any chunk fails is left out: transcribe_batch carries on past failed chunks, so it
+    would otherwise look fast. Chunks without speech (silence, music) count as transcribed.
+    """
+    # Imported here: main.py reads saved tunings at every start-up, without audio or Whisper
+    from .audio import split_samples, SAMPLE_RATE
+    from .transcriber import WhisperTranscriber
+
+    duration = len(sample) / SAMPLE_RATE
+    results = []
+    for i, config in enumerate(grid, 1):
+        chunks = split_samples(sample, config['segment_duration'])
+        # A single chunk can't keep more than one worker busy
+        if config['workers'] > len(chunks):
+            continue
+        print(f"⏱️  [{i}/{len(grid)}] {config['workers']} workers x {config['n_threads']} threads, "
+              f"{config['segment_duration']}s chunks...")
+
+        transcriber = WhisperTranscriber(model_name=model_name, n_threads=config['n_threads'],
+                                         load_model=False, models_dir=models_dir)
+        transcribed = set()
+        start = time.perf_counter()
+        try:
+            transcriber.transcribe_batch(
+                [c['audio'] for c in chunks],
+                max_workers=config['workers'],
+                executor="process" if config['workers'] > 1 else "sequential",
+                offsets=[c['start'] for c in chunks],
+                chunk_callback=lambda index, segs: transcribed.add(index),
+            )
+        except Exception as e:
+            print(f"❌ Configuration failed: {e}", file=sys.stderr)
+            continue
+        wall = time.perf_counter() - start
+        failed = len(chunks) - len(transcribed)
+        if failed:
+            print(f"❌ Configuration failed: {failed}/{len(chunks)} chunks errored.", file=sys.stderr)
+            continue
+        results.append({**config, 'wall_sec': round(wall, 3), 'rtf': round(wall / duration, 4)})
+
+    return sorted(results, key=lambda r: r['wall_sec'])
+
+
+def _int_list(value: Optional[str]) -> Optional[List[int]]:
+    return [int(v) for v in value.split(",") if v.strip()] if value else None
+
+
+def main():
+    from .audio import load_audio, SAMPLE_RATE
+
+    parser = argparse.ArgumentParser(description="Find the fastest worker / thread / chunk length combination for a model on this machine.")
+    parser.add_argument("sample", help="Video or audio file to calibrate on (representative speech).")
+    parser.add_argument("--model", default="base", help="Whisper model to tune (see autosub_mac.main --model).")
+    parser.add_argument("--quant", choices=list(ALL_QUANTIZATIONS), help="Quantized build of --model.")
+    parser.add_argument("--sample-sec", type=float, default=120, help="Seconds of the sample to transcribe per configuration. Defaults to 120.")
+    parser.add_argument("--workers", help="Comma-separated worker counts to try. Defaults to powers of two up to the core count.")
+    parser.add_argument("--threads", help="Comma-separated whisper.cpp thread counts per worker to try. Defaults to all cores or half of them, split between the workers.")
+    parser.add_argument("--chunk-lengths", help="Comma-separated chunk lengths in seconds to try. Defaults to 30,60,120.")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Where models live and the result is saved (autotune.json). Defaults to ~/.cache/autosub_mac.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the results without saving the best configuration.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.sample):
+        print(f"❌ Error: Sample file '{args.sample}' does not exist.")
+        sys.exit(1)
+    try:
+        model_name = resolve_model(args.model, args.quant)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    cpu_count = os.cpu_count() or 1
+    grid = candidate_grid(cpu_count, _int_list(args.workers), _int_list(args.threads), _int_list(args.chunk_lengths))
+    sample = load_audio(args.sample, duration_sec=args.sample_sec)
+    print(f"🔧 Calibrating '{model_name}' on {host_id()} ({cpu_count} cores): {len(grid)} configurations, "
+          f"{len(sample) / SAMPLE_RATE:.0f}s sample.")
+
+    results = calibrate(sample, model_name, grid, models_dir=os.path.join(args.cache_dir, "models"))
+    if not results:
+        print("❌ No configuration completed.", file=sys.stderr)
+        sys.exit(1)
+
+    print("\n workers  threads  chunk    wall      RTF")
+    for r in results:
+        print(f"{r['workers']:>8} {r['n_threads']:>8} {r['segment_duration']:>5}s {r['wall_sec']:>7.2f}s {r['rtf']:>8.4f}")
+
+    best = {**results[0], 'cpu_count': cpu_count, 'tuned_at': time.time()}
+    if args.dry_run:
+        return
+    save_tuning(model_name, best, args.cache_dir)
+    print(f"✅ Saved: {best['workers']} workers x {best['n_threads']} threads, {best['segment_duration']}s chunks "
+          f"-> {_tuning_path(args.cache_dir)}")
+
+
+if __name__ == "__main__":
+    main()
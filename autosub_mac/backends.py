@@ -0,0 +1,84 @@
+"""
+Registry of transcription engines and translation providers.
+
+A backend is registered under a name as "module:attribute" and only imported the first time
+it's selected, so `--help`, `--no-translate` runs and the short-lived subprocesses the GUI and
+the service start don't pay for libraries they never use. Registering an object instead of a
+string (e.g. a stand-in model class in the benchmarks) replaces the backend outright.
+
+    register_transcription_backend("whispercpp", "pywhispercpp.model:Model")
+    Model = load_transcription_backend("whispercpp")
+"""
+import importlib
+import threading
+from typing import Any, Dict, List, Union
+
+# Transcription engines: classes constructed as cls(model_file, print_realtime=False, print_progress=False)
+# with pywhispercpp's transcribe / auto_detect_language interface
+TRANSCRIPTION_BACKENDS: Dict[str, Union[str, Any]] = {
+    'whispercpp': "pywhispercpp.model:Model",
+}
+DEFAULT_TRANSCRIPTION_BACKEND = 'whispercpp'
+
+# Translation providers: deep_translator-style classes (translate(), _base_url, _source, _target)
+TRANSLATION_PROVIDERS: Dict[str, Union[str, Any]] = {
+    'google': "deep_translator:GoogleTranslator",
+    'deepl': "deep_translator:DeeplTranslator",
+}
+
+_lock = threading.Lock()
+_loaded: Dict[tuple, Any] = {}
+
+
+def register_transcription_backend(name: str, target: Union[str, Any]):
+    with _lock:
+        TRANSCRIPTION_BACKENDS[name] = target
+        _loaded.pop(('transcription', name), None)
+
+
+def register_translation_provider(name: str, target: Union[str, Any]):
+    with _lock:
+        TRANSLATION_PROVIDERS[name] = target
+        _loaded.pop(('translation', name), None)
+
+
+def transcription_backends() -> List[str]:
+    return list(TRANSCRIPTION_BACKENDS)
+
+
+def translation_providers() -> List[str]:
+    return list(TRANSLATION_PROVIDERS)
+
+
+def transcription_backend_spec(name: str) -> Union[str, Any]:
+    """The registered target for name, e.g. to hand to a worker process that imports it itself."""
+    if name not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}'. Available: {', '.join(TRANSCRIPTION_BACKENDS)}.")
+    return TRANSCRIPTION_BACKENDS[name]
+
+
+def load_transcription_backend(name: str) -> Any:
+    return _load('transcription', name, transcription_backend_spec(name))
+
+
+def load_translation_provider(name: str) -> Any:
+    if name not in TRANSLATION_PROVIDERS:
+        raise ValueError(f"Provider {name} not yet implemented in this wrapper.")
+    return _load('translation', name, TRANSLATION_PROVIDERS[name])
+
+
+def resolve_target(target: Union[str, Any]) -> Any:
+    """Import a "module:attribute" target. Anything else is already the object."""
+    if not isinstance(target, str):
+        return target
+    module_name, _, attribute = target.partition(":")
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+def _load(kind: str, name: str, target: Union[str, Any]) -> Any:
+    key = (kind, name)
+    with _lock:
+        if key not in _loaded:
+            _loaded[key] = resolve_target(target)
+        return _loaded[key]
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+def default_cache_dir() -> str:
+    """
+    Directory for on-disk caches.
+    $AUTOSUB_CACHE_DIR if set, otherwise $XDG_CACHE_HOME/autosub_mac (~/.cache/autosub_mac).
+    """
+    if os.environ.get("AUTOSUB_CACHE_DIR"):
+        return os.environ["AUTOSUB_CACHE_DIR"]
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "autosub_mac")
+
+def normalize_text(text: str) -> str:
+    """Cache key form of a segment: surrounding and repeated whitespace don't matter."""
+    return " ".join(text.split())
+
+class TranslationCache:
+    """
+    Persistent translation memory stored in SQLite.
+    Keyed by (provider, source language, target language, normalized text), bounded to
+    max_entries with least-recently-used eviction. Safe to share between threads.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200000):
+        if path is None:
+            path = os.path.join(default_cache_dir(), "translations.sqlite")
+        parent_dir = os.path.dirname(path)
+        if parent_dir and not os.path.exists(parent_dir):
+            os.makedirs(parent_dir, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                " provider TEXT, source TEXT, target TEXT, text TEXT,"
+                " translation TEXT, last_used REAL,"
+                " PRIMARY KEY (provider, source, target, text))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS translations_lru ON translations (last_used)")
+
+    def get_many(self, provider: str, source: str, target: str, texts: List[str]) -> Dict[str, str]:
+        """Look up normalized texts. Returns {text: translation} for the ones found."""
+        found = {}
+        now = time.time()
+        with self._lock, self._conn:
+            for text in texts:
+                row = self._conn.execute(
+                    "SELECT translation FROM translations WHERE provider=? AND source=? AND target=? AND text=?",
+                    (provider, source, target, text),
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[text] = row[0]
+                self._conn.execute(
+                    "UPDATE translations SET last_used=? WHERE provider=? AND source=? AND target=? AND text=?",
+                    (now, provider, source, target, text),
+                )
+        return found
+
+    def put_many(self, provider: str, source: str, target: str, translations: Dict[str, str]):
+        """Store {normalized text: translation} and evict the least recently used entries over the limit."""
+        if not translations:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)",
+                [(provider, source, target, text, translated, now) for text, translated in translations.items()],
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM translations WHERE rowid IN"
+                    " (SELECT rowid FROM translations ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def audio_fingerprint(audio: Union[str, 'np.ndarray']) -> str:
+    """SHA-256 of decoded samples, or of an audio file's bytes."""
+    digest = hashlib.sha256()
+    if isinstance(audio, str):
+        with open(audio, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        import numpy as np
+
+        digest.update(str(audio.dtype).encode())
+        digest.update(memoryview(np.ascontiguousarray(audio)).cast('B'))
+    return digest.hexdigest()
+
+class TranscriptCache:
+    """
+    Content-addressed store of normalized transcription results.
+    Keyed by the hash of the audio (whole file or chunk), the model name and the
+    transcription parameters; each entry is one JSON file of segments.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        if directory is None:
+            directory = os.path.join(default_cache_dir(), "transcripts")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, audio: Union[str, 'np.ndarray'], model_name: str, params: Dict) -> str:
+        descriptor = json.dumps({'audio': audio_fingerprint(audio), 'model': model_name, 'params': params}, sort_keys=True)
+        return hashlib.sha256(descriptor.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                segments = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return segments
+
+    def put(self, key: str, segments: List[Dict]):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so a crash never leaves a truncated entry behind
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(segments, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
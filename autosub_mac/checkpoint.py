@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+from .cache import normalize_text
+
+MANIFEST_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+# chunk_000.json, chunk_000.<lang>.json (and their .tmp while written): the only other files a manifest writes
+_CHUNK_FILE = re.compile(r"chunk_\d{3,}(\.[^./\\]+)?\.json(\.tmp)?")
+
+def _write_json(path: str, data):
+    # Write then rename, so a crash never leaves a half-written file behind
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _read_json(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+class JobManifest:
+    """
+    Progress of one long job, persisted chunk by chunk so a crashed or killed run can resume.
+
+    The job directory holds manifest.json (job fingerprint, chunk offsets and which chunks are
+    transcribed / translated per language) next to one JSON file of segments per finished
+    chunk: chunk_000.json for the transcript, chunk_000.<lang>.json per translation (with a
+    hash of the source texts it was made from). Only those files are ever deleted; anything
+    else in the directory is left alone.
+    """
+
+    def __init__(self, directory: str, fingerprint: Dict, resume: bool = False):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        data = _read_json(manifest_path) if resume else None
+        if data is not None and (data.get('version') != MANIFEST_VERSION or data.get('fingerprint') != fingerprint):
+            print("⚠️ Checkpoint belongs to a different input or settings, starting over.")
+            data = None
+        if data is None:
+            data = {'version': MANIFEST_VERSION, 'fingerprint': fingerprint, 'offsets': None,
+                    'transcribed': [], 'translated': {}}
+            self._remove_chunk_files()
+        elif data['transcribed']:
+            print(f"⏩ Resuming: {len(data['transcribed'])} chunks already transcribed.")
+        self.data = data
+        self._save()
+
+    @property
+    def offsets(self) -> Optional[List[float]]:
+        return self.data['offsets']
+
+    def set_offsets(self, offsets: List[float]):
+        with self._lock:
+            if self.data['offsets'] is not None and self.data['offsets'] != offsets:
+                # Chunking changed under us: earlier chunks no longer line up
+                self.data['transcribed'] = []
+                self.data['translated'] = {}
+            self.data['offsets'] = offsets
+            self._save()
+
+    @property
+    def language(self) -> Optional[str]:
+        """Spoken language pinned for the job's transcription (None: detected per chunk)."""
+        return self.data.get('language')
+
+    def set_language(self, language: Optional[str]):
+        with self._lock:
+            self.data['language'] = language
+            self._save()
+
+    def is_fully_transcribed(self) -> bool:
+        offsets = self.data['offsets']
+        return offsets is not None and len(self.data['transcribed']) == len(offsets)
+
+    def completed_transcripts(self) -> Dict[int, List[Dict]]:
+        completed = {}
+        for index in self.data['transcribed']:
+            segments = _read_json(self._chunk_path(index))
+            if segments is not None:
+                completed[index] = segments
+        return completed
+
+    def save_transcript(self, index: int, segments: List[Dict]):
+        _write_json(self._chunk_path(index), segments)
+        with self._lock:
+            if index not in self.data['transcribed']:
+                self.data['transcribed'].append(index)
+            self._save()
+
+    def load_translation(self, index: int, lang: str, source: str) -> Optional[List[Dict]]:
+        """Saved translation of chunk index, if it was made from the source texts hashed as source (see source_hash)."""
+        if index not in self.data['translated'].get(lang, []):
+            return None
+        data = _read_json(self._chunk_path(index, lang))
+        if data is None or data.get('source') != source:
+            return None
+        return data['segments']
+
+    def save_translation(self, index: int, lang: str, segments: List[Dict], source: str):
+        _write_json(self._chunk_path(index, lang), {'source': source, 'segments': segments})
+        with self._lock:
+            done = self.data['translated'].setdefault(lang, [])
+            if index not in done:
+                done.append(index)
+            self._save()
+
+    def remove(self):
+        """Delete the manifest and its chunk files once the final outputs are written, then the directory if that left it empty."""
+        self._remove_chunk_files()
+        try:
+            os.remove(os.path.join(self.directory, MANIFEST_FILE))
+            os.rmdir(self.directory)
+        except OSError:
+            pass
+
+    def _remove_chunk_files(self):
+        for name in os.listdir(self.directory):
+            if _CHUNK_FILE.fullmatch(name):
+                os.remove(os.path.join(self.directory, name))
+
+    def _chunk_path(self, index: int, lang: Optional[str] = None) -> str:
+        suffix = f".{lang}" if lang else ""
+        return os.path.join(self.directory, f"chunk_{index:03d}{suffix}.json")
+
+    def _save(self):
+        _write_json(os.path.join(self.directory, MANIFEST_FILE), self.data)
+
+def split_by_chunk(segments: List[Dict], offsets: List[float]) -> List[List[Dict]]:
+    """Group a stitched timeline back into per-chunk groups by chunk start time."""
+    groups = [[] for _ in offsets]
+    index = 0
+    for seg in segments:
+        while index + 1 < len(offsets) and seg['start'] >= offsets[index + 1]:
+            index += 1
+        groups[index].append(seg)
+    return groups
+
+def source_hash(segments: List[Dict]) -> str:
+    """Fingerprint of a chunk's source texts, so a saved translation is only reused for the same texts."""
+    texts = json.dumps([seg['text'] for seg in segments], ensure_ascii=False)
+    return hashlib.sha256(texts.encode('utf-8')).hexdigest()
+
+def _translation_runs(translator, groups: List[List[Dict]], stale: List[int]) -> List[List[int]]:
+    """Consecutive stale chunk indexes, in runs of about one round of requests (see SubtitleTranslator.request_limits)."""
+    max_chars, max_texts = translator.request_limits()
+    runs, current, chars, texts = [], [], 0, 0
+    for index in stale:
+        size = sum(len(seg['text']) + 1 for seg in groups[index])
+        if current and (chars + size > max_chars or texts + len(groups[index]) > max_texts):
+            runs.append(current)
+            current, chars, texts = [], 0, 0
+        current.append(index)
+        chars += size
+        texts += len(groups[index])
+    if current:
+        runs.append(current)
+    return runs
+
+def translate_with_checkpoints(translator, manifest: JobManifest, segments: List[Dict]) -> List[Dict]:
+    """
+    Reuse each chunk's saved translation when its source texts are unchanged, and translate the
+    other chunks in runs of about one round of requests, so texts repeated across the chunks of
+    a run are translated once and packed together. Each chunk is saved as soon as its run is
+    done, unless some of its segments couldn't be translated: those chunks are retried on resume.
+    """
+    lang = translator.target_lang
+    groups = split_by_chunk(list(segments), manifest.offsets)
+    hashes = [source_hash(group) for group in groups]
+    translated = {}
+    for index in range(len(groups)):
+        done = manifest.load_translation(index, lang, hashes[index])
+        if done is not None:
+            translated[index] = done
+    stale = [index for index in range(len(groups)) if index not in translated]
+
+    for run in _translation_runs(translator, groups, stale):
+        pending = [seg for index in run for seg in groups[index]]
+        fresh = translator.translate_segments(pending).to_dicts() if pending else []
+        position = 0
+        for index in run:
+            translated[index] = fresh[position:position + len(groups[index])]
+            position += len(groups[index])
+            if not any(normalize_text(seg['text']) in translator.failed for seg in groups[index]):
+                manifest.save_translation(index, lang, translated[index], hashes[index])
+    return [seg for index in range(len(groups)) for seg in translated[index]]
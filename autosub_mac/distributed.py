@@ -0,0 +1,325 @@
+"""
+Spread the chunks of one long video over several machines.
+
+The coordinator (main.py --distribute SPOOL) extracts and splits the audio into SPOOL, a
+directory every node can reach (NFS, SMB, ...), and queues one task per chunk in
+SPOOL/queue.sqlite. Workers on any host claim a task for a lease, keep it alive with
+heartbeats while Whisper runs, and post the chunk's segments back. The coordinator re-queues
+tasks whose lease expired (a worker died or lost the share), then merges the results in order.
+
+    python -m autosub_mac.distributed SPOOL          # on every node, as many as wanted
+    python -m autosub_mac.main long.mp4 --distribute SPOOL --segment-duration 300
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .cache import TranscriptCache, default_cache_dir
+from .progress import progress
+
+if TYPE_CHECKING:
+    from .segments import SegmentStore
+    from .transcriber import WhisperTranscriber
+
+QUEUE_FILE = "queue.sqlite"
+
+
+class WorkQueue:
+    """
+    Chunk tasks with lease/heartbeat semantics in a SQLite file shared by all nodes.
+    Each state change is a single statement, so concurrent workers never claim the same task.
+    Safe to share between threads.
+    """
+
+    def __init__(self, spool_dir: str):
+        os.makedirs(spool_dir, exist_ok=True)
+        self.spool_dir = spool_dir
+        self._lock = threading.Lock()
+        # Autocommit: every statement is its own transaction; wait for other nodes' locks
+        self._conn = sqlite3.connect(os.path.join(spool_dir, QUEUE_FILE), timeout=60,
+                                     isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, model TEXT, params TEXT, max_attempts INTEGER, created REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                " job_id TEXT, idx INTEGER, audio_path TEXT, status TEXT,"
+                " worker TEXT, lease_token TEXT, lease_expires REAL, attempts INTEGER,"
+                " result TEXT, error TEXT,"
+                " PRIMARY KEY (job_id, idx))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+
+    def create_job(self, job_id: str, model_name: str, params: Dict, audio_paths: List[str],
+                   max_attempts: int = 3):
+        """audio_paths are relative to the spool directory, which may be mounted elsewhere on each node."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT INTO jobs VALUES (?, ?, ?, ?, ?)",
+                                   (job_id, model_name, json.dumps(params), max_attempts, time.time()))
+                self._conn.executemany(
+                    "INSERT INTO tasks VALUES (?, ?, ?, 'queued', NULL, NULL, NULL, 0, NULL, NULL)",
+                    [(job_id, index, path) for index, path in enumerate(audio_paths)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker: str, lease_sec: float) -> Optional[Dict]:
+        """Lease the oldest queued task to worker. Returns the task (with its job's model and params) or None."""
+        token = uuid.uuid4().hex
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status='leased', worker=?, lease_token=?, lease_expires=?, attempts=attempts+1"
+                " WHERE rowid = (SELECT tasks.rowid FROM tasks JOIN jobs ON jobs.id = tasks.job_id"
+                "                WHERE tasks.status='queued' ORDER BY jobs.created, tasks.idx LIMIT 1)",
+                (worker, token, time.time() + lease_sec),
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._conn.execute(
+                "SELECT tasks.job_id, tasks.idx, tasks.audio_path, tasks.lease_token, jobs.model, jobs.params"
+                " FROM tasks JOIN jobs ON jobs.id = tasks.job_id WHERE tasks.lease_token=?",
+                (token,),
+            ).fetchone()
+        job_id, index, audio_path, token, model_name, params = row
+        return {'job_id': job_id, 'index': index, 'audio_path': audio_path, 'lease_token': token,
+                'model': model_name, 'params': json.loads(params)}
+
+    def heartbeat(self, task: Dict, lease_sec: float) -> bool:
+        """Extend the lease. False when it was lost (expired and re-queued by the coordinator)."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires=? WHERE job_id=? AND idx=? AND lease_token=? AND status='leased'",
+                (time.time() + lease_sec, task['job_id'], task['index'], task['lease_token']),
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, task: Dict, segments: List[Dict]):
+        # A result is a result: keep it even if the lease was lost meanwhile, unless another worker won
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status='done', result=?, lease_token=NULL WHERE job_id=? AND idx=? AND status!='done'",
+                (json.dumps(segments, ensure_ascii=False), task['job_id'], task['index']),
+            )
+
+    def fail(self, task: Dict, error: str):
+        """Give the task back for another attempt, or mark it failed once its job's attempts are used up."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET error=?, lease_token=NULL,"
+                " status = CASE WHEN attempts >= (SELECT max_attempts FROM jobs WHERE id=job_id)"
+                "          THEN 'failed' ELSE 'queued' END"
+                " WHERE job_id=? AND idx=? AND lease_token=?",
+                (error, task['job_id'], task['index'], task['lease_token']),
+            )
+
+    def requeue_expired(self, job_id: str) -> int:
+        """Re-queue the job's tasks whose lease ran out. Returns how many."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_token=NULL, error='lease expired',"
+                " status = CASE WHEN attempts >= (SELECT max_attempts FROM jobs WHERE id=job_id)"
+                "          THEN 'failed' ELSE 'queued' END"
+                " WHERE job_id=? AND status='leased' AND lease_expires < ?",
+                (job_id, time.time()),
+            )
+        return cursor.rowcount
+
+    def counts(self, job_id: str) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks WHERE job_id=? GROUP BY status", (job_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def results(self, job_id: str) -> Tuple[Dict[int, List[Dict]], Dict[int, str]]:
+        """({index: segments} of finished tasks, {index: last error} of failed ones)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idx, status, result, error FROM tasks WHERE job_id=?", (job_id,)
+            ).fetchall()
+        done = {index: json.loads(result) for index, status, result, _ in rows if status == 'done'}
+        failed = {index: error for index, status, _, error in rows if status == 'failed'}
+        return done, failed
+
+    def delete_job(self, job_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE job_id=?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE id=?", (job_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _wait_for_workers(queue: WorkQueue, job_id: str, total: int, poll_interval: float = 2.0,
+                      worker_timeout: float = 0.0, warn_interval: float = 60.0):
+    """
+    Poll until every task of the job is done or failed, re-queueing expired leases. While no
+    chunk is leased or finishes, warn every warn_interval seconds; after worker_timeout seconds
+    of that (0 = never), raise TimeoutError rather than wait for workers that may never come.
+    """
+    done_count = last_finished = -1
+    idle_since = warned_at = time.time()
+    while True:
+        expired = queue.requeue_expired(job_id)
+        if expired:
+            print(f"⏳ {expired} chunk leases expired, re-queued.")
+        counts = queue.counts(job_id)
+        finished = counts.get('done', 0) + counts.get('failed', 0)
+        if counts.get('done', 0) != done_count:
+            done_count = counts.get('done', 0)
+            print(f"▶️ {done_count}/{total} chunks done, {counts.get('leased', 0)} in progress.")
+            progress.advance("transcribe", done_count, total)
+        if finished == total:
+            return
+
+        now = time.time()
+        # Work is happening as long as a chunk is leased or another one finished since the last poll
+        if counts.get('leased', 0) or finished != last_finished:
+            idle_since = warned_at = now
+        last_finished = finished
+        if worker_timeout and now - idle_since > worker_timeout:
+            raise TimeoutError(f"No worker took a chunk in {worker_timeout:.0f}s "
+                               f"({total - finished}/{total} chunks left).")
+        if now - warned_at >= warn_interval:
+            warned_at = now
+            print(f"⚠️ No worker has taken a chunk for {now - idle_since:.0f}s. Start workers with "
+                  f"'python -m autosub_mac.distributed {queue.spool_dir}'.", file=sys.stderr)
+        time.sleep(poll_interval)
+
+
+def transcribe_distributed(args, video_path: str, base_name: str, model_name: str, params: Dict,
+                           poll_interval: float = 2.0) -> 'SegmentStore':
+    """
+    Coordinator side: split the audio into the spool, queue one task per chunk, wait for
+    the workers, re-queue expired leases, and merge the chunk results into one timeline.
+    """
+    if args.segment_duration <= 0:
+        raise ValueError("--distribute needs chunks: set --segment-duration.")
+    from .audio import extract_audio, split_audio, chunk_start_times
+    from .transcriber import merge_chunks
+
+    queue = WorkQueue(args.distribute)
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(args.distribute, job_id)
+    os.makedirs(job_dir)
+    try:
+        main_audio_file = extract_audio(video_path, os.path.join(job_dir, f"{base_name}.wav"))
+        chunk_paths = split_audio(main_audio_file, args.segment_duration)
+        offsets = chunk_start_times(chunk_paths)
+        os.remove(main_audio_file)
+
+        queue.create_job(job_id, model_name, params, [os.path.relpath(path, args.distribute) for path in chunk_paths],
+                         max_attempts=args.max_attempts)
+        total = len(chunk_paths)
+        print(f"🗂️  Queued {total} chunks as job {job_id} in {args.distribute}, waiting for workers...")
+
+        _wait_for_workers(queue, job_id, total, poll_interval, args.worker_timeout)
+
+        results, failed = queue.results(job_id)
+        for index, error in sorted(failed.items()):
+            print(f"❌ Chunk {index} failed on every attempt: {error}", file=sys.stderr)
+    finally:
+        queue.delete_job(job_id)
+        queue.close()
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    return merge_chunks(results, offsets)
+
+
+def run_worker(spool_dir: str, worker_id: Optional[str] = None, lease_sec: float = 60.0,
+               poll_interval: float = 2.0, idle_timeout: float = 0.0, cache_dir: Optional[str] = None,
+               n_threads: Optional[int] = None) -> int:
+    """
+    Worker side: claim chunks from the spool queue until idle_timeout seconds pass without work
+    (0 = forever). Models are loaded once per model name and kept. Returns the chunks completed.
+    """
+    from .transcriber import WhisperTranscriber
+
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    cache_dir = cache_dir or default_cache_dir()
+    queue = WorkQueue(spool_dir)
+    transcript_cache = TranscriptCache(os.path.join(cache_dir, "transcripts"))
+    transcribers: Dict[str, 'WhisperTranscriber'] = {}
+    completed = 0
+    idle_since = time.time()
+    print(f"👷 Worker {worker_id} polling {spool_dir}...")
+
+    try:
+        while True:
+            task = queue.claim(worker_id, lease_sec)
+            if task is None:
+                if idle_timeout and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            print(f"▶️ Chunk {task['index']} of job {task['job_id'][:8]}...")
+            stop = threading.Event()
+
+            def keep_alive(task=task, stop=stop):
+                while not stop.wait(lease_sec / 3):
+                    if not queue.heartbeat(task, lease_sec):
+                        print(f"⚠️ Lost the lease on chunk {task['index']}.", file=sys.stderr)
+                        return
+
+            heartbeat = threading.Thread(target=keep_alive, daemon=True)
+            heartbeat.start()
+            try:
+                transcriber = transcribers.get(task['model'])
+                if transcriber is None:
+                    transcriber = WhisperTranscriber(model_name=task['model'], n_threads=n_threads, load_model=False,
+                                                     cache=transcript_cache, models_dir=os.path.join(cache_dir, "models"))
+                    transcribers[task['model']] = transcriber
+                transcriber.params = dict(task['params'])
+                segments = transcriber.transcribe(os.path.join(spool_dir, task['audio_path']))
+            except Exception as e:
+                print(f"❌ Chunk {task['index']} failed: {e}", file=sys.stderr)
+                queue.fail(task, str(e))
+            else:
+                queue.complete(task, segments)
+                completed += 1
+            finally:
+                stop.set()
+                heartbeat.join()
+            idle_since = time.time()
+    except KeyboardInterrupt:
+        # The coordinator re-queues whatever this worker held once the lease expires
+        print("👋 Worker stopping.")
+    finally:
+        queue.close()
+    print(f"✅ Worker {worker_id} done: {completed} chunks.")
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed transcription worker: claims chunks from a shared spool queue.")
+    parser.add_argument("spool", help="Spool directory shared with the coordinator (main.py --distribute).")
+    parser.add_argument("--worker-id", help="Name shown in the queue. Defaults to <hostname>:<pid>.")
+    parser.add_argument("--lease", type=float, default=60.0, help="Seconds a claimed chunk stays ours without a heartbeat. Heartbeats are sent every third of it. Defaults to 60.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between polls of an empty queue. Defaults to 2.")
+    parser.add_argument("--idle-timeout", type=float, default=0.0, help="Exit after this many seconds without work. 0 (default) runs until interrupted.")
+    parser.add_argument("--n-threads", type=int, default=None, help="whisper.cpp threads. Defaults to all cores.")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Directory for downloaded models and the transcript cache.")
+    args = parser.parse_args()
+
+    run_worker(args.spool, args.worker_id, args.lease, args.poll_interval, args.idle_timeout, args.cache_dir,
+               args.n_threads)
+
+
+if __name__ == "__main__":
+    main()
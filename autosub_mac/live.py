@@ -0,0 +1,103 @@
+import contextlib
+import os
+import sys
+from typing import Iterator, List
+
+import numpy as np
+
+from .audio import SAMPLE_RATE
+from .models import resolve_model
+from .transcriber import WhisperTranscriber
+from .utils import SubtitleStreamWriter
+from .progress import progress
+
+
+def open_pcm_stream(source: str, sample_rate: int = SAMPLE_RATE, follow: bool = False, realtime: bool = False):
+    """
+    Start an ffmpeg process decoding `source` to 16kHz mono float32 PCM on its stdout.
+
+    source is a file, a URL ffmpeg can read, or '-' for this process's stdin.
+    follow keeps reading a file that is still being written instead of stopping at its current end.
+    realtime reads the input at its native rate (ffmpeg -re), to simulate a live feed from a file.
+    """
+    import ffmpeg
+
+    input_kwargs = {}
+    if follow:
+        input_kwargs['follow'] = 1
+    if realtime:
+        input_kwargs['re'] = None
+
+    stream = ffmpeg.input('pipe:0' if source == '-' else source, **input_kwargs)
+    global_args = ['-loglevel', 'error']
+    if source != '-':
+        # Don't let ffmpeg swallow keystrokes meant for the terminal
+        global_args.append('-nostdin')
+    # stderr is left attached to ours: an unread pipe would eventually block ffmpeg
+    return (
+        stream
+        .output('pipe:', format='f32le', acodec='pcm_f32le', ac=1, ar=str(sample_rate))
+        .global_args(*global_args)
+        .run_async(pipe_stdout=True)
+    )
+
+
+def read_pcm_blocks(process, block_sec: float = 0.5, sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """
+    Yield float32 sample blocks of block_sec from an ffmpeg process started by open_pcm_stream,
+    until its output ends or the user interrupts. The process is stopped when done.
+    """
+    block_bytes = max(1, int(block_sec * sample_rate)) * 4
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)
+    except KeyboardInterrupt:
+        print("⏹️  Stopped, flushing the last captions...", file=sys.stderr)
+    finally:
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+
+
+def run_live(args) -> List[str]:
+    """
+    Caption a growing file, a pipe or stdin as the audio arrives.
+    Final segments are written to --output (SRT or VTT) or to stdout, one cue at a time.
+    Returns the written paths (empty when writing to stdout).
+    """
+    fmt = args.live_format
+    if fmt is None:
+        fmt = "vtt" if args.output and args.output.lower().endswith(".vtt") else "srt"
+
+    with contextlib.ExitStack() as stack:
+        if args.output:
+            sink = stack.enter_context(open(args.output, 'w', encoding='utf-8'))
+        else:
+            # Captions own stdout; status messages go to stderr
+            sink = sys.stdout
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+        writer = SubtitleStreamWriter(sink, fmt)
+
+        transcriber = WhisperTranscriber(model_name=resolve_model(args.model, args.quant), n_threads=args.n_threads,
+                                         load_model=False, models_dir=os.path.join(args.cache_dir, "models"))
+        if args.source_lang != 'auto':
+            transcriber.params['language'] = args.source_lang
+        # Load before opening the stream, so the first window isn't delayed by it
+        transcriber.ensure_model_loaded()
+
+        print(f"🔴 Live captioning {'stdin' if args.video_path == '-' else args.video_path} "
+              f"(latency target {args.latency}s, window {args.window}s)...")
+        process = open_pcm_stream(args.video_path, follow=args.follow, realtime=args.realtime)
+        blocks = read_pcm_blocks(process, block_sec=min(0.5, args.latency / 4))
+
+        progress.start_stage("live", unit="segment")
+        for segment in transcriber.transcribe_stream(blocks, latency_sec=args.latency, window_sec=args.window):
+            writer.write(segment)
+            progress.emit("segment", start=segment['start'], end=segment['end'], text=segment['text'].strip())
+        progress.end_stage("live")
+
+    print(f"✨ Done! {writer.count} captions written.")
+    return [args.output] if args.output else []
@@ -1,101 +1,600 @@
 import argparse
+import concurrent.futures
+import contextlib
 import os
+import shutil
 import sys
-from .audio import extract_audio, split_audio
-from .transcriber import WhisperTranscriber
-from .translator import SubtitleTranslator
-from .utils import write_srt
+import tempfile
+import wave
+from typing import TYPE_CHECKING, List, Dict, Optional, Union
+# audio, transcriber and segments pull in numpy, so they're imported where they're used:
+# --help and --server submissions never touch them
+from .translator import SubtitleTranslator, same_language
+from .utils import write_subtitles, SUBTITLE_FORMATS
+from .cache import TranslationCache, TranscriptCache, default_cache_dir
+from .models import ALL_QUANTIZATIONS, resolve_model
+from .autotune import load_tuning
+from .backends import translation_providers
+from .checkpoint import JobManifest, translate_with_checkpoints
+from .metrics import metrics
+from .progress import progress
 
-def main():
+if TYPE_CHECKING:
+    from .segments import SegmentStore
+    from .transcriber import WhisperTranscriber
+
+def _cleanup(paths):
+    for f in paths:
+        if os.path.isdir(f):
+            shutil.rmtree(f, ignore_errors=True)
+        elif os.path.exists(f):
+            os.remove(f)
+
+def _parse_langs(value: str) -> List[str]:
+    """'en,fr, de' -> ['en', 'fr', 'de'] (duplicates dropped, order kept)"""
+    return list(dict.fromkeys(lang.strip() for lang in value.split(",") if lang.strip()))
+
+def parse_formats(value: str) -> List[str]:
+    """'srt,vtt' -> ['srt', 'vtt']. Raises ValueError for unknown formats."""
+    formats = _parse_langs(value.lower())
+    unknown = [fmt for fmt in formats if fmt not in SUBTITLE_FORMATS]
+    if unknown or not formats:
+        raise ValueError(f"Unknown subtitle format(s): {', '.join(unknown) or value!r}. Choose from {', '.join(SUBTITLE_FORMATS)}.")
+    return formats
+
+def check_translation_options(args):
+    """Raises ValueError for --translate-concurrency/--translate-rate values that can't work."""
+    if args.translate_concurrency < 0:
+        raise ValueError("--translate-concurrency must be 0 or more.")
+    if args.translate_rate <= 0:
+        raise ValueError("--translate-rate must be greater than 0.")
+    if args.translate_concurrency > 0 and args.no_batch_translate:
+        raise ValueError("--translate-concurrency only applies to batched requests: drop --no-batch-translate.")
+
+def _in_memory_chunks(args) -> bool:
+    """
+    Whether chunks are cut from decoded samples with --overlap rather than split files.
+    VAD chunks are decoded in memory too, but cut at silences without any overlap.
+    """
+    return not args.vad and (args.in_memory or (args.extract_workers > 0 and args.segment_duration > 0))
+
+def _output_path(args, base_name: str, lang: Optional[str], target_langs: List[str], fmt: str = "srt") -> str:
+    """
+    Subtitle path for one target language, or for the untranslated source (lang=None), in format fmt.
+    Without --output: [<output-dir>/]<video>.<lang>.<fmt> / <video>.<fmt>.
+    With --output: <output> for a single output, otherwise <output>.<lang> / <output>.source, always
+    with fmt as the extension (e.g. --output subs.srt --formats vtt,srt writes subs.vtt and subs.srt).
+    """
+    if not args.output:
+        suffix = f".{lang}" if lang else ""
+        return os.path.join(args.output_dir or "", f"{base_name}{suffix}.{fmt}")
+
+    root = os.path.splitext(args.output)[0]
+    ext = f".{fmt}"
+    output = root + ext
+    if lang is None:
+        return output if not target_langs else f"{root}.source{ext}"
+    return output if len(target_langs) == 1 else f"{root}.{lang}{ext}"
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Auto-Subtitle Generator for macOS (WhisperCPP)")
-    parser.add_argument("video_path", help="Path to the video file")
-    parser.add_argument("--model", default="base", help="Whisper model size (tiny, base, small, medium, large)")
-    parser.add_argument("--lang", default="en", help="Target language for translation. Defaults to 'en'.")
-    parser.add_argument("--provider", default="google", choices=["google", "deepl"], help="Translation provider. Defaults to 'google'.")
+    parser.add_argument("video_path", help="Path to the video file, or a directory / quoted glob pattern to process many files (batch mode)")
+    parser.add_argument("--model", default="base", help="Whisper model: tiny, base, small, medium, large-v1/v2/v3 (large = large-v3), large-v3-turbo, an English-only variant such as 'base.en', or a path to a ggml file. Models are downloaded to <cache dir>/models and verified by sha256.")
+    parser.add_argument("--quant", choices=list(ALL_QUANTIZATIONS), help="Use a quantized build of --model (e.g. q5_0, q8_0): smaller and much faster on CPU, at a small accuracy cost. Not every size has every quantization.")
+    parser.add_argument("--source-lang", default="auto", help="Spoken language of the video (e.g. 'en', 'ja'). Pinned for every chunk and used as the translation source; targets in the same language are not translated. 'auto' (default) detects it once on a sample from the middle of the audio.")
+    parser.add_argument("--lang", default="en", help="Target language(s) for translation, comma-separated (e.g. 'en,fr,de,ja'). Transcription runs once and the languages are translated concurrently. Defaults to 'en'.")
+    parser.add_argument("--provider", default="google", choices=translation_providers(), help="Translation provider. Defaults to 'google'.")
     parser.add_argument("--api-key", help="API Key for translation provider (required for DeepL).")
-    parser.add_argument("--output", help="Output SRT file path.")
+    parser.add_argument("--output", help="Output subtitle file path. Its extension is replaced by each format's (see --formats). With several languages, '.<lang>' is inserted before the extension.")
+    parser.add_argument("--formats", default="srt", help="Comma-separated output formats: srt, vtt (WebVTT), json (a list of {start, end, text}). Defaults to 'srt'.")
+    parser.add_argument("--output-dir", help="Directory for subtitle files named after the video (when --output isn't given). Defaults to the current directory.")
+    parser.add_argument("--source-srt", action="store_true", help="Also write the untranslated transcription, in every --formats format (e.g. <video>.srt and <video>.vtt next to the translations).")
     parser.add_argument("--no-translate", action="store_true", help="Skip translation.")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Directory for on-disk caches (transcripts and translation memory). Defaults to ~/.cache/autosub_mac.")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the transcript cache or the translation memory.")
+    parser.add_argument("--no-batch-translate", action="store_true", help="Send one translation request per segment instead of packing many segments into each request.")
+    parser.add_argument("--translate-concurrency", type=int, default=0, help="Send up to N translation requests at once over one pooled HTTP connection set (asyncio, needs httpx), retrying 429s with jittered backoff that honours Retry-After. Only for batched requests (not with --no-batch-translate) to the google and deepl providers. 0 (default) sends them one after another.")
+    parser.add_argument("--translate-rate", type=float, default=5.0, help="With --translate-concurrency: at most this many requests per second per target language. Defaults to 5.")
     
     # New args
-    parser.add_argument("--segment-duration", type=int, default=0, help="Split audio into chunks of N seconds. 0 (default) means no splitting.")
-    parser.add_argument("--threads", type=int, default=1, help="Number of parallel threads for transcription. Defaults to 1. Only effective if segment-duration > 0.")
-    
-    args = parser.parse_args()
+    parser.add_argument("--segment-duration", type=int, default=None, help="Split audio into chunks of N seconds. 0 means no splitting. Defaults to the autotuned chunk length when the autotuned worker count is used, otherwise 0.")
+    parser.add_argument("--in-memory", action="store_true", help="Decode audio through ffmpeg's stdout into memory and transcribe chunks from that buffer. No temporary WAV files are written.")
+    parser.add_argument("--overlap", type=float, default=0.0, help="Seconds of audio shared by consecutive chunks (with --in-memory, not with --vad). Duplicated segments in the overlap are stitched away, so short chunks (30-60s) don't break sentences. Defaults to 0.")
+    parser.add_argument("--extract-workers", type=int, default=0, help="Decode --segment-duration chunks in parallel, each with its own ffmpeg seeking to its time range, and start transcribing each chunk as soon as it is decoded. N ffmpeg processes (0 = off, the default). Implies --in-memory.")
+    parser.add_argument("--vad", action="store_true", help="Cut audio into speech chunks at silences and skip silent stretches. Chunks are at most --segment-duration seconds (30 if unset). Implies --in-memory.")
+    parser.add_argument("--vad-threshold", type=float, default=-40.0, help="Frame loudness (dBFS) below which audio counts as silence. Defaults to -40.")
+    parser.add_argument("--threads", type=int, default=None, help="Number of parallel transcription workers. Values > 1 run chunks in a process pool, each worker with its own model and an equal share of CPU cores. Only effective if segment-duration > 0. Defaults to the autotuned value for this model and host (python -m autosub_mac.autotune), otherwise 1.")
+    parser.add_argument("--n-threads", type=int, default=None, help="whisper.cpp threads per worker. Defaults to the autotuned value, otherwise all cores split evenly between the workers.")
+    parser.add_argument("--checkpoint", action="store_true", help="Record per-chunk progress in a job manifest and save each chunk's segments to disk as soon as it finishes.")
+    parser.add_argument("--resume", action="store_true", help="Resume a checkpointed job from its last completed chunk (implies --checkpoint).")
+    parser.add_argument("--checkpoint-dir", help="Directory in which to keep the job manifest, in a .<video name>.autosub subdirectory. Defaults to the output's directory.")
+    parser.add_argument("--distribute", metavar="SPOOL", help="Coordinator mode: split the audio into SPOOL, a directory shared with the worker nodes, and let workers (python -m autosub_mac.distributed SPOOL) transcribe the chunks. Needs --segment-duration.")
+    parser.add_argument("--max-attempts", type=int, default=3, help="With --distribute: times a chunk is handed out (failures and expired leases) before it is given up. Defaults to 3.")
+    parser.add_argument("--worker-timeout", type=float, default=0.0, help="With --distribute: give up when no worker has taken a chunk for this many seconds. 0 (default) waits forever, warning every minute.")
+    parser.add_argument("--batch-queue", type=int, default=2, help="Batch mode: max files waiting between pipeline stages (bounds memory for decoded audio). Defaults to 2.")
+    parser.add_argument("--metrics-json", help="Write a timing/resource report (wall and CPU time per stage and chunk, peak RSS, translation request/retry/sleep counts) to this JSON file.")
+    parser.add_argument("--profile", metavar="DIR", help="Profile the hot stages (decoding, transcription, translation) with cProfile and write <stage>.prof files to DIR.")
+    parser.add_argument("--progress-fd", type=int, help="Write JSON-lines progress events (stage, done/total, rate, ETA) to this already-open file descriptor.")
+    parser.add_argument("--progress-file", help="Append JSON-lines progress events to this file (or named pipe).")
+    parser.add_argument("--live", action="store_true", help="Streaming mode: caption video_path as the audio arrives (a growing file with --follow, a stream URL, or '-' for stdin) and write each final cue to --output (SRT or VTT) or stdout right away. Captions are not translated.")
+    parser.add_argument("--follow", action="store_true", help="Live mode: keep reading a file that is still being recorded.")
+    parser.add_argument("--realtime", action="store_true", help="Live mode: read the input at its native speed, to simulate a live feed from a finished file.")
+    parser.add_argument("--latency", type=float, default=5.0, help="Live mode: target delay in seconds between the end of an utterance and its caption. Smaller values re-run Whisper more often. Defaults to 5.")
+    parser.add_argument("--window", type=float, default=30.0, help="Live mode: longest stretch of audio (seconds) held back before its captions are forced out. Defaults to 30.")
+    parser.add_argument("--live-format", choices=["srt", "vtt"], help="Live mode: caption format. Defaults to vtt for a .vtt --output, srt otherwise.")
+    parser.add_argument("--server", help="Submit the job to a running transcription service (e.g. http://127.0.0.1:8765, see autosub_mac.service) instead of running it in this process.")
+    return parser
 
-    video_path = args.video_path
-    if not os.path.exists(video_path):
-        print(f"❌ Error: Video file '{video_path}' does not exist.")
-        sys.exit(1)
+def prepare_audio(args, video_path: str, base_name: str):
+    """
+    Steps 1-2: extract (and optionally split) the audio.
+    Returns (inputs, chunk_offsets, temp_files): the files or sample arrays to transcribe
+    (or a ParallelChunkExtractor with --extract-workers), their exact start times (None for
+    a single unsplit input) and the temp files and directories to clean up.
+    """
+    from .audio import (extract_audio, split_audio, load_audio, split_samples, detect_speech_chunks,
+                        chunk_start_times, ParallelChunkExtractor)
 
-    base_name = os.path.splitext(os.path.basename(video_path))[0]
-    
-    # 1. Extract Audio
     audio_files_to_process = []
-    main_audio_file = f"temp_{base_name}.wav"
-    try:
-        extract_audio(video_path, main_audio_file)
-    except Exception:
-        sys.exit(1)
+    chunk_offsets = None
+    temp_files = []
+    if args.extract_workers > 0 and args.segment_duration > 0 and not args.vad:
+        # Seek-based parallel decode: chunks are handed to the transcriber as they become ready
+        extractor = ParallelChunkExtractor(video_path, args.segment_duration, overlap_sec=args.overlap,
+                                           workers=args.extract_workers)
+        return extractor, extractor.offsets, temp_files
+    if args.in_memory or args.vad:
+        # Decode straight into memory: no temp WAV, no chunk files, nothing to clean up
+        audio = load_audio(video_path)
 
-    # 2. Split Audio (Optional)
-    temp_chunks = []
-    if args.segment_duration > 0:
+        # 2. Split Audio (Optional) - chunks are views into the decoded buffer
+        if args.vad:
+            max_chunk = args.segment_duration if args.segment_duration > 0 else 30
+            speech_chunks = detect_speech_chunks(audio, max_chunk_sec=max_chunk, threshold_db=args.vad_threshold)
+            if not speech_chunks:
+                print("⚠️ No speech detected.")
+            audio_files_to_process = [c['audio'] for c in speech_chunks]
+            chunk_offsets = [c['start'] for c in speech_chunks]
+        elif args.segment_duration > 0:
+            chunks = split_samples(audio, args.segment_duration, overlap_sec=args.overlap)
+            audio_files_to_process = [c['audio'] for c in chunks]
+            chunk_offsets = [c['start'] for c in chunks]
+        else:
+            audio_files_to_process = [audio]
+    else:
+        # A directory of its own per file: batch mode extracts several files with the same name at once
+        work_dir = tempfile.mkdtemp(prefix=f"autosub_{base_name}_")
+        temp_files.append(work_dir)
+        main_audio_file = os.path.join(work_dir, f"{base_name}.wav")
         try:
-            temp_chunks = split_audio(main_audio_file, args.segment_duration)
-            audio_files_to_process = temp_chunks
+            extract_audio(video_path, main_audio_file)
         except Exception:
-             # Fallback to main audio if split fails?
-             print("⚠️ Splitting failed, falling back to single file processing.")
-             audio_files_to_process = [main_audio_file]
-    else:
-        audio_files_to_process = [main_audio_file]
+            _cleanup(temp_files)
+            raise
 
-    # 3. Transcribe
-    try:
-        transcriber = WhisperTranscriber(model_name=args.model)
-        
-        if len(audio_files_to_process) > 1:
-            print(f"🏎️  Running parallel transcription on {len(audio_files_to_process)} chunks with {args.threads} threads...")
-            segments = transcriber.transcribe_batch(
-                audio_files_to_process, 
-                max_workers=args.threads, 
-                offset_seconds=args.segment_duration
-            )
+        # 2. Split Audio (Optional)
+        if args.segment_duration > 0:
+            try:
+                temp_chunks = split_audio(main_audio_file, args.segment_duration)
+                audio_files_to_process = temp_chunks
+                chunk_offsets = chunk_start_times(temp_chunks)
+            except Exception:
+                 # Fallback to main audio if split fails?
+                 print("⚠️ Splitting failed, falling back to single file processing.")
+                 audio_files_to_process = [main_audio_file]
         else:
-            segments = transcriber.transcribe(audio_files_to_process[0])
-            
-    except Exception:
-        # Cleanup
-        if os.path.exists(main_audio_file): os.remove(main_audio_file)
-        for f in temp_chunks: 
-            if os.path.exists(f): os.remove(f)
-        sys.exit(1)
+            audio_files_to_process = [main_audio_file]
 
-    # 4. Translate (Optional)
-    final_segments = segments
-    if not args.no_translate:
+    return audio_files_to_process, chunk_offsets, temp_files
+
+def apply_tuning(args):
+    """
+    Fill in --threads, --n-threads and --segment-duration the user left unset from the
+    configuration autotuned for this model on this host (if any).
+    """
+    tuned = load_tuning(resolve_model(args.model, args.quant), args.cache_dir) or {}
+    if args.threads is None:
+        args.threads = tuned.get('workers', 1)
+    # The tuned thread and chunk sizes were measured for the tuned worker count only
+    matches_tuning = bool(tuned) and args.threads == tuned['workers']
+    if args.n_threads is None and matches_tuning:
+        args.n_threads = tuned['n_threads']
+    if args.segment_duration is None:
+        args.segment_duration = tuned['segment_duration'] if matches_tuning and args.threads > 1 else 0
+    if tuned:
+        print(f"🔧 Using autotuned settings: {args.threads} workers x {args.n_threads or 'auto'} threads, "
+              f"{args.segment_duration}s chunks.")
+
+def create_transcriber(args) -> 'WhisperTranscriber':
+    from .transcriber import WhisperTranscriber
+
+    # The model is loaded on first use: not at all when every chunk is cached,
+    # and only in the workers when the process pool is used
+    transcript_cache = None if args.no_cache else TranscriptCache(os.path.join(args.cache_dir, "transcripts"))
+    return WhisperTranscriber(model_name=resolve_model(args.model, args.quant), n_threads=args.n_threads,
+                              load_model=False, cache=transcript_cache,
+                              models_dir=os.path.join(args.cache_dir, "models"))
+
+def open_manifest(args, video_path: str, base_name: str) -> JobManifest:
+    """
+    Checkpoint for this video and these settings, in .<video>.autosub under --checkpoint-dir,
+    or next to its outputs. Always a subdirectory of its own: the manifest deletes its files.
+    """
+    parent = args.checkpoint_dir
+    if not parent:
+        parent = os.path.dirname(args.output) if args.output else (args.output_dir or "")
+    directory = os.path.join(parent, f".{base_name}.autosub")
+    stat = os.stat(video_path)
+    fingerprint = {
+        'video': os.path.abspath(video_path),
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'model': args.model,
+        'segment_duration': args.segment_duration,
+        'overlap': args.overlap,
+        'in_memory': _in_memory_chunks(args),
+        'vad': args.vad,
+        'vad_threshold': args.vad_threshold,
+        'source_lang': args.source_lang,
+    }
+    return JobManifest(directory, fingerprint, resume=args.resume)
+
+# Below this probability the detected language isn't trusted for the whole video
+MIN_LANGUAGE_PROBABILITY = 0.5
+# Whisper detects the language from 30 seconds of audio
+LANGUAGE_DETECTION_SEC = 30
+
+def _detection_sample(inputs):
+    """Middle input of the job and an offset centring the detection window in it."""
+    if hasattr(inputs, 'decode_chunk'):
+        sample = inputs.decode_chunk(len(inputs) // 2)
+    else:
+        sample = inputs[len(inputs) // 2]
+    if isinstance(sample, str):
+        try:
+            with wave.open(sample) as wav:
+                duration = wav.getnframes() / wav.getframerate()
+        except (OSError, wave.Error):
+            duration = 0.0
+    else:
+        from .audio import SAMPLE_RATE
+
+        duration = len(sample) / SAMPLE_RATE
+    return sample, max(0.0, (duration - LANGUAGE_DETECTION_SEC) / 2)
+
+def pin_language(args, transcriber: 'WhisperTranscriber', inputs, manifest: Optional[JobManifest] = None) -> Optional[str]:
+    """
+    Step 2b: settle the spoken language once for the whole job and pin it for every chunk,
+    so Whisper doesn't detect it again per chunk. Returns the language code, or None when
+    it can't be determined confidently (Whisper then detects it per chunk as before).
+    inputs is None when no audio was extracted (resumed job with every chunk transcribed).
+    """
+    transcriber.params.pop('language', None)
+    if args.source_lang != 'auto':
+        language = args.source_lang
+    elif '.en' in os.path.basename(transcriber.model_name):
+        language = 'en'
+    elif manifest is not None and manifest.language:
+        language = manifest.language
+    elif not inputs:
+        # Nothing to listen to: no speech found, or every chunk was transcribed by an earlier run
+        language = None
+    else:
         try:
-            translator = SubtitleTranslator(target_lang=args.lang, provider=args.provider, api_key=args.api_key)
-            final_segments = translator.translate_segments(segments)
+            sample, offset = _detection_sample(inputs)
+            language, probability = transcriber.detect_language(sample, offset_sec=offset)
         except Exception as e:
-            print(f"⚠️ Translation failed: {e}. Falling back to original transcription.")
+            print(f"⚠️ Language detection failed ({e}), detecting per chunk.")
+            language = None
+        else:
+            if probability < MIN_LANGUAGE_PROBABILITY:
+                print(f"⚠️ Language unclear ('{language}', p={probability:.2f}), detecting per chunk.")
+                language = None
+            else:
+                print(f"🗣️  Detected language: {language} (p={probability:.2f})")
 
-    # 5. Write SRT
-    if args.output:
-        output_srt = args.output
+    if language:
+        transcriber.params['language'] = language
+    if manifest is not None:
+        manifest.set_language(language)
+    return language
+
+def _uses_process_pool(args, audio_files_to_process) -> bool:
+    return args.threads > 1 and len(audio_files_to_process) > 1
+
+def release_for_workers(args, transcriber: 'WhisperTranscriber', audio_files_to_process):
+    """Free a model loaded only to detect the language before every worker process loads its own copy."""
+    if _uses_process_pool(args, audio_files_to_process):
+        transcriber.release_model()
+
+def transcribe_inputs(args, transcriber: 'WhisperTranscriber', audio_files_to_process, chunk_offsets,
+                      manifest: Optional[JobManifest] = None) -> 'SegmentStore':
+    """Step 3: transcribe the prepared inputs into one timeline of segments."""
+    if manifest is not None:
+        # Checkpointed: every chunk (even a single unsplit input) is persisted as it finishes
+        return transcriber.transcribe_batch(
+            audio_files_to_process,
+            max_workers=args.threads,
+            executor="process" if _uses_process_pool(args, audio_files_to_process) else "sequential",
+            offsets=manifest.offsets,
+            overlap_seconds=args.overlap if _in_memory_chunks(args) else 0.0,
+            completed=manifest.completed_transcripts(),
+            chunk_callback=manifest.save_transcript
+        )
+    if len(audio_files_to_process) > 1 or chunk_offsets is not None:
+        use_process_pool = _uses_process_pool(args, audio_files_to_process)
+        print(f"🏎️  Running parallel transcription on {len(audio_files_to_process)} chunks with {args.threads} workers...")
+        return transcriber.transcribe_batch(
+            audio_files_to_process, 
+            max_workers=args.threads, 
+            offset_seconds=args.segment_duration,
+            executor="process" if use_process_pool else "sequential",
+            offsets=chunk_offsets,
+            overlap_seconds=args.overlap if _in_memory_chunks(args) else 0.0
+        )
+    from .segments import SegmentStore
+
+    return SegmentStore.from_dicts(transcriber.transcribe(audio_files_to_process[0]))
+
+def translate_all(args, segments: Union[List[Dict], 'SegmentStore'], manifest: Optional[JobManifest] = None,
+                  source_lang: Optional[str] = None) -> Dict[str, 'SegmentStore']:
+    """
+    Step 4: translate one transcription into every target language in parallel.
+    With a known source_lang, it's passed to the provider explicitly, and target languages
+    that are the same as the audio get the transcription as-is. Every language shares the
+    transcription's timings; only the texts are new.
+    """
+    target_langs = [] if args.no_translate else _parse_langs(args.lang)
+    outputs = {}
+    if not target_langs:
+        return outputs
+    from .segments import SegmentStore
+
+    store = segments if isinstance(segments, SegmentStore) else SegmentStore.from_dicts(segments)
+    if source_lang:
+        for lang in target_langs:
+            if same_language(source_lang, lang):
+                print(f"⏩ Audio is already in '{source_lang}', not translating to '{lang}'.")
+                outputs[lang] = store
+        target_langs = [lang for lang in target_langs if lang not in outputs]
+    if not target_langs:
+        return outputs
+
+    cache = None
+    if not args.no_cache:
+        cache = TranslationCache(os.path.join(args.cache_dir, "translations.sqlite"))
+
+    def translate_to(lang):
+        translator = SubtitleTranslator(target_lang=lang, provider=args.provider, api_key=args.api_key,
+                                        batch=not args.no_batch_translate, cache=cache, source_lang=source_lang,
+                                        concurrency=args.translate_concurrency, rate=args.translate_rate)
+        if manifest is not None:
+            return SegmentStore.from_dicts(translate_with_checkpoints(translator, manifest, segments))
+        return translator.translate_segments(store)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(target_langs)) as pool:
+        futures = {lang: pool.submit(translate_to, lang) for lang in target_langs}
+        for lang, future in futures.items():
+            try:
+                outputs[lang] = future.result()
+            except Exception as e:
+                print(f"⚠️ Translation to '{lang}' failed: {e}. Falling back to original transcription.")
+                outputs[lang] = store
+
+    if cache is not None:
+        print(f"♻️  Translation cache: {cache.hits} hits, {cache.misses} misses.")
+        cache.close()
+    return outputs
+
+def write_outputs(args, base_name: str, segments: Union[List[Dict], 'SegmentStore'],
+                  outputs: Dict[str, 'SegmentStore']) -> List[str]:
+    """Step 5: one file per target language and --formats entry, plus the untranslated source if requested."""
+    from .segments import SegmentStore
+
+    target_langs = list(outputs)
+    tracks = dict(outputs)
+    if not target_langs or args.source_srt:
+        tracks = {None: segments if isinstance(segments, SegmentStore) else SegmentStore.from_dicts(segments),
+                  **tracks}
+    written = []
+    for lang, store in tracks.items():
+        for fmt in parse_formats(args.formats):
+            written.append(_output_path(args, base_name, lang, target_langs, fmt))
+            write_subtitles(store, written[-1], fmt)
+    return written
+
+def run(args, transcriber: Optional['WhisperTranscriber'] = None, transcriber_lock=None) -> List[str]:
+    """
+    Run the whole pipeline for one video. Returns the paths of the subtitle files written.
+    Raises on failure instead of exiting, so it can run inside a long-lived service;
+    pass a transcriber to reuse an already loaded model, and a transcriber_lock (a context
+    manager) to hold while it's in use. Extraction, translation and writing run outside it.
+    """
+    video_path = args.video_path
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video file '{video_path}' does not exist.")
+
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+
+    if args.overlap > 0 and not _in_memory_chunks(args):
+        print("⚠️ --overlap only applies to fixed-length --in-memory chunks (not --vad), ignoring it.")
+
+    if args.distribute:
+        segments, language = _transcribe_on_workers(args, video_path, base_name)
+        written = _translate_and_write(args, base_name, segments, language)
+        print("✨ Done!")
+        return written
+
+    manifest = open_manifest(args, video_path, base_name) if args.checkpoint or args.resume else None
+    extracted = True
+    if manifest is not None and manifest.is_fully_transcribed():
+        print("⏩ All chunks already transcribed, skipping audio extraction.")
+        audio_files_to_process, chunk_offsets, temp_files = [None] * len(manifest.offsets), manifest.offsets, []
+        extracted = False
     else:
-        suffix = f".{args.lang}" if not args.no_translate else ""
-        output_srt = f"{base_name}{suffix}.srt"
-        
-    write_srt(final_segments, output_srt)
-    
-    # Final Cleanup
-    if os.path.exists(main_audio_file):
-        os.remove(main_audio_file)
-    for f in temp_chunks:
-        if os.path.exists(f): os.remove(f)
-    
+        progress.start_stage("extract")
+        audio_files_to_process, chunk_offsets, temp_files = prepare_audio(args, video_path, base_name)
+        progress.end_stage("extract")
+        if manifest is not None:
+            manifest.set_offsets(chunk_offsets if chunk_offsets is not None else [0.0])
+
+    try:
+        owns_transcriber = transcriber is None
+        if owns_transcriber:
+            transcriber = create_transcriber(args)
+        with transcriber_lock or contextlib.nullcontext():
+            language = pin_language(args, transcriber, audio_files_to_process if extracted else None, manifest)
+            if owns_transcriber:
+                release_for_workers(args, transcriber, audio_files_to_process)
+            progress.start_stage("transcribe", total=len(audio_files_to_process), unit="chunk")
+            with metrics.stage("transcribe", inputs=len(audio_files_to_process)):
+                segments = transcribe_inputs(args, transcriber, audio_files_to_process, chunk_offsets, manifest)
+            progress.end_stage("transcribe")
+    finally:
+        _cleanup(temp_files)
+
+    written = _translate_and_write(args, base_name, segments, language, manifest)
+    if manifest is not None:
+        if manifest.is_fully_transcribed():
+            manifest.remove()
+        else:
+            print(f"⚠️ Some chunks failed. Progress is kept in {manifest.directory}, re-run with --resume to retry them.")
+    print("✨ Done!")
+    return written
+
+def _translate_and_write(args, base_name: str, segments: 'SegmentStore', language: Optional[str],
+                         manifest: Optional[JobManifest] = None) -> List[str]:
+    with metrics.stage("translate"):
+        outputs = translate_all(args, segments, manifest, source_lang=language)
+    progress.start_stage("write")
+    with metrics.stage("write_srt", segments=len(segments)):
+        written = write_outputs(args, base_name, segments, outputs)
+    progress.end_stage("write")
+    return written
+
+def _transcribe_on_workers(args, video_path: str, base_name: str):
+    """Steps 1-3 on a cluster: chunks are transcribed by distributed workers (see distributed.py)."""
+    from .distributed import transcribe_distributed
+
+    if args.checkpoint or args.resume:
+        print("⚠️ --checkpoint doesn't apply with --distribute (the spool queue keeps chunk progress), ignoring it.")
+    # The coordinator doesn't load a model, so the language is only pinned when given
+    language = args.source_lang if args.source_lang != 'auto' else None
+    params = {'language': language} if language else {}
+    progress.start_stage("transcribe", unit="chunk")
+    with metrics.stage("transcribe", distributed=True):
+        segments = transcribe_distributed(args, video_path, base_name, resolve_model(args.model, args.quant), params)
+    progress.end_stage("transcribe")
+    return segments, language
+
+def run_on_server(args) -> int:
+    """Submit the job to a resident service (warm models) and wait for it. Returns an exit code."""
+    from .service import submit_job, wait_for_job
+
+    # Relative paths would resolve against the service's working directory, so anchor them here
+    options = {k: v for k, v in vars(args).items() if k not in ('video_path', 'server')}
+    options['output_dir'] = os.path.abspath(args.output_dir or os.getcwd())
+    if args.output:
+        options['output'] = os.path.abspath(args.output)
+
+    try:
+        job = submit_job(args.server, args.video_path, options)
+        print(f"📨 Submitted job {job['id']} to {args.server}, waiting...")
+        job = wait_for_job(args.server, job['id'])
+    except Exception as e:
+        print(f"❌ Service error: {e}", file=sys.stderr)
+        return 1
+
+    if job['status'] != 'done':
+        print(f"❌ Job failed: {job['error']}", file=sys.stderr)
+        return 1
+    for path in job['outputs']:
+        print(f"✅ SRT file successfully saved to: {path}")
     print("✨ Done!")
+    return 0
+
+def start_metrics(args):
+    metrics.reset()
+    if args.profile:
+        metrics.enable_profiling(args.profile)
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    try:
+        args.model = resolve_model(args.model, args.quant)
+        parse_formats(args.formats)
+        check_translation_options(args)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    from .pipeline import is_batch_input, expand_inputs, output_collisions, run_batch
+    if args.live and args.server:
+        print("❌ Error: --live runs locally and can't be used with --server.")
+        sys.exit(1)
+    if not args.server:
+        # A server applies its own host's tuning
+        apply_tuning(args)
+    if not args.live and is_batch_input(args.video_path):
+        video_paths = expand_inputs(args.video_path)
+        if not video_paths:
+            print(f"❌ Error: No media files found for '{args.video_path}'.")
+            sys.exit(1)
+        if args.output or args.server:
+            print("❌ Error: --output and --server can't be used in batch mode. Use --output-dir instead.")
+            sys.exit(1)
+        collisions = output_collisions(video_paths)
+        if collisions:
+            print("❌ Error: These files would write the same subtitle files (outputs are named after the file):")
+            for paths in collisions.values():
+                print(f"   {', '.join(paths)}")
+            sys.exit(1)
+        # Files overlap in the pipeline: their chunk checkpoints and progress events would collide
+        if args.checkpoint or args.resume or args.progress_fd is not None or args.progress_file:
+            print("❌ Error: --checkpoint, --resume, --progress-fd and --progress-file can't be used in batch mode.")
+            sys.exit(1)
+        # --metrics-json and --profile cover the whole batch
+        start_metrics(args)
+        try:
+            results = run_batch(args, video_paths, queue_size=args.batch_queue)
+        finally:
+            if args.metrics_json:
+                metrics.write_json(args.metrics_json)
+        sys.exit(0 if len(results) == len(video_paths) else 1)
+
+    # Live sources may be stdin or a stream URL
+    if not args.live and not os.path.exists(args.video_path):
+        print(f"❌ Error: Video file '{args.video_path}' does not exist.")
+        sys.exit(1)
+
+    if args.server:
+        # The service runs jobs side by side in one process: these would be per-process, not per-job
+        if args.metrics_json or args.profile or args.progress_fd is not None or args.progress_file:
+            print("❌ Error: --metrics-json, --profile, --progress-fd and --progress-file can't be used with --server.")
+            sys.exit(1)
+        sys.exit(run_on_server(args))
+
+    start_metrics(args)
+    if args.progress_fd is not None:
+        progress.open_fd(args.progress_fd)
+    elif args.progress_file:
+        progress.open_file(args.progress_file)
+    try:
+        if args.live:
+            from .live import run_live
+            written = run_live(args)
+        else:
+            written = run(args)
+        progress.emit("done", outputs=written)
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        progress.emit("error", message=str(e))
+        sys.exit(1)
+    finally:
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        progress.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def _peak_rss_mb(who) -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+class Metrics:
+    """
+    Process-wide timing and resource report.
+    Records wall and CPU time per stage and per chunk, named counters (translation requests,
+    retries, seconds spent sleeping...) and peak RSS, and can wrap hot stages in cProfile.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profile_dir: Optional[str] = None
+        self._profiling = False
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = []
+            self.chunks = []
+            self.counters: Dict[str, float] = {}
+
+    def enable_profiling(self, directory: str):
+        """
+        Profile stages marked profile=True into <directory>/<stage>.prof.
+        One stage is profiled at a time: a stage starting while another is being profiled (nested
+        in it, or on another thread such as a second translation language) isn't, since Python
+        3.12+ refuses a second active profiler.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.profile_dir = directory
+
+    @contextmanager
+    def stage(self, name: str, profile: bool = False, **info):
+        """Time a block: wall time, and CPU time of the whole process (threads and all) during it."""
+        profiler = None
+        if profile and self.profile_dir:
+            profiler = self._start_profiler()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._profiling = False
+                safe_name = name.replace("/", "_").replace(":", "_")
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{safe_name}.prof"))
+            with self._lock:
+                self.stages.append({'stage': name, 'wall_sec': round(wall, 4), 'cpu_sec': round(cpu, 4), **info})
+
+    def _start_profiler(self) -> Optional[cProfile.Profile]:
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active (e.g. the whole run under python -m cProfile)
+            with self._lock:
+                self._profiling = False
+            return None
+        return profiler
+
+    def timed(self, name: str, profile: bool = False):
+        """Decorator form of stage()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(name, profile=profile):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record_chunk(self, index: int, wall_sec: float, cpu_sec: float, **info):
+        with self._lock:
+            self.chunks.append({'chunk': index, 'wall_sec': round(wall_sec, 4), 'cpu_sec': round(cpu_sec, 4), **info})
+
+    def incr(self, name: str, amount: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self) -> Dict:
+        with self._lock:
+            return {
+                'total_wall_sec': round(time.time() - self.started, 3),
+                'peak_rss_mb': _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+                # ffmpeg and transcription worker processes
+                'peak_child_rss_mb': _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+                'stages': list(self.stages),
+                'chunks': sorted(self.chunks, key=lambda c: c['chunk']),
+                'counters': {k: round(v, 4) for k, v in self.counters.items()},
+            }
+
+    def write_json(self, path: str):
+        parent_dir = os.path.dirname(path)
+        if parent_dir and not os.path.exists(parent_dir):
+            os.makedirs(parent_dir)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        print(f"📈 Metrics saved to: {path}")
+
+# Shared by the whole pipeline
+metrics = Metrics()
@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+from typing import List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .cache import default_cache_dir
+from .progress import progress
+
+# ggml models published with whisper.cpp
+MODEL_BASE_URL = "https://huggingface.co/ggerganov/whisper.cpp/resolve/main"
+
+# Quantized builds published for each size (and for its .en variant)
+QUANTIZATIONS = {
+    'tiny': ('q5_1', 'q8_0'),
+    'base': ('q5_1', 'q8_0'),
+    'small': ('q5_1', 'q8_0'),
+    'medium': ('q5_0', 'q8_0'),
+    'large-v1': (),
+    'large-v2': ('q5_0', 'q8_0'),
+    'large-v3': ('q5_0',),
+    'large-v3-turbo': ('q5_0', 'q8_0'),
+}
+ALL_QUANTIZATIONS = ('q5_0', 'q5_1', 'q8_0')
+# Sizes that also come as English-only models (e.g. 'base.en'), faster and more accurate for English
+ENGLISH_ONLY_SIZES = ('tiny', 'base', 'small', 'medium')
+ALIASES = {'large': 'large-v3', 'turbo': 'large-v3-turbo'}
+
+
+class ModelIntegrityError(Exception):
+    """A downloaded model doesn't match its published checksum."""
+
+
+def available_models() -> List[str]:
+    """Every model name resolve_model accepts, e.g. 'base', 'base.en', 'base.en-q5_1'."""
+    names = []
+    for size, quants in QUANTIZATIONS.items():
+        variants = [size, f"{size}.en"] if size in ENGLISH_ONLY_SIZES else [size]
+        for variant in variants:
+            names.append(variant)
+            names.extend(f"{variant}-{quant}" for quant in quants)
+    return names
+
+
+def resolve_model(name: str, quant: Optional[str] = None) -> str:
+    """
+    Canonical ggml model name for a size (optionally '.en') and quantization.
+    'base' + 'q8_0' -> 'base-q8_0', 'large' -> 'large-v3', 'small.en-q5_1' stays as is.
+    A path to an existing ggml file is returned unchanged. Raises ValueError for
+    unknown models and quantizations that aren't published for that size.
+    """
+    if os.path.isfile(name):
+        if quant:
+            raise ValueError("--quant can't be applied to a model file.")
+        return name
+
+    variant, name_quant = re.fullmatch(r"(.+?)(?:-(q\d_\d))?", name).groups()
+    if quant and name_quant and quant != name_quant:
+        raise ValueError(f"Model '{name}' is already quantized as {name_quant}.")
+    quant = quant or name_quant
+
+    english_only = variant.endswith(".en")
+    size = variant[:-len(".en")] if english_only else variant
+    size = ALIASES.get(size, size)
+    if size not in QUANTIZATIONS:
+        raise ValueError(f"Unknown model '{name}'. Available sizes: {', '.join(QUANTIZATIONS)}.")
+    if english_only and size not in ENGLISH_ONLY_SIZES:
+        raise ValueError(f"There is no English-only build of '{size}'.")
+    if quant and quant not in QUANTIZATIONS[size]:
+        published = ", ".join(QUANTIZATIONS[size]) or "none"
+        raise ValueError(f"No {quant} build of '{size}'. Published quantizations: {published}.")
+
+    canonical = f"{size}.en" if english_only else size
+    return f"{canonical}-{quant}" if quant else canonical
+
+
+def default_models_dir() -> str:
+    return os.path.join(default_cache_dir(), "models")
+
+
+def pywhispercpp_models_dir() -> str:
+    """
+    Where pywhispercpp downloads models by itself (platformdirs' user data dir), and where a
+    CoreML build's encoders were converted to before models moved to default_models_dir().
+    """
+    if sys.platform == 'darwin':
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "pywhispercpp", "models")
+
+
+def coreml_encoder_name(name: str) -> str:
+    """
+    The CoreML encoder whisper.cpp looks for next to ggml-<name>.bin: quantized models share
+    the encoder of their size ('base.en-q5_1' -> 'ggml-base.en-encoder.mlmodelc').
+    """
+    size = re.sub(r"-q\d_\d$", "", name)
+    return f"ggml-{size}-encoder.mlmodelc"
+
+
+def model_url(name: str) -> str:
+    return f"{MODEL_BASE_URL}/ggml-{name}.bin"
+
+
+def model_path(name: str, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or default_models_dir(), f"ggml-{name}.bin")
+
+
+def ensure_model(name: str, directory: Optional[str] = None, rehash: bool = False) -> str:
+    """
+    Local path of model `name` (a canonical name from resolve_model), downloading it into
+    directory (default <cache dir>/models) if it's missing. A file that fails its checksum
+    is replaced by a fresh download; rehash forces a full check of an already verified file.
+    Paths to model files are returned unchanged.
+    """
+    if os.path.isfile(name):
+        return name
+    path = model_path(name, directory)
+    # Worker processes, the service and CLI runs may all ask for the same model at once
+    with _model_lock(path):
+        # Models (and CoreML encoders) pywhispercpp already downloaded aren't fetched again
+        _link_from_pywhispercpp(os.path.basename(path), os.path.dirname(path))
+        _link_from_pywhispercpp(coreml_encoder_name(name), os.path.dirname(path))
+        if os.path.exists(path):
+            if _verify(name, path, rehash):
+                return path
+            print(f"⚠️ {path} doesn't match its checksum, downloading it again.", file=sys.stderr)
+            os.remove(path)
+        _download(name, path)
+    return path
+
+
+def _link_from_pywhispercpp(filename: str, directory: str):
+    """
+    Link pywhispercpp's copy of filename (a model file or a CoreML encoder directory) into
+    directory, unless directory already has it. Files are hard-linked where possible, so the
+    model survives pywhispercpp's copy being deleted; directories are symlinked.
+    """
+    target = os.path.join(directory, filename)
+    source = os.path.join(pywhispercpp_models_dir(), filename)
+    if os.path.exists(target) or not os.path.exists(source):
+        return
+    if os.path.lexists(target):
+        # A symlink left dangling by a deleted pywhispercpp copy
+        os.remove(target)
+    try:
+        if os.path.isdir(source):
+            os.symlink(source, target, target_is_directory=True)
+        else:
+            try:
+                os.link(source, target)
+            except OSError:
+                os.symlink(source, target)
+    except OSError as e:
+        print(f"⚠️ Can't link {source} into {directory}: {e}", file=sys.stderr)
+        return
+    print(f"🔗 Using {source} (downloaded by pywhispercpp).")
+
+
+@contextmanager
+def _model_lock(path: str):
+    """Hold an exclusive lock on <path>.lock, so only one process checks or downloads the model."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _sidecar_path(path: str) -> str:
+    return path + ".json"
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_sidecar(path: str, sha256: str, verified: bool = True):
+    """Record the file's sha256; verified=False when it couldn't be checked against the published one."""
+    stat = os.stat(path)
+    record = {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime}
+    if not verified:
+        record['unverified'] = True
+    with open(_sidecar_path(path), 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+
+
+def _published_sha256(name: str) -> Optional[str]:
+    """sha256 of the published file: Hugging Face serves it as the LFS ETag of the download URL."""
+    import requests
+
+    try:
+        response = requests.head(model_url(name), allow_redirects=False, timeout=15)
+    except requests.RequestException:
+        return None
+    etag = (response.headers.get('X-Linked-Etag') or '').strip('"')
+    return etag if re.fullmatch(r"[0-9a-f]{64}", etag) else None
+
+
+def _verify(name: str, path: str, rehash: bool = False) -> bool:
+    """
+    Check a cached model against its recorded sha256. Unless rehash is set, the file is only
+    hashed again when its size or mtime changed since it was recorded; files without a record
+    are checked against the published checksum. When that can't be fetched, the file is trusted
+    and its own hash recorded as unverified, so the lookup isn't repeated on every load (rehash
+    tries the published checksum again).
+    """
+    try:
+        with open(_sidecar_path(path), encoding='utf-8') as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        record = None
+
+    stat = os.stat(path)
+    if not rehash and record and record.get('size') == stat.st_size and record.get('mtime') == stat.st_mtime:
+        return True
+
+    expected = record.get('sha256') if record and not record.get('unverified') else None
+    if expected is None:
+        expected = _published_sha256(name)
+    if expected is None and record is None:
+        print(f"⚠️ Can't fetch the checksum of '{name}', using {path} unverified.", file=sys.stderr)
+        _write_sidecar(path, _sha256_file(path), verified=False)
+        return True
+    verified = expected is not None
+    if not verified:
+        # Still offline: hold the file to the hash recorded when it was first seen
+        expected = record.get('sha256')
+    print(f"🔍 Verifying {os.path.basename(path)}...")
+    actual = _sha256_file(path)
+    if actual != expected:
+        return False
+    _write_sidecar(path, actual, verified)
+    return True
+
+
+def _download(name: str, path: str):
+    import requests
+    from tqdm import tqdm
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    expected = _published_sha256(name)
+    url = model_url(name)
+    # Unique per process, so an unlocked download (Windows) can't interleave with another one
+    tmp_path = f"{path}.{os.getpid()}.part"
+    print(f"⬇️  Downloading model '{name}' from {url}...")
+
+    digest = hashlib.sha256()
+    try:
+        with requests.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            total = int(response.headers.get('Content-Length') or 0) or None
+            with open(tmp_path, 'wb') as f, \
+                    tqdm(total=total, unit="B", unit_scale=True, desc=name, disable=progress.enabled) as bar:
+                for block in response.iter_content(chunk_size=1 << 20):
+                    f.write(block)
+                    digest.update(block)
+                    bar.update(len(block))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    actual = digest.hexdigest()
+    if expected is not None and actual != expected:
+        os.remove(tmp_path)
+        raise ModelIntegrityError(f"Download of '{name}' is corrupt (sha256 {actual}, expected {expected}).")
+    if expected is None:
+        print(f"⚠️ Couldn't fetch the published checksum of '{name}', recording the downloaded one.", file=sys.stderr)
+    # Only a complete, verified file ever gets the final name
+    os.replace(tmp_path, path)
+    _write_sidecar(path, actual, verified=expected is not None)
+    print(f"✅ Model saved to: {path}")
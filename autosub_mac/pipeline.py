@@ -0,0 +1,118 @@
+import glob
+import os
+import queue
+import sys
+import threading
+from typing import Dict, List
+
+from .main import (prepare_audio, create_transcriber, pin_language, release_for_workers, transcribe_inputs,
+                   translate_all, write_outputs, _cleanup)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.mkv', '.avi', '.webm', '.m4v', '.mp3', '.m4a', '.wav', '.flac')
+
+# Marks the end of the stream between stages
+_DONE = object()
+
+def is_batch_input(path: str) -> bool:
+    """A directory, or a glob pattern that isn't itself a file (e.g. 'Talk [1080p].mp4' is one file)."""
+    if os.path.isdir(path):
+        return True
+    return glob.has_magic(path) and not os.path.exists(path)
+
+def expand_inputs(path: str) -> List[str]:
+    """A directory (its media files, non-recursive) or a glob pattern -> sorted list of files."""
+    if os.path.isdir(path):
+        candidates = [os.path.join(path, name) for name in os.listdir(path)]
+        return sorted(p for p in candidates if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(p for p in glob.glob(path) if os.path.isfile(p))
+
+def output_collisions(video_paths: List[str]) -> Dict[str, List[str]]:
+    """
+    Inputs whose subtitles would overwrite each other: outputs are named after the file alone
+    (e.g. a/intro.mp4 and b/intro.mkv both write intro.<lang>.srt). Names are compared without
+    case, as macOS file systems do. {name: [video paths]}.
+    """
+    by_name: Dict[str, List[str]] = {}
+    for video_path in video_paths:
+        by_name.setdefault(os.path.splitext(os.path.basename(video_path))[0].lower(), []).append(video_path)
+    return {name: paths for name, paths in by_name.items() if len(paths) > 1}
+
+def run_batch(args, video_paths: List[str], queue_size: int = 2) -> Dict[str, List[str]]:
+    """
+    Process many files with extraction, transcription and translation as overlapping stages.
+    While file N is in Whisper, file N+1 is decoding in ffmpeg and file N-1 is translating.
+    Stages are connected by bounded queues, so at most queue_size decoded files wait in memory.
+
+    Returns {video_path: [written SRT paths]} for the files that succeeded.
+    A failing file is reported and skipped; the rest of the batch continues.
+    """
+    extracted = queue.Queue(maxsize=queue_size)
+    transcribed = queue.Queue(maxsize=queue_size)
+    results: Dict[str, List[str]] = {}
+    failures: Dict[str, str] = {}
+
+    def fail(video_path: str, stage: str, e: Exception):
+        print(f"❌ {stage} failed for {os.path.basename(video_path)}: {e}", file=sys.stderr)
+        failures[video_path] = f"{stage}: {e}"
+
+    def extract_stage():
+        for video_path in video_paths:
+            base_name = os.path.splitext(os.path.basename(video_path))[0]
+            try:
+                inputs, offsets, temp_files = prepare_audio(args, video_path, base_name)
+                if hasattr(inputs, 'decode_all'):
+                    # --extract-workers hands back a lazy extractor: decode here, not in the transcribe stage
+                    inputs = inputs.decode_all()
+            except Exception as e:
+                fail(video_path, "Extraction", e)
+                continue
+            extracted.put((video_path, base_name, inputs, offsets, temp_files))
+        extracted.put(_DONE)
+
+    transcriber = create_transcriber(args)
+
+    def transcribe_stage():
+        while True:
+            item = extracted.get()
+            if item is _DONE:
+                break
+            video_path, base_name, inputs, offsets, temp_files = item
+            try:
+                language = pin_language(args, transcriber, inputs)
+                release_for_workers(args, transcriber, inputs)
+                segments = transcribe_inputs(args, transcriber, inputs, offsets)
+            except Exception as e:
+                fail(video_path, "Transcription", e)
+                continue
+            finally:
+                _cleanup(temp_files)
+            transcribed.put((video_path, base_name, segments, language))
+        transcribed.put(_DONE)
+
+    def translate_stage():
+        while True:
+            item = transcribed.get()
+            if item is _DONE:
+                break
+            video_path, base_name, segments, language = item
+            try:
+                outputs = translate_all(args, segments, source_lang=language)
+                results[video_path] = write_outputs(args, base_name, segments, outputs)
+            except Exception as e:
+                fail(video_path, "Translation", e)
+
+    print(f"📚 Batch mode: {len(video_paths)} files, pipelined extract → transcribe → translate.")
+    stages = [
+        threading.Thread(target=extract_stage, name="autosub-extract", daemon=True),
+        threading.Thread(target=transcribe_stage, name="autosub-transcribe", daemon=True),
+        threading.Thread(target=translate_stage, name="autosub-translate", daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    print(f"📚 Batch finished: {len(results)} succeeded, {len(failures)} failed.")
+    for video_path, error in failures.items():
+        print(f"   ❌ {video_path}: {error}")
+    return results
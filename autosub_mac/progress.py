@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, TextIO
+
+class ProgressReporter:
+    """
+    Structured progress channel: one JSON object per line, e.g.
+
+        {"event": "progress", "stage": "transcribe", "done": 3, "total": 12, "unit": "chunk",
+         "eta_sec": 41.2, "rate": 0.22, "ts": 1700000000.0}
+
+    Events: stage_start, progress, stage_end, done, error, and segment (each caption
+    committed in live mode, with its start, end and text).
+    Written to its own file descriptor or file, so consumers don't have to parse log text.
+    Does nothing until a stream is attached.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream
+        self._stages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.stream is not None
+
+    def open_fd(self, fd: int):
+        self.stream = os.fdopen(fd, 'w', buffering=1, encoding='utf-8')
+
+    def open_file(self, path: str):
+        self.stream = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, event: str, **fields):
+        if self.stream is None:
+            return
+        line = json.dumps({'event': event, **fields, 'ts': round(time.time(), 3)}, ensure_ascii=False)
+        with self._lock:
+            try:
+                self.stream.write(line + "\n")
+            except (BrokenPipeError, ValueError):
+                # The consumer went away; keep the job running
+                self.stream = None
+
+    def start_stage(self, stage: str, total: Optional[int] = None, unit: str = "item"):
+        if self.stream is None:
+            return
+        self._stages[stage] = {'start': time.time(), 'total': total, 'unit': unit}
+        self.emit("stage_start", stage=stage, total=total, unit=unit)
+
+    def advance(self, stage: str, done: int, total: Optional[int] = None):
+        """Report that done of total units of a stage are finished, with rate and ETA."""
+        if self.stream is None:
+            return
+        info = self._stages.setdefault(stage, {'start': time.time(), 'total': total, 'unit': "item"})
+        total = total if total is not None else info['total']
+        elapsed = time.time() - info['start']
+        rate = done / elapsed if elapsed > 0 else None
+        eta = (total - done) / rate if rate and total is not None else None
+        self.emit("progress", stage=stage, done=done, total=total, unit=info['unit'],
+                  rate=round(rate, 3) if rate else None, eta_sec=round(eta, 1) if eta is not None else None)
+
+    def end_stage(self, stage: str):
+        if self.stream is None:
+            return
+        info = self._stages.pop(stage, None)
+        elapsed = time.time() - info['start'] if info else None
+        self.emit("stage_end", stage=stage, elapsed_sec=round(elapsed, 3) if elapsed is not None else None)
+
+# Shared by the whole pipeline
+progress = ProgressReporter()
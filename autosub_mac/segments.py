@@ -0,0 +1,118 @@
+import json
+from typing import Dict, Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+SRT_CUE = "%d\n%02d:%02d:%02d,%03d --> %02d:%02d:%02d,%03d\n%s\n\n"
+VTT_CUE = "%02d:%02d:%02d.%03d --> %02d:%02d:%02d.%03d\n%s\n\n"
+
+
+def _timestamp_fields(seconds: np.ndarray):
+    """(hours, minutes, seconds, milliseconds) int lists, with the same arithmetic as utils.format_timestamp."""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    milliseconds = ((seconds - np.trunc(seconds)) * 1000).astype(np.int64)
+    hours = (seconds // 3600).astype(np.int64)
+    minutes = ((seconds % 3600) // 60).astype(np.int64)
+    secs = (seconds % 60).astype(np.int64)
+    return hours.tolist(), minutes.tolist(), secs.tolist(), milliseconds.tolist()
+
+
+def format_timestamps(seconds: Sequence[float], separator: str = ",") -> List[str]:
+    """
+    format_timestamp for a whole array at once: HH:MM:SS,mmm (or HH:MM:SS.mmm with separator='.').
+    """
+    template = f"%02d:%02d:%02d{separator}%03d"
+    return [template % fields for fields in zip(*_timestamp_fields(seconds))]
+
+
+class SegmentStore:
+    """
+    Segments as parallel columns: start and end times in float64 arrays, texts in a list.
+    Shifting, merging, sorting and formatting work on whole columns instead of one dict per
+    segment, which is what matters for transcripts with hundreds of thousands of segments.
+    Convert with from_dicts / to_dicts where the pipeline passes lists of segment dicts.
+    """
+
+    __slots__ = ('starts', 'ends', 'texts')
+
+    def __init__(self, starts: Sequence[float] = (), ends: Sequence[float] = (), texts: Sequence[str] = ()):
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.texts = list(texts)
+        if not len(self.starts) == len(self.ends) == len(self.texts):
+            raise ValueError("starts, ends and texts must have the same length.")
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[Dict]) -> 'SegmentStore':
+        segments = segments if isinstance(segments, list) else list(segments)
+        n = len(segments)
+        starts = np.fromiter((s['start'] for s in segments), dtype=np.float64, count=n)
+        ends = np.fromiter((s['end'] for s in segments), dtype=np.float64, count=n)
+        return cls(starts, ends, [s['text'] for s in segments])
+
+    @classmethod
+    def concat(cls, stores: Iterable['SegmentStore']) -> 'SegmentStore':
+        stores = list(stores)
+        if not stores:
+            return cls()
+        texts = []
+        for store in stores:
+            texts.extend(store.texts)
+        return cls(np.concatenate([s.starts for s in stores]), np.concatenate([s.ends for s in stores]), texts)
+
+    @classmethod
+    def merge(cls, stores: Iterable['SegmentStore']) -> 'SegmentStore':
+        """Concatenate and sort into one timeline."""
+        return cls.concat(stores).sorted()
+
+    def to_dicts(self) -> List[Dict]:
+        return [{'start': start, 'end': end, 'text': text}
+                for start, end, text in zip(self.starts.tolist(), self.ends.tolist(), self.texts)]
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self.to_dicts())
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]) -> Union[Dict, 'SegmentStore']:
+        if isinstance(index, (int, np.integer)):
+            return {'start': float(self.starts[index]), 'end': float(self.ends[index]), 'text': self.texts[index]}
+        if isinstance(index, slice):
+            return SegmentStore(self.starts[index], self.ends[index], self.texts[index])
+        # Boolean mask or index array
+        positions = np.arange(len(self))[index]
+        return SegmentStore(self.starts[positions], self.ends[positions], [self.texts[i] for i in positions.tolist()])
+
+    def offset(self, seconds: Union[float, Sequence[float]]) -> 'SegmentStore':
+        """Shifted by seconds: one value for every segment, or one per segment."""
+        shift = np.asarray(seconds, dtype=np.float64)
+        return SegmentStore(self.starts + shift, self.ends + shift, self.texts)
+
+    def sorted(self) -> 'SegmentStore':
+        """Ordered by start (then end) time; segments with equal times keep their order."""
+        order = np.lexsort((self.ends, self.starts))
+        return self[order]
+
+    def with_texts(self, texts: Sequence[str]) -> 'SegmentStore':
+        """Same timings with other texts (e.g. a translation), sharing the time arrays."""
+        store = SegmentStore.__new__(SegmentStore)
+        store.starts, store.ends, store.texts = self.starts, self.ends, list(texts)
+        if len(store.texts) != len(self.texts):
+            raise ValueError("One text per segment is required.")
+        return store
+
+    def to_srt(self) -> str:
+        start_fields = _timestamp_fields(self.starts)
+        end_fields = _timestamp_fields(self.ends)
+        texts = [t.strip() for t in self.texts]
+        return "".join([SRT_CUE % cue for cue in zip(range(1, len(self) + 1), *start_fields, *end_fields, texts)])
+
+    def to_vtt(self) -> str:
+        start_fields = _timestamp_fields(self.starts)
+        end_fields = _timestamp_fields(self.ends)
+        texts = [t.strip() for t in self.texts]
+        return "WEBVTT\n\n" + "".join([VTT_CUE % cue for cue in zip(*start_fields, *end_fields, texts)])
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dicts(), ensure_ascii=False)
@@ -0,0 +1,300 @@
+import argparse
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .main import build_parser, run, apply_tuning, parse_formats, check_translation_options
+from .cache import TranscriptCache, default_cache_dir
+from .metrics import metrics
+from .models import resolve_model
+
+if TYPE_CHECKING:
+    from .transcriber import WhisperTranscriber
+
+DEFAULT_PORT = 8765
+# Finished jobs kept around for status queries
+MAX_FINISHED_JOBS = 1000
+
+class TranscriptionService:
+    """
+    Long-running worker that keeps Whisper models loaded (one per model name) and runs
+    pipeline jobs from a bounded queue, so jobs don't pay interpreter startup, imports
+    and model loading each time.
+    """
+
+    def __init__(self, queue_size: int = 16, workers: int = 1, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.jobs: Dict[str, Dict] = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs_lock = threading.Lock()
+        self._running = 0
+        self._models: Dict[str, 'WhisperTranscriber'] = {}
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._models_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"autosub-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def get_transcriber(self, model_name: str):
+        """Resident transcriber for model_name (loaded on first use) and the lock serialising its use."""
+        from .transcriber import WhisperTranscriber
+
+        with self._models_lock:
+            if model_name not in self._models:
+                cache = TranscriptCache(os.path.join(self.cache_dir, "transcripts"))
+                transcriber = WhisperTranscriber(model_name=model_name, load_model=False, cache=cache,
+                                                 models_dir=os.path.join(self.cache_dir, "models"))
+                transcriber.ensure_model_loaded()
+                self._models[model_name] = transcriber
+                self._model_locks[model_name] = threading.Lock()
+            return self._models[model_name], self._model_locks[model_name]
+
+    def submit(self, spec: Dict) -> Dict:
+        """
+        Queue a job. spec: {'video_path': str, 'options': {<main.py option dest>: value}}.
+        Raises ValueError for an invalid spec and queue.Full when the queue is full.
+        """
+        args = job_args(spec)
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'video_path': args.video_path,
+            'model': args.model,
+            'outputs': [],
+            'error': None,
+            'submitted': time.time(),
+            'started': None,
+            'finished': None,
+        }
+        with self._jobs_lock:
+            self._queue.put_nowait((job['id'], args))
+            self.jobs[job['id']] = job
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self) -> List[Dict]:
+        with self._jobs_lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def health(self) -> Dict:
+        return {
+            'status': 'ok',
+            'models': sorted(self._models),
+            'queued': self._queue.qsize(),
+            'queue_size': self._queue.maxsize,
+        }
+
+    def _worker_loop(self):
+        while True:
+            job_id, args = self._queue.get()
+            with self._jobs_lock:
+                # The pipeline records into the process-wide metrics, which nothing reads here:
+                # start them afresh whenever no other job is running, so they don't grow forever
+                if self._running == 0:
+                    metrics.reset()
+                self._running += 1
+            self._update(job_id, status='running', started=time.time())
+            try:
+                transcriber, lock = self.get_transcriber(args.model)
+                outputs = run(args, transcriber=transcriber, transcriber_lock=_job_settings(transcriber, lock, args))
+                self._update(job_id, status='done', outputs=outputs, finished=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status='failed', error=str(e), finished=time.time())
+            finally:
+                with self._jobs_lock:
+                    self._running -= 1
+                self._queue.task_done()
+
+    def _update(self, job_id: str, **fields):
+        with self._jobs_lock:
+            self.jobs[job_id].update(fields)
+            finished = [j for j in self.jobs.values() if j['finished']]
+            for job in sorted(finished, key=lambda j: j['finished'])[:-MAX_FINISHED_JOBS]:
+                del self.jobs[job['id']]
+
+@contextlib.contextmanager
+def _job_settings(transcriber: 'WhisperTranscriber', lock: threading.Lock, args: argparse.Namespace):
+    """Hold the resident transcriber's lock, with the job's --n-threads and --no-cache applied while it's held."""
+    with lock:
+        n_threads, cache = transcriber.n_threads, transcriber.cache
+        transcriber.n_threads = args.n_threads
+        if args.no_cache:
+            transcriber.cache = None
+        try:
+            yield
+        finally:
+            transcriber.n_threads, transcriber.cache = n_threads, cache
+
+def _reject(message: str):
+    raise ValueError(message)
+
+def _option_argv(parser: argparse.ArgumentParser, options: Dict) -> List[str]:
+    """Job options as command-line arguments, so argparse converts and checks them as it would main.py's."""
+    actions = {action.dest: action for action in parser._actions if action.option_strings}
+    argv = []
+    for key, value in options.items():
+        if key in ('video_path', 'server', 'help') or key not in actions:
+            raise ValueError(f"Unknown option: {key}")
+        action = actions[key]
+        flag = max(action.option_strings, key=len)
+        if isinstance(action, argparse._StoreTrueAction):
+            if not isinstance(value, bool):
+                raise ValueError(f"Option {key} must be true or false.")
+            if value:
+                argv.append(flag)
+        elif value is None:
+            continue
+        elif isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            raise ValueError(f"Option {key} must be a string or a number.")
+        else:
+            # --flag=value, so values starting with '-' aren't taken for options
+            argv.append(f"{flag}={value}")
+    return argv
+
+def job_args(spec: Dict) -> argparse.Namespace:
+    """Turn a job spec into the same Namespace main.py would parse from the command line."""
+    if not isinstance(spec, dict) or not spec.get('video_path'):
+        raise ValueError("Job needs a 'video_path'.")
+    if not os.path.isabs(spec['video_path']):
+        raise ValueError("'video_path' must be absolute (the service may run in another directory).")
+
+    options = spec.get('options') or {}
+    if not isinstance(options, dict):
+        raise ValueError("'options' must be an object.")
+    parser = build_parser()
+    # Bad values are the client's error (HTTP 400), not a reason to exit the service
+    parser.error = _reject
+    args = parser.parse_args([spec['video_path']] + _option_argv(parser, options))
+    # Process-wide in the service (and shared by concurrent jobs), so they can't be set per job
+    unsupported = [key for key in ('metrics_json', 'profile', 'progress_fd', 'progress_file')
+                   if getattr(args, key) is not None] + (['live'] if args.live else [])
+    if unsupported:
+        raise ValueError(f"Not supported by the service: {', '.join(unsupported)}")
+    if args.output and not os.path.isabs(args.output):
+        raise ValueError("'output' must be absolute.")
+    # One resident model per canonical name, however the job spelled it
+    args.model = resolve_model(args.model, args.quant)
+    parse_formats(args.formats)
+    check_translation_options(args)
+    # Jobs run on the resident model unless they ask for workers: a tuned process pool would
+    # load the model again in every worker, for every job
+    if args.threads is None:
+        args.threads = 1
+    apply_tuning(args)
+    if args.output_dir and not os.path.isabs(args.output_dir):
+        raise ValueError("'output_dir' must be absolute.")
+    return args
+
+class _Handler(BaseHTTPRequestHandler):
+    service: TranscriptionService = None
+
+    def do_GET(self):
+        if self.path == '/health':
+            return self._send(200, self.service.health())
+        if self.path == '/jobs':
+            return self._send(200, self.service.list())
+        if self.path.startswith('/jobs/'):
+            job = self.service.get(self.path[len('/jobs/'):])
+            if job is None:
+                return self._send(404, {'error': 'No such job.'})
+            return self._send(200, job)
+        self._send(404, {'error': 'Not found.'})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            return self._send(404, {'error': 'Not found.'})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length) or b'{}')
+            job = self.service.submit(spec)
+        except ValueError as e:
+            return self._send(400, {'error': str(e) or 'Invalid job options.'})
+        except queue.Full:
+            return self._send(503, {'error': 'Job queue is full, try again later.'})
+        self._send(202, job)
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Polling clients would flood the log otherwise
+        pass
+
+# --- Client helpers (used by main.py --server and the Streamlit app) ---
+
+def _request(url: str, payload: Optional[Dict] = None) -> Dict:
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        detail = json.loads(e.read() or b'{}').get('error', e.reason)
+        raise RuntimeError(f"Service returned {e.code}: {detail}") from e
+
+def submit_job(server: str, video_path: str, options: Dict) -> Dict:
+    return _request(f"{server.rstrip('/')}/jobs", {'video_path': os.path.abspath(video_path), 'options': options})
+
+def get_job(server: str, job_id: str) -> Dict:
+    return _request(f"{server.rstrip('/')}/jobs/{job_id}")
+
+def wait_for_job(server: str, job_id: str, poll_interval: float = 1.0) -> Dict:
+    while True:
+        job = get_job(server, job_id)
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(poll_interval)
+
+def serve(host: str = '127.0.0.1', port: int = DEFAULT_PORT, queue_size: int = 16, workers: int = 1,
+          preload: Optional[List[str]] = None, cache_dir: Optional[str] = None):
+    service = TranscriptionService(queue_size=queue_size, workers=workers, cache_dir=cache_dir)
+    for model_name in preload or []:
+        service.get_transcriber(resolve_model(model_name))
+
+    handler = type('Handler', (_Handler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🛰️  Transcription service listening on http://{host}:{port} (queue size {queue_size}, {workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down.")
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Resident transcription service: keeps Whisper models loaded and runs jobs from a queue.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind. Defaults to 127.0.0.1.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on. Defaults to {DEFAULT_PORT}.")
+    parser.add_argument("--queue-size", type=int, default=16, help="Max jobs waiting in the queue. Further submissions get HTTP 503. Defaults to 16.")
+    parser.add_argument("--workers", type=int, default=1, help="Jobs run concurrently. Jobs using the same model still take turns on it. Defaults to 1.")
+    parser.add_argument("--preload", default="base", help="Comma-separated models to load at startup, quantized ones included (e.g. 'base,medium-q5_0'). Defaults to 'base'.")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Directory for the transcript cache and downloaded models.")
+    args = parser.parse_args()
+
+    preload = [m.strip() for m in args.preload.split(",") if m.strip()]
+    serve(args.host, args.port, args.queue_size, args.workers, preload, args.cache_dir)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,113 @@
-from pywhispercpp.model import Model
 import sys
 import os
-from typing import List, Dict
+from typing import List, Dict, Union, Optional, Callable, Iterable, Iterator, Sequence, Tuple
+import numpy as np
 import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import time
+from .backends import DEFAULT_TRANSCRIPTION_BACKEND, load_transcription_backend, register_transcription_backend, \
+    transcription_backend_spec
+from .cache import TranscriptCache
+from .models import available_models, ensure_model
+from .segments import SegmentStore
+from .metrics import metrics
+from .progress import progress
+
+# Per-process transcriber used by the process-pool workers.
+# Each worker loads its own Model once in the pool initializer and reuses it for every chunk it pulls.
+_worker_transcriber = None
+
+
+def _init_worker(model_name: str, n_threads: int, params: Dict, models_dir: Optional[str], backend: str,
+                 backend_spec):
+    global _worker_transcriber
+    # A fresh (spawned) process only knows the built-in registry
+    register_transcription_backend(backend, backend_spec)
+    _worker_transcriber = WhisperTranscriber(model_name=model_name, n_threads=n_threads, params=params,
+                                             models_dir=models_dir, backend=backend)
+
+
+def _transcribe_in_worker(index: int, audio: Union[str, np.ndarray]):
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    segments = _worker_transcriber._transcribe_uncached(audio)
+    return index, segments, time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+
+def merge_chunks(results: Dict[int, List[Dict]], chunk_starts: Sequence[float],
+                 overlap_seconds: float = 0.0) -> SegmentStore:
+    """
+    Per-chunk segments, timed from the start of their chunk, as one timeline in absolute time.
+    All chunks are shifted at once, as one SegmentStore with one offset per segment; overlapping
+    chunks are then cut apart by stitch_segments.
+    """
+    indexes = sorted(results)
+    counts = [len(results[index]) for index in indexes]
+    store = SegmentStore.from_dicts([s for index in indexes for s in results[index]])
+    store = store.offset(np.repeat(np.asarray([chunk_starts[index] for index in indexes], dtype=np.float64), counts))
+    if overlap_seconds <= 0:
+        return store
+    bounds = np.cumsum([0] + counts).tolist()
+    return SegmentStore.from_dicts(stitch_segments(
+        [(chunk_starts[index], store[bounds[k]:bounds[k + 1]].to_dicts()) for k, index in enumerate(indexes)],
+        overlap_seconds,
+    ))
+
+
+def stitch_segments(chunk_results: List[tuple], overlap_seconds: float = 0.0) -> List[Dict]:
+    """
+    Merge per-chunk segments (already shifted to absolute time) into one timeline.
+
+    chunk_results: [(chunk_start, segments), ...] in timestamp order.
+    Where chunk i+1 starts inside the overlap zone of chunk i, both chunks transcribed the
+    same audio. The zone is cut at its midpoint: chunk i keeps the segments centred before the
+    cut, chunk i+1 the ones centred after it. A segment repeated verbatim on both sides of the
+    cut is kept once.
+    """
+    merged = []
+    for i, (chunk_start, segs) in enumerate(chunk_results):
+        if i > 0 and overlap_seconds > 0:
+            cut = chunk_start + overlap_seconds / 2
+            # Only the tail of the timeline can reach into this chunk's overlap zone
+            while merged and (merged[-1]['start'] + merged[-1]['end']) / 2 >= cut:
+                merged.pop()
+            segs = [s for s in segs if (s['start'] + s['end']) / 2 >= cut]
+            if merged and segs and segs[0]['text'].strip() == merged[-1]['text'].strip() \
+                    and segs[0]['start'] < merged[-1]['end']:
+                segs = segs[1:]
+        merged.extend(segs)
+    return merged
+
 
 class WhisperTranscriber:
-    def __init__(self, model_name: str = "base"):
+    def __init__(self, model_name: str = "base", n_threads: Optional[int] = None, load_model: bool = True,
+                 params: Optional[Dict] = None, cache: Optional[TranscriptCache] = None,
+                 models_dir: Optional[str] = None, backend: str = DEFAULT_TRANSCRIPTION_BACKEND):
         """
         Initialize Whisper model.
         
         Args:
-            model_name: One of 'tiny', 'base', 'small', 'medium', 'large'
+            model_name: A model from the registry (see models.resolve_model), e.g. 'base', 'small.en'
+                        or the quantized 'medium-q5_0', or a path to a ggml model file.
+            n_threads: Number of whisper.cpp threads used per transcription (per worker in the process pool).
+                       None uses every core, split evenly between pool workers; main.py passes the
+                       autotuned value for this model and host (see autotune.py).
+            load_model: Load the model now. Pass False when only the process pool will be used,
+                        so the parent process doesn't hold an unused copy of the model.
+            params: Extra whisper.cpp parameters passed to Model.transcribe (part of the cache key).
+            cache: Transcript cache. Audio already transcribed with the same model and params
+                   is served from it without running Whisper.
+            models_dir: Where registry models are downloaded and verified. Defaults to <cache dir>/models.
+            backend: Transcription engine from backends.TRANSCRIPTION_BACKENDS, imported when the
+                     model is first loaded. Defaults to whisper.cpp (pywhispercpp).
         """
         self.model_name = model_name
+        self.backend = backend
+        self.models_dir = models_dir
+        self.n_threads = n_threads
+        self.params = dict(params or {})
+        self.cache = cache
+        self.model = None
         # Note: We won't load the model here for batch processing, 
         # or we might need to handle it carefully.
         # For simple non-batch usage, we load it. 
@@ -24,31 +119,174 @@ class WhisperTranscriber:
         # C++ usually is, but let's be safe: create one model instance per thread/process to avoid GIL/Lock contention.
         # But loading model is expensive.
         # Let's try sharing the model first. If it crashes, we switch.
-        
-        print(f"🧠 Loading Whisper model: {model_name}...")
+        # -> Sharing crashed on CoreML/Metal, so the parallel path (executor='process')
+        #    gives every worker process its own Model instead.
+        if load_model:
+            self._load_model()
+
+    def ensure_model_loaded(self):
+        """Load the model now if it isn't loaded yet (e.g. to keep it warm in a long-running service)."""
+        if self.model is None:
+            self._load_model()
+
+    def release_model(self):
+        """Free the loaded model (e.g. before worker processes load their own copies). It's loaded again on next use."""
+        self.model = None
+
+    @metrics.timed("load_model")
+    def _load_model(self):
+        model_file = self._model_file()
+        print(f"🧠 Loading Whisper model: {self.model_name}...")
+        start = time.perf_counter()
         try:
-            # Model will download automatically if not present
-            self.model = Model(model_name, print_realtime=False, print_progress=False)
+            model_cls = load_transcription_backend(self.backend)
+            self.model = model_cls(model_file, print_realtime=False, print_progress=False)
         except Exception as e:
-            print(f"❌ Failed to load model '{model_name}': {e}", file=sys.stderr)
+            print(f"❌ Failed to load model '{self.model_name}': {e}", file=sys.stderr)
             raise e
+        print(f"✅ Model loaded in {time.perf_counter() - start:.1f}s")
+
+    def _model_file(self) -> str:
+        """
+        Local file for registry models, downloaded and checksum-verified on first use.
+        Any other name is handed to pywhispercpp as-is.
+        """
+        if self.model_name in available_models() or os.path.isfile(self.model_name):
+            with metrics.stage("fetch_model", model=self.model_name):
+                return ensure_model(self.model_name, self.models_dir)
+        return self.model_name
 
-    def transcribe(self, audio_path: str):
+    def transcribe(self, audio_path: Union[str, np.ndarray]):
         """
-        Transcribe audio file.
+        Transcribe audio file, or 16kHz mono float32 samples already decoded in memory.
         
         Returns:
             List of segments. Each segment is object/dict-like.
             We normalize it to list of dicts: [{'start': float, 'end': float, 'text': str}]
         """
-        if not os.path.exists(audio_path):
+        if self.cache is None:
+            return self._transcribe_uncached(audio_path)
+
+        key = self._cache_key(audio_path)
+        cached = self.cache.get(key)
+        if cached is not None:
+            print("♻️  Transcript loaded from cache, skipping Whisper.")
+            return cached
+        segments = self._transcribe_uncached(audio_path)
+        self.cache.put(key, segments)
+        return segments
+
+    def detect_language(self, audio: Union[str, np.ndarray], offset_sec: float = 0.0) -> Tuple[str, float]:
+        """
+        Detect the spoken language from the 30 seconds of audio starting at offset_sec.
+        Returns (language code, probability). Results are cached alongside transcripts.
+        """
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(audio, self._cache_model(), {'detect_language': True, 'offset_sec': offset_sec})
+            cached = self.cache.get(key)
+            if cached:
+                return cached[0]['language'], cached[0]['probability']
+
+        self.ensure_model_loaded()
+        with metrics.stage("detect_language"):
+            (language, probability), _ = self.model.auto_detect_language(
+                audio, offset_ms=int(offset_sec * 1000), n_threads=self.n_threads or os.cpu_count() or 1)
+        probability = float(probability)
+        if key is not None:
+            self.cache.put(key, [{'language': language, 'probability': probability}])
+        return language, probability
+
+    def transcribe_stream(self, blocks: Iterable[np.ndarray], latency_sec: float = 5.0, window_sec: float = 30.0,
+                          sample_rate: int = 16000) -> Iterator[Dict]:
+        """
+        Sliding-window transcription of a live stream of 16kHz mono float32 sample blocks.
+
+        Every latency_sec / 2 seconds of new audio, the uncommitted tail of the stream (at most
+        window_sec long) is transcribed again. A segment is final once Whisper has started the
+        next one, or once it ended more than latency_sec / 2 before the end of the audio; final
+        segments are yielded with absolute timestamps and their audio is dropped from the window.
+        A full window is committed as-is and cut down to its last latency_sec / 2, so no caption
+        is held back longer than window_sec and the window never outgrows it. When decoding takes
+        longer than latency_sec / 2, the window is decoded again only after as much new audio as
+        the last decode took, so decoding can't fall further and further behind a live source.
+        The rest is flushed when the blocks run out.
+
+        Transcripts are not cached: live audio doesn't repeat.
+        """
+        min_step = max(1, int(latency_sec / 2 * sample_rate))
+        step = min_step
+        holdback = latency_sec / 2
+        buffer = np.zeros(0, dtype=np.float32)
+        buffer_start = 0.0
+        new_samples = 0
+
+        def decode(final: bool) -> List[Dict]:
+            nonlocal buffer, buffer_start, step
+            buffer_end = len(buffer) / sample_rate
+            full = buffer_end >= window_sec
+            decode_start = time.perf_counter()
+            segments = [s for s in self._transcribe_uncached(buffer) if s['text'].strip()]
+            step = max(min_step, int((time.perf_counter() - decode_start) * sample_rate))
+            if final or full:
+                committed = segments
+            elif segments and segments[-1]['end'] <= buffer_end - holdback:
+                committed = segments
+            else:
+                committed = segments[:-1]
+
+            if final:
+                cut = buffer_end
+            elif full:
+                # Forced out: at most the tail a word may be starting in stays for the next window
+                end = committed[-1]['end'] if committed else 0.0
+                cut = min(max(end, buffer_end - holdback), buffer_end)
+            elif committed:
+                cut = min(committed[-1]['end'], buffer_end)
+            elif not segments:
+                # Nothing said: keep only the tail a word may be starting in
+                cut = max(0.0, buffer_end - holdback)
+            else:
+                cut = 0.0
+            cut_samples = int(cut * sample_rate)
+
+            for s in committed:
+                s['start'] += buffer_start
+                s['end'] += buffer_start
+            buffer = buffer[cut_samples:]
+            buffer_start += cut_samples / sample_rate
+            return committed
+
+        for block in blocks:
+            buffer = np.concatenate((buffer, block))
+            new_samples += len(block)
+            if new_samples < step:
+                continue
+            new_samples = 0
+            yield from decode(final=False)
+        if len(buffer):
+            yield from decode(final=True)
+
+    def _cache_model(self) -> str:
+        """Model name as recorded in cache keys; other engines don't share whisper.cpp's entries."""
+        if self.backend == DEFAULT_TRANSCRIPTION_BACKEND:
+            return self.model_name
+        return f"{self.backend}:{self.model_name}"
+
+    def _cache_key(self, audio: Union[str, np.ndarray]) -> str:
+        return self.cache.key(audio, self._cache_model(), self.params)
+
+    def _transcribe_uncached(self, audio_path: Union[str, np.ndarray]):
+        if isinstance(audio_path, str) and not os.path.exists(audio_path):
              raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
+        self.ensure_model_loaded()
+
         # print(f"🎙️  Transcribing audio...") # Removing noisy print for batch mode
         try:
             # pywhispercpp transcribe returns segments
-            # n_threads defaults to hardware concurrency if not specified
-            segments = self.model.transcribe(audio_path, n_threads=6)
+            n_threads = self.n_threads or os.cpu_count() or 1
+            segments = self.model.transcribe(audio_path, n_threads=n_threads, **self.params)
             
             # Normalize results
             normalized_segments = []
@@ -66,34 +304,153 @@ class WhisperTranscriber:
             return normalized_segments
 
         except Exception as e:
-            print(f"❌ Transcription failed for {audio_path}: {e}", file=sys.stderr)
+            source = audio_path if isinstance(audio_path, str) else f"<{len(audio_path)} samples in memory>"
+            print(f"❌ Transcription failed for {source}: {e}", file=sys.stderr)
             raise e
 
-    def transcribe_batch(self, audio_paths: List[str], max_workers: int = 1, offset_seconds: int = 0) -> List[Dict]:
+    def transcribe_batch(self, audio_paths: List[Union[str, np.ndarray]], max_workers: int = 1, offset_seconds: int = 0,
+                         executor: str = "sequential", offsets: Optional[List[float]] = None,
+                         overlap_seconds: float = 0.0, completed: Optional[Dict[int, List[Dict]]] = None,
+                         chunk_callback: Optional[Callable[[int, List[Dict]], None]] = None) -> SegmentStore:
         """
-        Transcribe a list of audio files using the loaded model.
-        NOTE: Changed to SEQUENTIAL execution to prevent CoreML/Metal backend crashes.
-        The Speedup comes from Metal acceleration, not Python threading.
+        Transcribe a list of audio files or in-memory sample chunks into one SegmentStore.
+
+        Chunk i is shifted by offsets[i] seconds when offsets is given (exact chunk start
+        times, see split_samples / chunk_start_times), otherwise by i * offset_seconds.
+        When chunks overlap by overlap_seconds, duplicated segments in the overlap zones
+        are removed by stitch_segments.
+
+        audio_paths may also be a chunk source such as audio.ParallelChunkExtractor: anything with
+        a length and an iter_ready(skip) method yielding (index, audio) pairs as chunks become
+        available. Each chunk is then transcribed as soon as it is ready, while the rest are
+        still being decoded.
+
+        completed maps chunk index -> segments already transcribed (e.g. by a resumed job);
+        those chunks aren't transcribed again. chunk_callback(index, segments) is called with the
+        unshifted segments of every chunk as soon as it finishes.
+
+        executor:
+            'sequential' - run every chunk on the loaded model, one after another.
+                           Safe default for CoreML/Metal, where sharing a model across threads crashes.
+            'process'    - run chunks on a pool of max_workers processes. Each worker loads its own
+                           Model once and pulls chunks from the pool's queue. Unless n_threads is set,
+                           CPU cores are split between workers so that n_threads * workers matches the machine.
         """
+        with metrics.stage("transcribe_batch", profile=True, chunks=len(audio_paths)):
+            results = self._run_batch(audio_paths, max_workers, executor, completed, chunk_callback)
+
+        # Merge back in timestamp order, whatever order the chunks finished in
+        if offsets is None:
+            offsets = [index * offset_seconds for index in range(len(audio_paths))]
+        return merge_chunks(results, offsets, overlap_seconds)
+
+    def _run_batch(self, audio_paths, max_workers, executor, completed, chunk_callback) -> Dict[int, List[Dict]]:
+        # Chunks finished by an earlier (checkpointed) run are taken as-is
+        results = dict(completed or {})
+        total = len(audio_paths)
+        keys = {}
+        if hasattr(audio_paths, 'iter_ready'):
+            chunks = audio_paths.iter_ready(skip=results)
+        else:
+            chunks = enumerate(audio_paths)
+
+        def pending():
+            # Lazily, so streamed chunks are looked up and dispatched one by one as they arrive
+            from_cache = 0
+            for index, audio in chunks:
+                if index in results:
+                    continue
+                if self.cache is not None:
+                    keys[index] = self._cache_key(audio)
+                    cached = self.cache.get(keys[index])
+                    if cached is not None:
+                        results[index] = cached
+                        from_cache += 1
+                        continue
+                yield index, audio
+            if from_cache:
+                print(f"♻️  {from_cache}/{total} chunks loaded from transcript cache.")
+
+        def on_chunk_done(index: int, segs: List[Dict]):
+            # Cache each chunk as soon as it finishes, so a failed or killed run
+            # only re-transcribes the chunks that didn't complete
+            results[index] = segs
+            if index in keys:
+                self.cache.put(keys[index], segs)
+            progress.advance("transcribe", len(results), total)
+            if chunk_callback is not None:
+                chunk_callback(index, segs)
+
+        if executor == "process" and max_workers > 1 and total - len(results) > 1:
+            self._transcribe_chunks_in_processes(pending(), total - len(results), total, max_workers, on_chunk_done)
+        elif total > len(results):
+            self._transcribe_chunks_sequential(pending(), total, on_chunk_done)
+        return results
+
+    def _transcribe_chunks_sequential(self, chunks: Iterable[Tuple[int, Union[str, np.ndarray]]], total: int,
+                                      on_chunk_done):
         print(f"🚀 Starting batch transcription (Sequential)...")
-        
-        all_segments = []
-        
-        for index, path in enumerate(audio_paths):
-            current_offset = index * offset_seconds
-            print(f"▶️ Processing chunk {index+1}/{len(audio_paths)}...")
+
+        for index, path in chunks:
+            # Outside the per-chunk handling: a model that can't load fails the run, not each chunk
+            self.ensure_model_loaded()
+            print(f"▶️ Processing chunk {index+1}/{total}...")
             try:
-                # Run transcription sequentially
-                segs = self.transcribe(path)
-                
-                # Adjust timestamps
-                for s in segs:
-                    s['start'] += current_offset
-                    s['end'] += current_offset
-                
-                all_segments.extend(segs)
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                segs = self._transcribe_uncached(path)
+                metrics.record_chunk(index, time.perf_counter() - wall_start, time.process_time() - cpu_start)
+                on_chunk_done(index, segs)
             except Exception as e:
                 print(f"❌ Error processing chunk {index}: {e}", file=sys.stderr)
                 # Continue to next chunk instead of crashing whole batch
-        
-        return all_segments
+
+    def _transcribe_chunks_in_processes(self, chunks: Iterable[Tuple[int, Union[str, np.ndarray]]], pending: int,
+                                        total: int, max_workers: int, on_chunk_done):
+        workers = min(max_workers, pending)
+        threads_per_worker = self.n_threads or max(1, (os.cpu_count() or 1) // workers)
+        print(f"🚀 Starting batch transcription ({workers} processes x {threads_per_worker} threads)...")
+        # Download (or verify) the model once here rather than in every worker at the same time
+        self._model_file()
+
+        # 'spawn' so that no worker inherits Metal/OpenMP state from a forked parent
+        ctx = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.model_name, threads_per_worker, self.params, self.models_dir, self.backend,
+                      transcription_backend_spec(self.backend)),
+        ) as pool:
+            futures = {}
+            done = 0
+
+            def collect(future):
+                nonlocal done
+                index = futures.pop(future)
+                done += 1
+                try:
+                    _, segs, wall, cpu = future.result()
+                    metrics.record_chunk(index, wall, cpu, worker_threads=threads_per_worker)
+                    on_chunk_done(index, segs)
+                    print(f"▶️ Finished chunk {index+1}/{total} ({done}/{pending} done)")
+                except concurrent.futures.process.BrokenProcessPool as e:
+                    # A worker couldn't load the model (or died): every remaining chunk would fail the same way
+                    raise RuntimeError(f"Transcription workers failed: {e}") from e
+                except Exception as e:
+                    print(f"❌ Error processing chunk {index}: {e}", file=sys.stderr)
+
+            # Chunks may still be arriving (streamed extraction): submit each one as it comes and
+            # collect whatever has already finished in between. At most 2 chunks per worker are in
+            # the pool at a time, so chunks aren't pulled (decoded, pickled) faster than they're
+            # transcribed; results are merged in chunk order by transcribe_batch.
+            max_pending = 2 * workers
+            for index, path in chunks:
+                if len(futures) >= max_pending:
+                    finished, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                    for future in finished:
+                        collect(future)
+                futures[pool.submit(_transcribe_in_worker, index, path)] = index
+                for future in [f for f in futures if f.done()]:
+                    collect(future)
+            for future in concurrent.futures.as_completed(list(futures)):
+                collect(future)
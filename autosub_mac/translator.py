@@ -1,61 +1,291 @@
-from deep_translator import GoogleTranslator, DeeplTranslator
-from typing import List, Dict
-from tqdm import tqdm
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Union
+from .backends import load_translation_provider
+from .cache import TranslationCache, normalize_text
+from .metrics import metrics
+from .progress import progress
 import time
 import sys
 
+if TYPE_CHECKING:
+    from .segments import SegmentStore
+
+# Max characters packed into one request. Google's web endpoint rejects > 5000 characters,
+# DeepL allows 128 KiB per request and up to 50 texts.
+MAX_BATCH_CHARS = {'google': 4500, 'deepl': 100000}
+MAX_BATCH_TEXTS = {'google': 200, 'deepl': 50}
+
+# Segments are packed one per line. Whisper segments are single-line already,
+# and both providers keep line breaks, so the response can be split back on them.
+BATCH_DELIMITER = "\n"
+
+# Providers whose HTTP endpoints async_translator speaks
+ASYNC_PROVIDERS = ('google', 'deepl')
+
+class BatchAlignmentError(Exception):
+    """A packed response couldn't be split back into one translation per segment."""
+
+def _sleep(seconds: float):
+    """time.sleep that's accounted for in the metrics report."""
+    metrics.incr('translation_sleep_sec', seconds)
+    time.sleep(seconds)
+
+# Whisper language codes that the providers spell differently
+GOOGLE_SOURCE_CODES = {'zh': 'zh-CN', 'he': 'iw'}
+
+def same_language(source: str, target: str) -> bool:
+    """
+    Whether audio in `source` needs no translation into `target`: 'en' and 'en-US' match.
+    Chinese variants only match exactly, since zh-CN and zh-TW differ in script.
+    """
+    source_base, target_base = source.lower().split('-')[0], target.lower().split('-')[0]
+    if source_base != target_base:
+        return False
+    return source_base != 'zh' or source.lower() == target.lower()
+
 class SubtitleTranslator:
-    def __init__(self, target_lang: str = 'en', provider: str = 'google', api_key: str = None):
+    def __init__(self, target_lang: str = 'en', provider: str = 'google', api_key: str = None, batch: bool = True,
+                 cache: Optional[TranslationCache] = None, source_lang: Optional[str] = None,
+                 concurrency: int = 0, rate: float = 5.0):
         self.target_lang = target_lang
+        self.source_lang = source_lang or 'auto'
         self.provider = provider
+        self.api_key = api_key
+        self.batch = batch
+        self.cache = cache
+        # concurrency > 0: batches go out together over asyncio (async_translator), at most
+        # `concurrency` in flight and `rate` requests per second
+        self.concurrency = concurrency
+        self.rate = rate
+        # Normalized texts the last translate_segments call couldn't translate (they keep their source text)
+        self.failed = set()
         
+        # The provider's library is imported here, only once it's actually used
+        translator_cls = load_translation_provider(provider)
         if provider == 'google':
-            self.translator = GoogleTranslator(source='auto', target=target_lang)
+            source = GOOGLE_SOURCE_CODES.get(self.source_lang, self.source_lang)
+            self.translator = self._make_translator(translator_cls, source=source, target=target_lang)
         elif provider == 'deepl':
             if not api_key:
                 raise ValueError("DeepL API key is required.")
-            self.translator = DeeplTranslator(api_key=api_key, source='auto', target=target_lang, use_free_api=True)
+            self.translator = self._make_translator(translator_cls, api_key=api_key, source=self.source_lang,
+                                                    target=target_lang, use_free_api=True)
         else:
-            raise ValueError(f"Provider {provider} not yet implemented in this wrapper.")
+            kwargs = {'api_key': api_key} if api_key else {}
+            self.translator = self._make_translator(translator_cls, source=self.source_lang, target=target_lang,
+                                                    **kwargs)
+
+    def _make_translator(self, cls, source: str, **kwargs):
+        try:
+            return cls(source=source, **kwargs)
+        except Exception as e:
+            if source == 'auto':
+                raise
+            # A language Whisper knows but the provider doesn't take as a source
+            print(f"⚠️ {self.provider} doesn't accept source language '{source}' ({e}), using auto-detection.")
+            self.source_lang = 'auto'
+            return cls(source='auto', **kwargs)
 
-    def translate_segments(self, segments: List[Dict]) -> List[Dict]:
+    def translate_segments(self, segments: Union[List[Dict], 'SegmentStore']) -> 'SegmentStore':
         """
-        Translate the 'text' field of each segment.
-        Returns a NEW list of segments with translated text.
+        Translate the text of each segment (a list of segment dicts or a SegmentStore).
+        Returns a NEW SegmentStore with the translated texts, sharing the original timings.
         """
+        from .segments import SegmentStore
+
+        if not isinstance(segments, SegmentStore):
+            segments = SegmentStore.from_dicts(segments)
         print(f"🌍 Translating {len(segments)} segments to '{self.target_lang}' using {self.provider}...")
-        
-        translated_segments = []
+        with metrics.stage(f"translate:{self.target_lang}", profile=True, segments=len(segments)):
+            return self._translate_segments(segments)
+
+    def _translate_segments(self, segments: 'SegmentStore') -> 'SegmentStore':
+        from tqdm import tqdm
+
+        # Identical texts (intros, outros, recurring phrases) are translated once,
+        # and only if the translation memory doesn't already have them
+        keys = [normalize_text(text) for text in segments.texts]
+        unique = list(dict.fromkeys(k for k in keys if k))
+        known = {}
+        if self.cache is not None:
+            known = self.cache.get_many(self.provider, self.source_lang, self.target_lang, unique)
+        pending = [k for k in unique if k not in known]
+        print(f"♻️  {len(unique)} unique texts, {len(known)} from cache, {len(pending)} to translate.")
+
+        stage = f"translate:{self.target_lang}"
+        progress.start_stage(stage, total=len(pending), unit="segment")
+        # The structured progress channel replaces the tqdm bar when it's enabled
+        with tqdm(total=len(pending), desc="Translating", unit="seg", disable=progress.enabled) as bar:
+            self._bar = bar
+            self._done = 0
+            if not pending:
+                translated_texts = []
+            elif self.batch and self.concurrency > 0 and self.provider in ASYNC_PROVIDERS:
+                translated_texts = self._translate_texts_async(pending)
+            elif self.batch:
+                translated_texts = self._translate_texts_batched(pending)
+            else:
+                translated_texts = self._translate_texts_single(pending)
+        progress.end_stage(stage)
+
+        # Failed translations (None) are neither cached nor applied
+        fresh = {k: t for k, t in zip(pending, translated_texts) if t is not None}
+        self.failed = {k for k in pending if k not in fresh}
+        if self.cache is not None:
+            self.cache.put_many(self.provider, self.source_lang, self.target_lang, fresh)
+        known.update(fresh)
+        return segments.with_texts([known.get(k, text) for k, text in zip(keys, segments.texts)])
+
+    def _advance(self, n: int):
+        self._bar.update(n)
+        self._done += n
+        progress.advance(f"translate:{self.target_lang}", self._done, self._bar.total)
+
+    def _translate_texts_single(self, texts: List[str]) -> List[Optional[str]]:
+        """One provider call per text. Texts that fail after retries come back as None."""
+        results = []
         
         # Batching isn't natively supported by basic free API wrappers robustly,
         # so we iterate. For a production app, we'd use paid API batch endpoints.
-        for seg in tqdm(segments, desc="Translating", unit="seg"):
-            original_text = seg['text']
-            
+        for original_text in texts:
             try:
                 # Basic retry logic for free iterfaces
                 translated_text = self._translate_with_retry(original_text)
             except Exception as e:
                 print(f"\n⚠️ Translation failed for segment: '{original_text}'. Keeping original.", file=sys.stderr)
-                translated_text = original_text
-            
-            new_seg = seg.copy()
-            new_seg['text'] = translated_text
-            translated_segments.append(new_seg)
+                translated_text = None
+            results.append(translated_text)
+            self._advance(1)
             
             # Gentle rate limiting
-            time.sleep(0.1)
+            _sleep(0.1)
             
-        return translated_segments
+        return results
+
+    def _translate_texts_batched(self, texts: List[str]) -> List[Optional[str]]:
+        """
+        Pack many texts into each request, up to the provider's size limits.
+        Batches whose response can't be aligned back to their texts fall back to per-text calls.
+        """
+        results = list(texts)
+        batches = self._pack_batches(texts)
+        print(f"📦 Packed {sum(len(b) for b in batches)} segments into {len(batches)} requests.")
+
+        # Empty segments aren't sent at all
+        self._advance(len(texts) - sum(len(b) for b in batches))
+        for indices in batches:
+            batch_texts = [texts[i] for i in indices]
+            try:
+                translated = self._call_with_retry(self._translate_list, batch_texts)
+            except Exception as e:
+                print(f"\n⚠️ Batch translation failed ({e}). Retrying {len(indices)} segments one by one.", file=sys.stderr)
+                translated = self._translate_texts_single(batch_texts)
+            else:
+                self._advance(len(indices))
+            for i, text in zip(indices, translated):
+                results[i] = text
+
+            # Gentle rate limiting
+            _sleep(0.1)
+
+        return results
+
+    def _translate_texts_async(self, texts: List[str]) -> List[Optional[str]]:
+        """Same batches as _translate_texts_batched, sent concurrently over one pooled HTTP client."""
+        from .async_translator import AsyncTranslationEngine
+
+        batches = self._pack_batches(texts)
+        print(f"📦 Packed {sum(len(b) for b in batches)} segments into {len(batches)} requests, "
+              f"up to {self.concurrency} at a time.")
+        self._advance(len(texts) - sum(len(b) for b in batches))
+
+        engine = AsyncTranslationEngine(self.provider, self.translator._base_url, self.translator._source,
+                                        self.translator._target, api_key=self.api_key,
+                                        concurrency=self.concurrency, rate=self.rate)
+        return engine.translate_batches(texts, batches, on_done=self._advance)
+
+    def _batch_limits(self) -> Tuple[int, int]:
+        """(characters, texts) of one packed request."""
+        # Registered third-party providers get Google's conservative limits
+        return (MAX_BATCH_CHARS.get(self.provider, MAX_BATCH_CHARS['google']),
+                MAX_BATCH_TEXTS.get(self.provider, MAX_BATCH_TEXTS['google']))
+
+    def request_limits(self) -> Tuple[int, int]:
+        """(characters, texts) that go out in one round of requests: one batch, or `concurrency` batches at once."""
+        max_chars, max_texts = self._batch_limits()
+        rounds = self.concurrency if self.batch and self.concurrency > 0 else 1
+        return max_chars * rounds, max_texts * rounds
+
+    def _pack_batches(self, texts: List[str]) -> List[List[int]]:
+        """Group text indices into batches that fit the provider's request limits."""
+        max_chars, max_texts = self._batch_limits()
+
+        batches = []
+        current, current_chars = [], 0
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            size = len(text) + len(BATCH_DELIMITER)
+            if current and (current_chars + size > max_chars or len(current) >= max_texts):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(i)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+
+    def _translate_list(self, texts: List[str]) -> List[str]:
+        """Translate several texts in one request. Raises BatchAlignmentError if the response doesn't align."""
+        if self.provider == 'deepl':
+            return self._deepl_translate_list(texts)
+
+        # Collapse line breaks inside a segment so they can't be confused with the delimiter
+        lines = [" ".join(t.split()) for t in texts]
+        response = self.translator.translate(BATCH_DELIMITER.join(lines))
+        translated = [line.strip() for line in response.split(BATCH_DELIMITER) if line.strip()]
+        if len(translated) != len(texts):
+            raise BatchAlignmentError(f"sent {len(texts)} segments, got {len(translated)} back")
+        return translated
+
+    def _deepl_translate_list(self, texts: List[str]) -> List[str]:
+        """DeepL's native list endpoint: repeated 'text' fields, one translation per field."""
+        import requests
+
+        data = [('text', t) for t in texts]
+        data.append(('target_lang', self.translator._target))
+        if self.translator._source and self.translator._source != 'auto':
+            data.append(('source_lang', self.translator._source))
+
+        response = requests.post(
+            self.translator._base_url + "translate",
+            data=data,
+            headers={'Authorization': f"DeepL-Auth-Key {self.api_key}"},
+            timeout=60,
+        )
+        response.raise_for_status()
+        translated = [t['text'] for t in response.json()['translations']]
+        if len(translated) != len(texts):
+            raise BatchAlignmentError(f"sent {len(texts)} segments, got {len(translated)} back")
+        return translated
 
     def _translate_with_retry(self, text: str, retries: int = 3) -> str:
         if not text.strip():
             return ""
             
+        return self._call_with_retry(self.translator.translate, text, retries=retries)
+
+    def _call_with_retry(self, func, payload, retries: int = 3):
         for attempt in range(retries):
+            metrics.incr('translation_requests')
             try:
-                return self.translator.translate(text)
+                return func(payload)
+            except BatchAlignmentError:
+                # Misaligned batch: retrying the same request won't help
+                metrics.incr('translation_batch_misaligned')
+                raise
             except Exception as e:
                 if attempt == retries - 1:
+                    metrics.incr('translation_failures')
                     raise e
-                time.sleep(1) # Backoff
+                metrics.incr('translation_retries')
+                _sleep(1) # Backoff
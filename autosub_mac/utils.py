@@ -1,5 +1,8 @@
 import os
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict, Union
+
+if TYPE_CHECKING:
+    from .segments import SegmentStore
 
 def format_timestamp(seconds: float) -> str:
     """
@@ -13,7 +16,31 @@ def format_timestamp(seconds: float) -> str:
     
     return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
 
-def write_srt(segments: List[Dict], output_path: str):
+SUBTITLE_FORMATS = ("srt", "vtt", "json")
+
+def write_subtitles(segments: Union[List[Dict], 'SegmentStore'], output_path: str, fmt: str = "srt"):
+    """
+    Write segments as SRT, WebVTT or JSON ([{'start', 'end', 'text'}, ...]).
+    segments is a list of segment dicts or a SegmentStore. The whole file is formatted
+    into one buffer and written with a single call.
+    """
+    from .segments import SegmentStore
+
+    if fmt not in SUBTITLE_FORMATS:
+        raise ValueError(f"Unsupported subtitle format: {fmt}")
+    store = segments if isinstance(segments, SegmentStore) else SegmentStore.from_dicts(segments)
+
+    parent_dir = os.path.dirname(output_path)
+    if parent_dir and not os.path.exists(parent_dir):
+        os.makedirs(parent_dir)
+
+    data = store.to_srt() if fmt == "srt" else store.to_vtt() if fmt == "vtt" else store.to_json()
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+
+    print(f"✅ {fmt.upper()} file successfully saved to: {output_path}")
+
+def write_srt(segments: Union[List[Dict], 'SegmentStore'], output_path: str):
     """
     Write segments to an SRT file.
     segments expected format:
@@ -21,19 +48,36 @@ def write_srt(segments: List[Dict], output_path: str):
         {'start': 0.0, 'end': 2.0, 'text': 'Hello world'},
         ...
     ]
+    or a SegmentStore.
     """
-    parent_dir = os.path.dirname(output_path)
-    if parent_dir and not os.path.exists(parent_dir):
-        os.makedirs(parent_dir)
+    write_subtitles(segments, output_path, "srt")
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for i, segment in enumerate(segments, 1):
-            start_time = format_timestamp(segment['start'])
-            end_time = format_timestamp(segment['end'])
-            text = segment['text'].strip()
-            
-            f.write(f"{i}\n")
-            f.write(f"{start_time} --> {end_time}\n")
-            f.write(f"{text}\n\n")
-
-    print(f"✅ SRT file successfully saved to: {output_path}")
+class SubtitleStreamWriter:
+    """
+    Write subtitle cues one at a time to an open text stream (a file or stdout), flushing
+    after each one so that live captions show up as soon as they are final.
+    fmt is 'srt' or 'vtt'.
+    """
+
+    def __init__(self, fp, fmt: str = "srt"):
+        if fmt not in ("srt", "vtt"):
+            raise ValueError(f"Unsupported subtitle format: {fmt}")
+        self.fp = fp
+        self.fmt = fmt
+        self.count = 0
+        if fmt == "vtt":
+            fp.write("WEBVTT\n\n")
+            fp.flush()
+
+    def write(self, segment: Dict):
+        self.count += 1
+        start_time = format_timestamp(segment['start'])
+        end_time = format_timestamp(segment['end'])
+        text = segment['text'].strip()
+
+        if self.fmt == "vtt":
+            # WebVTT uses '.' before the milliseconds and needs no cue numbers
+            self.fp.write(f"{start_time.replace(',', '.')} --> {end_time.replace(',', '.')}\n{text}\n\n")
+        else:
+            self.fp.write(f"{self.count}\n{start_time} --> {end_time}\n{text}\n\n")
+        self.fp.flush()
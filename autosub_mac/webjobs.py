@@ -0,0 +1,356 @@
+"""
+Job plumbing for the Streamlit app (app.py), kept free of Streamlit so it can be shared by
+every session of one app process:
+
+- save_upload streams an upload to disk in fixed-size chunks,
+- WorkDirPool gives each job its own work directory and evicts finished ones by age,
+  count and total size,
+- JobExecutor runs jobs on a bounded pool of background threads, so the script thread only
+  submits and polls,
+- SubtitlePager indexes a subtitle file once and reads it one page of cues at a time.
+"""
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from .cache import default_cache_dir
+from .service import submit_job, get_job
+
+UPLOAD_CHUNK_BYTES = 8 << 20
+# Free space left on the volume after an upload is saved
+DISK_RESERVE_BYTES = 1 << 30
+# Lines of a job's log kept for display
+LOG_TAIL_LINES = 15
+
+
+def default_work_root() -> str:
+    return os.path.join(default_cache_dir(), "webui", "jobs")
+
+
+def save_upload(upload, path: str, size: Optional[int] = None, chunk_bytes: int = UPLOAD_CHUNK_BYTES) -> int:
+    """
+    Copy a file-like upload to path in chunk_bytes pieces. Refuses (OSError) when the volume
+    wouldn't keep DISK_RESERVE_BYTES free. A partial file is removed on failure. Returns the bytes written.
+    """
+    if size is not None:
+        free = shutil.disk_usage(os.path.dirname(path) or ".").free
+        if size + DISK_RESERVE_BYTES > free:
+            raise OSError(f"Not enough disk space for the upload ({size / 1e9:.1f} GB, {free / 1e9:.1f} GB free).")
+
+    upload.seek(0)
+    written = 0
+    try:
+        with open(path, 'wb') as f:
+            for block in iter(lambda: upload.read(chunk_bytes), b''):
+                f.write(block)
+                written += len(block)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class WorkDirPool:
+    """
+    One work directory per job under root. Directories of finished jobs are evicted, oldest
+    first, once they're older than max_age_sec or while there are more than max_dirs of them or
+    they take more than max_bytes together. Directories of running jobs are never evicted.
+    Directories left by an earlier app process count as finished as of their mtime.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = 20 << 30, max_age_sec: float = 6 * 3600,
+                 max_dirs: int = 200):
+        self.root = root or default_work_root()
+        self.max_bytes = max_bytes
+        self.max_age_sec = max_age_sec
+        self.max_dirs = max_dirs
+        self._lock = threading.Lock()
+        self._active = set()
+        os.makedirs(self.root, exist_ok=True)
+        self._finished: Dict[str, float] = {}
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isdir(path):
+                self._finished[name] = os.path.getmtime(path)
+        self.evict()
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def create(self, job_id: str) -> str:
+        """Make the job's directory, after evicting what the policy allows."""
+        self.evict()
+        path = self.path(job_id)
+        os.makedirs(path)
+        with self._lock:
+            self._active.add(job_id)
+        return path
+
+    def release(self, job_id: str):
+        """The job finished: its directory can be evicted from now on."""
+        with self._lock:
+            self._active.discard(job_id)
+            self._finished[job_id] = time.time()
+        self.evict()
+
+    def remove(self, job_id: str):
+        """Delete the job's directory right away (a job that never ran)."""
+        with self._lock:
+            self._active.discard(job_id)
+            self._finished.pop(job_id, None)
+        shutil.rmtree(self.path(job_id), ignore_errors=True)
+
+    def exists(self, job_id: str) -> bool:
+        return os.path.isdir(self.path(job_id))
+
+    def evict(self) -> List[str]:
+        """Apply the eviction policy. Returns the evicted job ids."""
+        with self._lock:
+            now = time.time()
+            candidates = sorted(self._finished.items(), key=lambda item: item[1])
+            sizes = {job_id: _dir_size(self.path(job_id)) for job_id, _ in candidates}
+            total = sum(sizes.values()) + sum(_dir_size(self.path(job_id)) for job_id in self._active)
+            remaining = len(candidates)
+
+            evicted = []
+            for job_id, finished in candidates:
+                if now - finished <= self.max_age_sec and remaining <= self.max_dirs and total <= self.max_bytes:
+                    break
+                shutil.rmtree(self.path(job_id), ignore_errors=True)
+                del self._finished[job_id]
+                total -= sizes[job_id]
+                remaining -= 1
+                evicted.append(job_id)
+            return evicted
+
+
+class JobExecutor:
+    """
+    Runs jobs on max_workers background threads with at most queue_size waiting, shared by all
+    sessions. A job is a task(job_id, work_dir, update) callable returning its output paths;
+    update(**fields) publishes progress ('event', 'log', ...) that get() returns to the UI.
+    Jobs created but still not submitted after created_ttl_sec (a session that went away
+    mid-upload) are discarded.
+    """
+
+    def __init__(self, workdirs: WorkDirPool, max_workers: int = 2, queue_size: int = 8,
+                 created_ttl_sec: float = 3600):
+        self.workdirs = workdirs
+        self.created_ttl_sec = created_ttl_sec
+        self.jobs: Dict[str, Dict] = {}
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._jobs_lock = threading.Lock()
+        for i in range(max_workers):
+            threading.Thread(target=self._worker_loop, name=f"autosub-web-{i}", daemon=True).start()
+
+    def create(self) -> Dict:
+        """
+        Reserve a job and its work directory (to save an upload into) before submitting it.
+        Raises queue.Full when the queue has no room.
+        """
+        self._expire_created()
+        if self._queue.full():
+            raise queue.Full
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'created',
+            'work_dir': self.workdirs.create(job_id),
+            'outputs': [],
+            'event': None,
+            'log': "",
+            'error': None,
+            'created': time.time(),
+            'submitted': None,
+            'started': None,
+            'finished': None,
+        }
+        with self._jobs_lock:
+            self.jobs[job_id] = job
+        return dict(job)
+
+    def submit(self, job_id: str, task: Callable[[str, str, Callable[..., None]], List[str]]):
+        """Queue a created job. Raises queue.Full (and drops the job) when the queue filled up meanwhile."""
+        self._update(job_id, status='queued', submitted=time.time())
+        try:
+            self._queue.put_nowait((job_id, task))
+        except queue.Full:
+            self.discard(job_id)
+            raise
+
+    def discard(self, job_id: str):
+        """Forget a job that won't run and free its directory."""
+        with self._jobs_lock:
+            self.jobs.pop(job_id, None)
+        self.workdirs.remove(job_id)
+
+    def _expire_created(self):
+        cutoff = time.time() - self.created_ttl_sec
+        with self._jobs_lock:
+            # Checked and dropped under one lock, so a job being submitted right now is left alone
+            expired = [j for j, job in self.jobs.items() if job['status'] == 'created' and job['created'] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+        for job_id in expired:
+            self.workdirs.remove(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._jobs_lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self) -> Dict:
+        with self._jobs_lock:
+            running = sum(1 for job in self.jobs.values() if job['status'] == 'running')
+        return {'running': running, 'queued': self._queue.qsize(), 'queue_size': self._queue.maxsize}
+
+    def _worker_loop(self):
+        while True:
+            job_id, task = self._queue.get()
+            job = self._update(job_id, status='running', started=time.time())
+            try:
+                outputs = task(job_id, job['work_dir'], lambda **fields: self._update(job_id, **fields))
+                self._update(job_id, status='done', outputs=outputs, finished=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status='failed', error=str(e), finished=time.time())
+            finally:
+                self.workdirs.release(job_id)
+                self._forget_evicted()
+                self._queue.task_done()
+
+    def _update(self, job_id: str, **fields) -> Dict:
+        with self._jobs_lock:
+            job = self.jobs[job_id]
+            job.update(fields)
+            return dict(job)
+
+    def _forget_evicted(self):
+        # Finished jobs whose directory was evicted have nothing left to show
+        with self._jobs_lock:
+            for job_id in [j for j, job in self.jobs.items() if job['finished'] and not self.workdirs.exists(j)]:
+                del self.jobs[job_id]
+
+
+def _log_tail(path: str, lines: int = LOG_TAIL_LINES, max_bytes: int = 64 << 10) -> str:
+    """Last lines of a log, reading only its end."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - max_bytes))
+        return b"\n".join(f.read().splitlines()[-lines:]).decode('utf-8', errors='replace')
+
+
+def cli_task(cmd: List[str]) -> Callable[[str, str, Callable[..., None]], List[str]]:
+    """
+    A job running autosub_mac.main as a subprocess. Progress events come over --progress-fd
+    and are published as update(event=...); output goes to <work dir>/job.log.
+    """
+    def task(job_id: str, work_dir: str, update: Callable[..., None]) -> List[str]:
+        read_fd, write_fd = os.pipe()
+        log_path = os.path.join(work_dir, "job.log")
+        outputs = []
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            process = subprocess.Popen(
+                [*cmd, "--progress-fd", str(write_fd)],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                pass_fds=(write_fd,),
+            )
+        os.close(write_fd)
+        with os.fdopen(read_fd, "r", encoding="utf-8") as events:
+            for line in events:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event['event'] == 'done':
+                    outputs = event.get('outputs') or []
+                update(event=event)
+        return_code = process.wait()
+        update(log=_log_tail(log_path))
+        if return_code != 0:
+            raise RuntimeError(f"autosub_mac.main exited with status {return_code}.")
+        return outputs
+
+    return task
+
+
+def service_task(server: str, video_path: str, options: Dict,
+                 poll_interval: float = 1.0) -> Callable[[str, str, Callable[..., None]], List[str]]:
+    """A job handed to a resident autosub_mac.service, polled until it finishes."""
+    def task(job_id: str, work_dir: str, update: Callable[..., None]) -> List[str]:
+        job = submit_job(server, video_path, options)
+        update(log=f"📨 Submitted job {job['id']} to {server}")
+        while job['status'] not in ('done', 'failed'):
+            time.sleep(poll_interval)
+            job = get_job(server, job['id'])
+            update(log=f"📨 Job {job['id']} on {server}: {job['status']}")
+        if job['status'] == 'failed':
+            raise RuntimeError(job['error'])
+        return job['outputs']
+
+    return task
+
+
+def main_command(video_path: str, options: List[str]) -> List[str]:
+    return [sys.executable, "-m", "autosub_mac.main", video_path, *options]
+
+
+class SubtitlePager:
+    """
+    Page through a subtitle file without loading it: the byte offset of every cue is indexed
+    in one streaming pass, then each page is read with a single seek. A WebVTT file's header
+    block (WEBVTT and any lines after it) isn't a cue and isn't shown.
+    """
+
+    def __init__(self, path: str, page_size: int = 50):
+        self.path = path
+        self.page_size = page_size
+        self.offsets: List[int] = []
+        with open(path, 'rb') as f:
+            offset = 0
+            in_cue = False
+            for line in f:
+                blank = not line.strip()
+                if not blank and not in_cue:
+                    header = offset == 0 and line.lstrip(b'\xef\xbb\xbf').startswith(b'WEBVTT')
+                    if not header:
+                        self.offsets.append(offset)
+                in_cue = not blank
+                offset += len(line)
+        self.size = offset
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-len(self.offsets) // self.page_size))
+
+    def page(self, number: int) -> str:
+        """Cues of page number (0-based) as text."""
+        first = number * self.page_size
+        if first >= len(self.offsets):
+            return ""
+        last = first + self.page_size
+        end = self.offsets[last] if last < len(self.offsets) else self.size
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[first])
+            return f.read(end - self.offsets[first]).decode('utf-8', errors='replace')
@@ -0,0 +1,161 @@
+"""
+Deterministic stand-ins for the Whisper model and the translation provider,
+so the benchmarks run without network access or model downloads.
+"""
+import html
+import json
+import math
+import threading
+import time
+import wave
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_RATE = 16000
+
+class FakeSegment:
+    def __init__(self, t0: int, t1: int, text: str):
+        # pywhispercpp reports times in centiseconds
+        self.t0 = t0
+        self.t1 = t1
+        self.text = text
+
+class FakeModel:
+    """
+    Drop-in for pywhispercpp.model.Model.
+    Emits one segment every segment_sec of audio and spends cost_per_audio_sec of wall
+    time per second of audio, so throughput numbers scale like a real model's.
+    """
+    segment_sec = 3.0
+    cost_per_audio_sec = 0.005
+
+    def __init__(self, model: str = "base", **kwargs):
+        self.model = model
+
+    def transcribe(self, media, n_threads: int = 1, **params):
+        duration = _duration(media)
+        time.sleep(duration * self.cost_per_audio_sec)
+
+        segments = []
+        t = 0.0
+        k = 0
+        while t < duration:
+            end = min(duration, t + self.segment_sec)
+            segments.append(FakeSegment(int(t * 100), int(end * 100), f" Segment number {k} of the benchmark."))
+            t = end
+            k += 1
+        return segments
+
+def _duration(media) -> float:
+    if isinstance(media, str):
+        with wave.open(media, 'rb') as w:
+            return w.getnframes() / w.getframerate()
+    return len(media) / SAMPLE_RATE
+
+class RateLimitError(Exception):
+    pass
+
+class FakeTranslationBackend:
+    """
+    Local stand-in for a deep_translator translator object.
+    Each call takes latency_sec; more than max_requests calls within window_sec
+    raise RateLimitError, like a provider answering 429.
+    """
+
+    def __init__(self, latency_sec: float = 0.02, max_requests: int = 20, window_sec: float = 1.0):
+        self.latency_sec = latency_sec
+        self.max_requests = max_requests
+        self.window_sec = window_sec
+        self.requests = 0
+        self.rate_limited = 0
+        self.characters = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def translate(self, text: str) -> str:
+        if self._admit(text) is not None:
+            raise RateLimitError("Too many requests")
+        time.sleep(self.latency_sec)
+        return fake_translation(text)
+
+    def _admit(self, text: str):
+        """Count a request. Returns the seconds until the window frees up if it's over the limit, else None."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > self.window_sec:
+                self._recent.popleft()
+            self.requests += 1
+            if len(self._recent) >= self.max_requests:
+                self.rate_limited += 1
+                return self.window_sec - (now - self._recent[0])
+            self._recent.append(now)
+            self.characters += len(text)
+        return None
+
+def fake_translation(text: str) -> str:
+    # Deterministic "translation" that keeps line structure intact
+    return "\n".join(f"[xx] {line}" for line in text.split("\n"))
+
+class MockTranslationServer(FakeTranslationBackend):
+    """
+    FakeTranslationBackend behind a local HTTP server that speaks the two endpoints the async
+    translator uses: Google's mobile page (GET /m?q=...) and DeepL's POST /v2/translate.
+    Over the rate limit it answers 429 with a Retry-After header, like the real providers.
+
+        with MockTranslationServer() as server:
+            translator.translator._base_url = server.google_url
+    """
+
+    def __init__(self, latency_sec: float = 0.02, max_requests: int = 20, window_sec: float = 1.0):
+        super().__init__(latency_sec, max_requests, window_sec)
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                text = parse_qs(url.query).get('q', [''])[0]
+                self._answer(text, lambda: f'<html><body><div class="result-container">{html.escape(fake_translation(text))}</div></body></html>',
+                             "text/html")
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                texts = parse_qs(self.rfile.read(length).decode('utf-8')).get('text', [])
+                body = lambda: json.dumps({'translations': [{'text': fake_translation(t)} for t in texts]})
+                self._answer("\n".join(texts), body, "application/json")
+
+            def _answer(self, text, body, content_type):
+                wait = backend._admit(text)
+                if wait is not None:
+                    self.send_response(429)
+                    self.send_header('Retry-After', str(max(1, math.ceil(wait))))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                time.sleep(backend.latency_sec)
+                data = body().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self.google_url = self.url + "/m"
+        self.deepl_url = self.url + "/v2/"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
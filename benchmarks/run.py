@@ -0,0 +1,174 @@
+"""
+Offline benchmark suite for the subtitle pipeline.
+
+Generates synthetic audio/video fixtures with ffmpeg, swaps in the deterministic FakeModel and
+FakeTranslationBackend (plus a local mock HTTP translation server), and reports wall time, real-time factor (RTF = processing time / audio
+duration, lower is better) and throughput per stage. Results are saved as JSON so runs can be
+compared across commits:
+
+    python -m benchmarks.run --durations 60,600 --output bench.json
+    python -m benchmarks.run --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from autosub_mac import audio, backends, transcriber, translator
+from autosub_mac.utils import write_srt
+from .fakes import FakeModel, FakeTranslationBackend, MockTranslationServer
+
+def make_fixture(path: str, duration: float):
+    """
+    Small video with a speech-like audio track: a tone switched on and off
+    every few seconds, so roughly a third of the audio is silence.
+    """
+    import ffmpeg
+
+    video = ffmpeg.input(f"color=c=black:s=160x120:r=5:d={duration}", f='lavfi')
+    tone = ffmpeg.input(
+        f"aevalsrc='0.3*sin(2*PI*220*t)*gt(sin(2*PI*0.15*t)\\,-0.5)':s=16000:d={duration}",
+        f='lavfi',
+    )
+    (
+        ffmpeg
+        .output(video, tone, path, vcodec='libx264', preset='ultrafast', acodec='aac')
+        .overwrite_output()
+        .run(quiet=True)
+    )
+
+def timed(func: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def stage_result(stage: str, duration: float, wall: float, **extra) -> Dict:
+    result = {'stage': stage, 'audio_sec': duration, 'wall_sec': round(wall, 4),
+              'rtf': round(wall / duration, 5) if duration else None}
+    result.update(extra)
+    return result
+
+def bench_duration(duration: float, work_dir: str, chunk_sec: int, latency: float) -> List[Dict]:
+    results = []
+    video_path = os.path.join(work_dir, f"fixture_{int(duration)}s.mp4")
+    make_fixture(video_path, duration)
+
+    wav_path = os.path.join(work_dir, f"fixture_{int(duration)}s.wav")
+    _, wall = timed(audio.extract_audio, video_path, wav_path)
+    results.append(stage_result('extract_audio', duration, wall))
+
+    chunk_paths, wall = timed(audio.split_audio, wav_path, chunk_sec)
+    results.append(stage_result('split_audio', duration, wall, chunks=len(chunk_paths)))
+
+    samples, wall = timed(audio.load_audio, video_path)
+    results.append(stage_result('load_audio', duration, wall))
+
+    chunks = audio.split_samples(samples, chunk_sec)
+    whisper = transcriber.WhisperTranscriber(model_name="fake", n_threads=1)
+    segments, wall = timed(
+        whisper.transcribe_batch,
+        [c['audio'] for c in chunks],
+        offsets=[c['start'] for c in chunks],
+    )
+    results.append(stage_result('transcribe_batch', duration, wall, chunks=len(chunks),
+                                segments=len(segments), segments_per_sec=round(len(segments) / wall, 1)))
+
+    for batch in (True, False):
+        backend = FakeTranslationBackend(latency_sec=latency)
+        subtitle_translator = translator.SubtitleTranslator(target_lang='fr', batch=batch)
+        subtitle_translator.translator = backend
+        translated, wall = timed(subtitle_translator.translate_segments, segments)
+        results.append(stage_result(
+            'translate_segments' if batch else 'translate_segments_single', duration, wall,
+            segments=len(segments), requests=backend.requests, rate_limited=backend.rate_limited,
+            segments_per_sec=round(len(segments) / wall, 1),
+        ))
+
+    # Same batches over HTTP, concurrently, against a local server that answers 429s
+    with MockTranslationServer(latency_sec=latency) as server:
+        subtitle_translator = translator.SubtitleTranslator(target_lang='fr', concurrency=8, rate=15)
+        subtitle_translator.translator._base_url = server.google_url
+        _, wall = timed(subtitle_translator.translate_segments, segments)
+        results.append(stage_result(
+            'translate_segments_async', duration, wall,
+            segments=len(segments), requests=server.requests, rate_limited=server.rate_limited,
+            segments_per_sec=round(len(segments) / wall, 1),
+        ))
+
+    srt_path = os.path.join(work_dir, f"fixture_{int(duration)}s.srt")
+    _, wall = timed(write_srt, translated, srt_path)
+    results.append(stage_result('write_srt', duration, wall, segments=len(translated),
+                                segments_per_sec=round(len(translated) / wall, 1)))
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+def compare(current: Dict, baseline_path: str):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {(r['stage'], r['audio_sec']): r for r in baseline['results']}
+    print(f"\n📊 Compared with {baseline.get('commit', '?')} ({baseline_path}):")
+    for r in current['results']:
+        prev = old.get((r['stage'], r['audio_sec']))
+        if not prev or not prev['wall_sec']:
+            continue
+        change = (r['wall_sec'] - prev['wall_sec']) / prev['wall_sec'] * 100
+        flag = "⚠️ " if change > 10 else "  "
+        print(f"{flag}{r['stage']:<28} {r['audio_sec']:>7.0f}s  {prev['wall_sec']:>9.3f}s -> {r['wall_sec']:>9.3f}s ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks with a stand-in model and translator.")
+    parser.add_argument("--durations", default="30,300", help="Comma-separated fixture lengths in seconds. Defaults to '30,300'.")
+    parser.add_argument("--chunk-sec", type=int, default=60, help="Chunk length for split/transcribe. Defaults to 60.")
+    parser.add_argument("--model-cost", type=float, default=FakeModel.cost_per_audio_sec, help="Fake model seconds of work per second of audio.")
+    parser.add_argument("--translate-latency", type=float, default=0.02, help="Fake translation latency per request in seconds.")
+    parser.add_argument("--output", default="bench_output.json", help="Where to write the JSON results. Defaults to bench_output.json.")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against.")
+    args = parser.parse_args()
+
+    if shutil.which("ffmpeg") is None:
+        parser.error("ffmpeg is required to generate the fixtures.")
+
+    # Stand-ins: no model download, no network
+    FakeModel.cost_per_audio_sec = args.model_cost
+    backends.register_transcription_backend('whispercpp', FakeModel)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'settings': {'chunk_sec': args.chunk_sec, 'model_cost': args.model_cost,
+                     'translate_latency': args.translate_latency},
+        'results': [],
+    }
+    work_dir = tempfile.mkdtemp(prefix="autosub_bench_")
+    try:
+        for duration in [float(d) for d in args.durations.split(",") if d.strip()]:
+            print(f"\n⏱️  Benchmarking {duration:.0f}s fixture...")
+            report['results'].extend(bench_duration(duration, work_dir, args.chunk_sec, args.translate_latency))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n📊 Results:")
+    for r in report['results']:
+        print(f"   {r['stage']:<28} {r['audio_sec']:>7.0f}s audio  {r['wall_sec']:>9.3f}s  RTF {r['rtf']}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to: {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
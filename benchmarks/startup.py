@@ -0,0 +1,121 @@
+"""
+CLI startup benchmark.
+
+Times fresh interpreters importing the entry points (median of several runs) and reads
+`python -X importtime` to report the slowest imports and whether any backend library
+(pywhispercpp, deep_translator, ffmpeg, tqdm, requests, httpx) or numpy was loaded at
+startup, which backends.py and the in-function imports of the audio code are meant to
+prevent. Results are saved as JSON to compare across commits:
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --compare startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from .run import git_commit
+
+# What a short job, `--help`, and the service/worker entry points pay before doing anything
+TARGETS = {
+    'import_main': ["-c", "import autosub_mac.main"],
+    'main_help': ["-m", "autosub_mac.main", "--help"],
+    'import_service': ["-c", "import autosub_mac.service"],
+    'import_distributed': ["-c", "import autosub_mac.distributed"],
+}
+# Only to be imported once the backend (or, for numpy, the audio pipeline) is actually used
+BACKEND_MODULES = ('pywhispercpp', 'deep_translator', 'ffmpeg', 'tqdm', 'requests', 'httpx', 'numpy')
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """`-X importtime` lines -> [{'module', 'self_us', 'cumulative_us'}, ...]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append({'module': name.strip(), 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+    return modules
+
+def bench_target(name: str, argv: List[str], repeat: int, top: int) -> Dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *argv], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        walls.append(time.perf_counter() - start)
+
+    traced = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = parse_importtime(traced.stderr)
+    backends = sorted({m['module'].split(".")[0] for m in modules} & set(BACKEND_MODULES))
+    return {
+        'target': name,
+        'wall_sec': round(statistics.median(walls), 4),
+        'wall_min_sec': round(min(walls), 4),
+        'imports': len(modules),
+        'import_sec': round(sum(m['self_us'] for m in modules) / 1e6, 4),
+        'backends_imported': backends,
+        'slowest': sorted(modules, key=lambda m: m['self_us'], reverse=True)[:top],
+    }
+
+def compare(current: Dict, baseline_path: str):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    old = {r['target']: r for r in baseline['results']}
+    print(f"\n📊 Compared with {baseline.get('commit', '?')} ({baseline_path}):")
+    for r in current['results']:
+        prev = old.get(r['target'])
+        if not prev or not prev['wall_sec']:
+            continue
+        change = (r['wall_sec'] - prev['wall_sec']) / prev['wall_sec'] * 100
+        flag = "⚠️ " if change > 10 else "  "
+        print(f"{flag}{r['target']:<20} {prev['wall_sec'] * 1000:>7.0f}ms -> {r['wall_sec'] * 1000:>7.0f}ms ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure interpreter startup and import time of the CLI entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target; the median is reported. Defaults to 5.")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to keep per target. Defaults to 10.")
+    parser.add_argument("--output", default="startup_output.json", help="Where to write the JSON results. Defaults to startup_output.json.")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against.")
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'results': [],
+    }
+    baseline = [sys.executable, "-c", "pass"]
+    start = time.perf_counter()
+    subprocess.run(baseline, check=True)
+    report['interpreter_sec'] = round(time.perf_counter() - start, 4)
+
+    for name, argv in TARGETS.items():
+        print(f"⏱️  {name}...")
+        report['results'].append(bench_target(name, argv, args.repeat, args.top))
+
+    print(f"\n📊 Results (bare interpreter {report['interpreter_sec'] * 1000:.0f}ms):")
+    for r in report['results']:
+        flag = "⚠️ " if r['backends_imported'] else "  "
+        loaded = f"  backends loaded: {', '.join(r['backends_imported'])}" if r['backends_imported'] else ""
+        print(f"{flag}{r['target']:<20} {r['wall_sec'] * 1000:>7.0f}ms  {r['imports']:>4} imports "
+              f"({r['import_sec'] * 1000:.0f}ms){loaded}")
+        for m in r['slowest'][:3]:
+            print(f"     {m['module']:<40} {m['self_us'] / 1000:>7.1f}ms")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to: {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from autosub_mac.async_translator import AsyncTranslationEngine
+from autosub_mac.metrics import metrics
+from benchmarks.fakes import MockTranslationServer, fake_translation
+
+
+def test_rate_limited_requests_wait_for_retry_after():
+    texts = [f"line {i}" for i in range(4)]
+    done = []
+    metrics.reset()
+    # Two requests per second get through; the rest are answered 429 with Retry-After: 1
+    with MockTranslationServer(latency_sec=0.0, max_requests=2, window_sec=1.0) as server:
+        engine = AsyncTranslationEngine('google', server.google_url, 'en', 'fr', concurrency=4, rate=100.0)
+        translated = engine.translate_batches(texts, [[i] for i in range(len(texts))], on_done=done.append)
+        rate_limited = server.rate_limited
+
+    # Placed by index, whatever order the retries finished in
+    assert translated == [fake_translation(text) for text in texts]
+    assert sum(done) == len(texts)
+    assert rate_limited >= 2
+    counters = metrics.report()['counters']
+    assert counters['translation_rate_limited'] == rate_limited
+    # Each retry slept as long as the server asked, not a short jittered backoff
+    assert counters['translation_sleep_sec'] >= rate_limited * 1.0
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from autosub_mac import audio as audio_module
+from autosub_mac.audio import SAMPLE_RATE, ParallelChunkExtractor, detect_speech_chunks
+
+
+def _signal(*parts):
+    """Concatenate (kind, seconds) parts: 'tone' is a loud 440 Hz sine, 'silence' is zeros."""
+    pieces = []
+    for kind, seconds in parts:
+        n = int(seconds * SAMPLE_RATE)
+        if kind == 'tone':
+            pieces.append(0.5 * np.sin(2 * np.pi * 440 * np.arange(n) / SAMPLE_RATE).astype(np.float32))
+        else:
+            pieces.append(np.zeros(n, dtype=np.float32))
+    return np.concatenate(pieces)
+
+
+def _spans(chunks):
+    return [(c['start'], c['end']) for c in chunks]
+
+
+def _near(spans, expected):
+    """Equal up to one 30ms frame: speech starts and ends are found on frame boundaries."""
+    return len(spans) == len(expected) and all(
+        abs(a - b) <= 0.03 for span, want in zip(spans, expected) for a, b in zip(span, want))
+
+
+def test_long_silence_is_skipped_and_chunks_are_padded():
+    audio = _signal(('silence', 1.0), ('tone', 2.0), ('silence', 5.0), ('tone', 3.0), ('silence', 1.0))
+
+    chunks = detect_speech_chunks(audio, max_chunk_sec=30)
+
+    assert _near(_spans(chunks), [(0.8, 3.2), (7.8, 11.2)])
+    assert all(len(c['audio']) == round((c['end'] - c['start']) * SAMPLE_RATE) for c in chunks)
+
+
+def test_short_pauses_stay_in_one_chunk():
+    audio = _signal(('tone', 2.0), ('silence', 0.15), ('tone', 2.0), ('silence', 1.0), ('tone', 1.0))
+
+    assert _near(_spans(detect_speech_chunks(audio, max_chunk_sec=30)), [(0.0, 6.15)])
+
+
+def test_long_speech_is_cut_into_chunks_of_at_most_max_chunk_sec():
+    audio = _signal(('tone', 10.0))
+
+    chunks = detect_speech_chunks(audio, max_chunk_sec=3)
+
+    assert all(c['end'] - c['start'] <= 3.0 for c in chunks)
+    # Cut inside one region: the chunks touch and cover all of it
+    assert chunks[0]['start'] == 0.0 and chunks[-1]['end'] >= 9.99
+    assert all(a['end'] == b['start'] for a, b in zip(chunks, chunks[1:]))
+
+
+def test_silence_only_has_no_chunks():
+    assert detect_speech_chunks(_signal(('silence', 3.0))) == []
+
+
+@pytest.mark.parametrize("max_chunk_sec", [0.0, 0.03, 0.059])
+def test_max_chunk_shorter_than_two_frames_is_rejected(max_chunk_sec):
+    with pytest.raises(ValueError):
+        detect_speech_chunks(_signal(('tone', 1.0)), max_chunk_sec=max_chunk_sec)
+
+
+class StubExtractor(ParallelChunkExtractor):
+    """Decodes chunk i to i+1 samples, fails on the indexes in `broken`, and counts decodes started."""
+
+    def __init__(self, tmp_path, monkeypatch, chunks, workers, broken=()):
+        video = tmp_path / "video.mp4"
+        video.write_bytes(b"")
+        monkeypatch.setattr(audio_module, 'probe_duration', lambda path: chunks * 10.0)
+        super().__init__(str(video), 10.0, workers=workers)
+        self.broken = set(broken)
+        self.started = []
+        self._lock = threading.Lock()
+
+    def decode_chunk(self, index):
+        with self._lock:
+            self.started.append(index)
+        if index in self.broken:
+            raise RuntimeError("corrupt packet")
+        return np.zeros(index + 1, dtype=np.float32)
+
+
+def test_iter_ready_skips_chunks_and_drops_failed_decodes(tmp_path, monkeypatch):
+    extractor = StubExtractor(tmp_path, monkeypatch, chunks=6, workers=2, broken={4})
+
+    ready = dict(extractor.iter_ready(skip=[0, 3]))
+
+    assert sorted(ready) == [1, 2, 5]
+    assert all(len(samples) == index + 1 for index, samples in ready.items())
+    assert sorted(extractor.started) == [1, 2, 4, 5]
+
+
+def test_iter_ready_keeps_at_most_two_chunks_per_worker_ahead(tmp_path, monkeypatch):
+    extractor = StubExtractor(tmp_path, monkeypatch, chunks=20, workers=2)
+    consumed = 0
+
+    for _ in extractor.iter_ready():
+        consumed += 1
+        # Give the decoders time to run ahead if nothing held them back
+        time.sleep(0.01)
+        assert len(extractor.started) - consumed <= 2 * extractor.workers
+
+    assert consumed == 20
+
+
+def test_decode_all_decodes_up_front(tmp_path, monkeypatch):
+    extractor = StubExtractor(tmp_path, monkeypatch, chunks=4, workers=2, broken={2})
+
+    decoded = extractor.decode_all()
+    assert sorted(extractor.started) == [0, 1, 2, 3]
+
+    assert len(decoded) == 4 and decoded.offsets == extractor.offsets
+    assert [index for index, _ in decoded.iter_ready(skip=[0])] == [1, 3]
+    assert len(decoded.decode_chunk(3)) == 4
+    assert sorted(extractor.started) == [0, 1, 2, 3]
@@ -0,0 +1,31 @@
+import pytest
+
+from autosub_mac import autotune
+from autosub_mac.autotune import candidate_grid, load_tuning, save_tuning
+
+CONFIG = {'workers': 4, 'n_threads': 2, 'segment_duration': 60}
+
+
+@pytest.mark.parametrize("recorded_cpus, expected", [(8, CONFIG), (16, None)])
+def test_tuning_from_another_core_count_is_ignored(tmp_path, monkeypatch, recorded_cpus, expected):
+    monkeypatch.setattr(autotune.os, 'cpu_count', lambda: 8)
+    save_tuning("base", dict(CONFIG, cpu_count=recorded_cpus), str(tmp_path))
+
+    tuning = load_tuning("base", str(tmp_path))
+
+    assert (tuning and {k: tuning[k] for k in CONFIG}) == expected
+    assert load_tuning("small", str(tmp_path)) is None
+
+
+def test_default_grid_never_oversubscribes_the_cores():
+    grid = candidate_grid(6)
+
+    assert {c['workers'] for c in grid} == {1, 2, 4}
+    assert all(c['workers'] * c['n_threads'] <= 6 for c in grid)
+    assert {c['segment_duration'] for c in grid} == {30, 60, 120}
+
+
+def test_explicit_threads_that_oversubscribe_are_left_out():
+    grid = candidate_grid(8, workers=[1, 4], threads=[1, 2, 4], chunk_lengths=[60])
+
+    assert [(c['workers'], c['n_threads']) for c in grid] == [(1, 1), (1, 2), (1, 4), (4, 1), (4, 2)]
@@ -0,0 +1,85 @@
+import types
+
+import numpy as np
+
+from autosub_mac import cache as cache_module
+from autosub_mac.backends import register_transcription_backend
+from autosub_mac.cache import TranscriptCache, TranslationCache
+from autosub_mac.transcriber import WhisperTranscriber
+from benchmarks.fakes import SAMPLE_RATE, FakeModel
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1, 100))
+    monkeypatch.setattr(cache_module, 'time', types.SimpleNamespace(time=lambda: float(next(clock))))
+    cache = TranslationCache(str(tmp_path / "translations.sqlite"), max_entries=3)
+
+    for text in ("a", "b", "c"):
+        cache.put_many('google', 'en', 'fr', {text: text.upper()})
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get_many('google', 'en', 'fr', ["a"]) == {'a': "A"}
+    cache.put_many('google', 'en', 'fr', {'d': "D"})
+
+    assert cache.get_many('google', 'en', 'fr', ["a", "b", "c", "d"]) == {'a': "A", 'c': "C", 'd': "D"}
+    assert cache.stats() == {'hits': 4, 'misses': 1}
+    cache.close()
+
+
+def test_entries_are_keyed_by_provider_and_languages(tmp_path):
+    cache = TranslationCache(str(tmp_path / "translations.sqlite"))
+    cache.put_many('google', 'en', 'fr', {'hello': "bonjour"})
+
+    assert cache.get_many('deepl', 'en', 'fr', ["hello"]) == {}
+    assert cache.get_many('google', 'en', 'de', ["hello"]) == {}
+    assert cache.get_many('google', 'en', 'fr', ["hello"]) == {'hello': "bonjour"}
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.close()
+
+
+class CountingModel(FakeModel):
+    """Fake Whisper that records the length of every input and fails on the lengths in `broken`."""
+    heard = []
+    broken = set()
+
+    def transcribe(self, media, n_threads=1, **params):
+        seconds = len(media) / SAMPLE_RATE
+        CountingModel.heard.append(seconds)
+        if seconds in CountingModel.broken:
+            raise RuntimeError("decoder error")
+        return super().transcribe(media, n_threads, **params)
+
+
+def _transcriber(tmp_path):
+    register_transcription_backend('counting', CountingModel)
+    return WhisperTranscriber(model_name="fake", load_model=False, backend='counting',
+                              cache=TranscriptCache(str(tmp_path / "transcripts")))
+
+
+def _chunks(*seconds):
+    # Different lengths, so every chunk has its own cache key
+    return [np.zeros(int(s * SAMPLE_RATE), dtype=np.float32) for s in seconds]
+
+
+def test_cache_hit_never_touches_the_model(tmp_path):
+    CountingModel.heard, CountingModel.broken = [], set()
+    audio = _chunks(4.0)[0]
+    first = _transcriber(tmp_path).transcribe(audio)
+
+    transcriber = _transcriber(tmp_path)
+    assert transcriber.transcribe(audio) == first
+    assert transcriber.model is None
+    assert CountingModel.heard == [4.0]
+
+
+def test_only_missed_and_failed_chunks_are_transcribed(tmp_path):
+    CountingModel.heard, CountingModel.broken = [], {5.0}
+    first = _transcriber(tmp_path).transcribe_batch(_chunks(4.0, 5.0), offsets=[0.0, 4.0])
+    assert CountingModel.heard == [4.0, 5.0]
+    assert first.to_dicts()[-1]['end'] == 4.0
+
+    CountingModel.heard, CountingModel.broken = [], set()
+    second = _transcriber(tmp_path).transcribe_batch(_chunks(4.0, 5.0, 6.0), offsets=[0.0, 4.0, 9.0])
+
+    # The cached chunk is served as-is; the failed one and the new one reach the model
+    assert CountingModel.heard == [5.0, 6.0]
+    assert second.to_dicts()[-1]['end'] == 15.0
@@ -0,0 +1,95 @@
+import pytest
+
+from autosub_mac.checkpoint import JobManifest, source_hash, translate_with_checkpoints
+
+
+def test_remove_keeps_files_it_did_not_write(tmp_path):
+    (tmp_path / "movie.en.srt").write_text("1\n00:00:00,000 --> 00:00:01,000\nHello\n\n")
+    (tmp_path / "chunk_notes.txt").write_text("notes")
+
+    manifest = JobManifest(str(tmp_path), {'video': "movie.mp4"})
+    manifest.set_offsets([0.0, 300.0])
+    manifest.save_transcript(0, [{'start': 0.0, 'end': 1.0, 'text': "Hello"}])
+    manifest.save_translation(0, 'zh-CN', [{'start': 0.0, 'end': 1.0, 'text': "你好"}], source_hash([]))
+    manifest.remove()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["chunk_notes.txt", "movie.en.srt"]
+
+
+def test_remove_deletes_its_own_directory(tmp_path):
+    manifest = JobManifest(str(tmp_path / ".movie.autosub"), {'video': "movie.mp4"})
+    manifest.save_transcript(0, [])
+    manifest.remove()
+
+    assert list(tmp_path.iterdir()) == []
+
+
+class RecordingTranslator:
+    """Prefixes every text with [fr]. Texts in `failing` come back untranslated; `max_texts` texts go in one round."""
+    target_lang = 'fr'
+
+    def __init__(self, max_texts=200, failing=(), crash_after=None):
+        self.calls = []
+        self.max_texts = max_texts
+        self.failing = set(failing)
+        self.crash_after = crash_after
+        self.failed = set()
+
+    def request_limits(self):
+        return 4500, self.max_texts
+
+    def translate_segments(self, segments):
+        from autosub_mac.segments import SegmentStore
+
+        if self.crash_after is not None and len(self.calls) >= self.crash_after:
+            raise KeyboardInterrupt
+        self.calls.append([s['text'] for s in segments])
+        store = SegmentStore.from_dicts(segments)
+        self.failed = {text for text in store.texts if text in self.failing}
+        return store.with_texts([text if text in self.failing else f"[fr] {text}" for text in store.texts])
+
+
+def _job(tmp_path, texts):
+    manifest = JobManifest(str(tmp_path), {'video': "movie.mp4"})
+    manifest.set_offsets([10.0 * i for i in range(len(texts))])
+    return manifest, [{'start': 10.0 * i + 1, 'end': 10.0 * i + 2, 'text': text} for i, text in enumerate(texts)]
+
+
+def test_stale_chunks_are_translated_together(tmp_path):
+    manifest, segments = _job(tmp_path, ["Hello", "Hello", "Bye"])
+    translator = RecordingTranslator()
+
+    first = translate_with_checkpoints(translator, manifest, segments)
+    assert [s['text'] for s in first] == ["[fr] Hello", "[fr] Hello", "[fr] Bye"]
+    assert translator.calls == [["Hello", "Hello", "Bye"]]
+
+    # Chunk 1 was transcribed again with other words, same segment count: only it is retranslated
+    segments[1] = {'start': 11.0, 'end': 12.0, 'text': "Welcome"}
+    second = translate_with_checkpoints(translator, manifest, segments)
+    assert [s['text'] for s in second] == ["[fr] Hello", "[fr] Welcome", "[fr] Bye"]
+    assert translator.calls[1:] == [["Welcome"]]
+
+
+def test_runs_are_saved_as_they_finish(tmp_path):
+    manifest, segments = _job(tmp_path, ["one", "two", "three", "four"])
+
+    # Two texts per round; killed while translating the second run
+    with pytest.raises(KeyboardInterrupt):
+        translate_with_checkpoints(RecordingTranslator(max_texts=2, crash_after=1), manifest, segments)
+
+    translator = RecordingTranslator(max_texts=2)
+    translated = translate_with_checkpoints(translator, manifest, segments)
+    assert [s['text'] for s in translated] == ["[fr] one", "[fr] two", "[fr] three", "[fr] four"]
+    assert translator.calls == [["three", "four"]]
+
+
+def test_chunks_with_failed_translations_are_retried(tmp_path):
+    manifest, segments = _job(tmp_path, ["one", "two"])
+
+    first = translate_with_checkpoints(RecordingTranslator(failing={"two"}), manifest, segments)
+    assert [s['text'] for s in first] == ["[fr] one", "two"]
+
+    translator = RecordingTranslator()
+    second = translate_with_checkpoints(translator, manifest, segments)
+    assert [s['text'] for s in second] == ["[fr] one", "[fr] two"]
+    assert translator.calls == [["two"]]
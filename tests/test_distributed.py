@@ -0,0 +1,120 @@
+import multiprocessing
+import sqlite3
+import threading
+import wave
+
+import pytest
+
+from autosub_mac.backends import register_transcription_backend
+from autosub_mac.distributed import QUEUE_FILE, WorkQueue, _wait_for_workers, run_worker
+from benchmarks.fakes import FakeModel
+
+
+def _write_wav(path, seconds):
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * int(16000 * seconds))
+
+
+def _worker(spool, worker_id, cache_dir):
+    register_transcription_backend('whispercpp', FakeModel)
+    run_worker(spool, worker_id, lease_sec=10.0, poll_interval=0.05, idle_timeout=1.0, cache_dir=cache_dir)
+
+
+def test_two_workers_share_a_job(tmp_path):
+    spool = tmp_path / "spool"
+    (spool / "job").mkdir(parents=True)
+    model = tmp_path / "model.bin"
+    model.write_bytes(b"")
+    # Different lengths, so every chunk has its own result (and transcript cache key)
+    durations = [4.0, 5.0, 6.0, 7.0, 8.0, 9.0]
+    for index, seconds in enumerate(durations):
+        _write_wav(spool / "job" / f"chunk_{index:03d}.wav", seconds)
+    queue = WorkQueue(str(spool))
+    queue.create_job('job', str(model), {}, [f"job/chunk_{i:03d}.wav" for i in range(len(durations))])
+
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=_worker, args=(str(spool), f"worker-{i}", str(tmp_path / f"cache-{i}")))
+               for i in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+
+    done, failed = queue.results('job')
+    queue.close()
+    assert failed == {}
+    assert sorted(done) == list(range(len(durations)))
+    for index, seconds in enumerate(durations):
+        assert done[index][-1]['end'] == seconds
+    # Every chunk was claimed exactly once
+    with sqlite3.connect(spool / QUEUE_FILE) as conn:
+        assert conn.execute("SELECT attempts FROM tasks").fetchall() == [(1,)] * len(durations)
+
+
+def test_expired_lease_is_requeued_until_attempts_run_out(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.create_job('job', "model.bin", {}, ["job/chunk_000.wav"], max_attempts=2)
+
+    # A worker that died right after claiming: its lease is already over
+    assert queue.claim("gone", lease_sec=-1.0) is not None
+    assert queue.requeue_expired('job') == 1
+    assert queue.counts('job') == {'queued': 1}
+
+    assert queue.claim("gone", lease_sec=-1.0) is not None
+    assert queue.requeue_expired('job') == 1
+    assert queue.counts('job') == {'failed': 1}
+    assert queue.results('job') == ({}, {0: 'lease expired'})
+    assert queue.claim("next", lease_sec=10.0) is None
+    queue.close()
+
+
+def test_live_lease_is_not_requeued(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.create_job('job', "model.bin", {}, ["job/chunk_000.wav"])
+    task = queue.claim("busy", lease_sec=60.0)
+
+    assert queue.requeue_expired('job') == 0
+    assert queue.heartbeat(task, lease_sec=60.0)
+    assert queue.counts('job') == {'leased': 1}
+    queue.close()
+
+
+def test_failed_task_is_marked_failed_at_max_attempts(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.create_job('job', "model.bin", {}, ["job/chunk_000.wav"], max_attempts=2)
+
+    queue.fail(queue.claim("w", lease_sec=10.0), "decoder crashed")
+    assert queue.counts('job') == {'queued': 1}
+    queue.fail(queue.claim("w", lease_sec=10.0), "decoder crashed again")
+
+    assert queue.counts('job') == {'failed': 1}
+    assert queue.results('job') == ({}, {0: "decoder crashed again"})
+    queue.close()
+
+
+def test_coordinator_warns_then_gives_up_without_workers(tmp_path, capsys):
+    queue = WorkQueue(str(tmp_path))
+    queue.create_job('job', "model.bin", {}, ["job/chunk_000.wav", "job/chunk_001.wav"])
+
+    with pytest.raises(TimeoutError, match="2/2 chunks left"):
+        _wait_for_workers(queue, 'job', 2, poll_interval=0.01, worker_timeout=0.2, warn_interval=0.05)
+    queue.close()
+
+    assert "No worker has taken a chunk" in capsys.readouterr().err
+
+
+def test_leased_chunk_keeps_the_coordinator_waiting(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.create_job('job', "model.bin", {}, ["job/chunk_000.wav"])
+    task = queue.claim("slow", lease_sec=60.0)
+    threading.Timer(0.3, queue.complete, args=(task, [])).start()
+
+    # Longer than the timeout, but a worker holds the chunk all along
+    _wait_for_workers(queue, 'job', 1, poll_interval=0.01, worker_timeout=0.1)
+
+    assert queue.results('job') == ({0: []}, {})
+    queue.close()
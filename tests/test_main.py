@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from autosub_mac import main
+from autosub_mac.main import (MIN_LANGUAGE_PROBABILITY, _output_path, apply_tuning, build_parser, pin_language,
+                              release_for_workers)
+
+
+class DetectingTranscriber:
+    def __init__(self, model_name="base", detected=("de", 0.9)):
+        self.model_name = model_name
+        self.params = {'language': "stale"}
+        self.detected = detected
+        self.samples = []
+
+    def detect_language(self, sample, offset_sec=0.0):
+        self.samples.append((len(sample), offset_sec))
+        if isinstance(self.detected, Exception):
+            raise self.detected
+        return self.detected
+
+    def release_model(self):
+        self.released = True
+
+
+def _args(*argv):
+    return build_parser().parse_args(["video.mp4", *argv])
+
+
+# Three 60s chunks: the middle one is sampled, from its centre
+CHUNKS = [np.zeros(60 * 16000, dtype=np.float32)] * 3
+
+
+@pytest.mark.parametrize("argv, model_name, detected, expected, detects", [
+    (["--source-lang", "ja"], "base", ("de", 0.9), "ja", False),
+    ([], "small.en-q5_1", ("de", 0.9), "en", False),
+    ([], "base", ("de", 0.9), "de", True),
+    ([], "base", ("de", MIN_LANGUAGE_PROBABILITY), "de", True),
+    # Too unsure, or no model to ask: Whisper detects the language per chunk
+    ([], "base", ("de", MIN_LANGUAGE_PROBABILITY - 0.01), None, True),
+    ([], "base", RuntimeError("no model"), None, True),
+])
+def test_pin_language(argv, model_name, detected, expected, detects):
+    transcriber = DetectingTranscriber(model_name, detected)
+
+    assert pin_language(_args(*argv), transcriber, CHUNKS) == expected
+    assert transcriber.params.get('language') == expected
+    assert transcriber.samples == ([(60 * 16000, 15.0)] if detects else [])
+
+
+def test_nothing_to_detect_from_leaves_the_language_open():
+    transcriber = DetectingTranscriber()
+
+    assert pin_language(_args(), transcriber, []) is None
+    assert 'language' not in transcriber.params
+
+
+@pytest.mark.parametrize("argv, inputs, released", [
+    (["--threads", "4"], CHUNKS, True),
+    (["--threads", "4"], CHUNKS[:1], False),
+    (["--threads", "1"], CHUNKS, False),
+])
+def test_model_is_released_only_for_worker_processes(argv, inputs, released):
+    transcriber = DetectingTranscriber()
+
+    release_for_workers(_args(*argv), transcriber, inputs)
+
+    assert getattr(transcriber, 'released', False) == released
+
+
+TUNED = {'workers': 4, 'n_threads': 2, 'segment_duration': 60}
+
+
+@pytest.mark.parametrize("argv, tuned, expected", [
+    ([], TUNED, (4, 2, 60)),
+    # A different worker count: the tuned thread and chunk sizes don't apply
+    (["--threads", "2"], TUNED, (2, None, 0)),
+    (["--threads", "2", "--segment-duration", "30"], TUNED, (2, None, 30)),
+    (["--threads", "4", "--n-threads", "1"], TUNED, (4, 1, 60)),
+    ([], None, (1, None, 0)),
+])
+def test_apply_tuning(monkeypatch, argv, tuned, expected):
+    monkeypatch.setattr(main, 'load_tuning', lambda model_name, cache_dir: tuned)
+    args = _args(*argv)
+
+    apply_tuning(args)
+
+    assert (args.threads, args.n_threads, args.segment_duration) == expected
+
+
+@pytest.mark.parametrize("argv, lang, target_langs, fmt, expected", [
+    ([], "en", ["en"], "srt", "video.en.srt"),
+    ([], None, ["en"], "vtt", "video.vtt"),
+    (["--output-dir", "subs"], "fr", ["en", "fr"], "json", "subs/video.fr.json"),
+    # --output: its extension gives way to the format's
+    (["--output", "out/talk.srt"], "en", ["en"], "vtt", "out/talk.vtt"),
+    (["--output", "out/talk.srt"], "fr", ["en", "fr"], "srt", "out/talk.fr.srt"),
+    (["--output", "out/talk.srt"], None, ["en"], "srt", "out/talk.source.srt"),
+    (["--output", "out/talk.srt"], None, [], "json", "out/talk.json"),
+])
+def test_output_path(argv, lang, target_langs, fmt, expected):
+    assert _output_path(_args(*argv), "video", lang, target_langs, fmt) == expected
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from autosub_mac import models
+from autosub_mac.models import available_models, ensure_model, resolve_model
+
+
+@pytest.mark.parametrize("name, quant, expected", [
+    ("base", None, "base"),
+    ("base", "q8_0", "base-q8_0"),
+    ("large", None, "large-v3"),
+    ("turbo", "q5_0", "large-v3-turbo-q5_0"),
+    ("small.en", "q5_1", "small.en-q5_1"),
+    ("small.en-q5_1", None, "small.en-q5_1"),
+    ("small.en-q5_1", "q5_1", "small.en-q5_1"),
+])
+def test_resolve_model(name, quant, expected):
+    assert resolve_model(name, quant) == expected
+    assert expected in available_models()
+
+
+@pytest.mark.parametrize("name, quant", [
+    ("huge", None),
+    ("large-v3.en", None),
+    ("large-v1", "q5_0"),
+    ("medium", "q5_1"),
+    ("small-q5_1", "q8_0"),
+])
+def test_resolve_model_rejects_unpublished_models(name, quant):
+    with pytest.raises(ValueError):
+        resolve_model(name, quant)
+
+
+def test_resolve_model_keeps_model_files(tmp_path):
+    model = tmp_path / "custom.bin"
+    model.write_bytes(b"")
+
+    assert resolve_model(str(model)) == str(model)
+    with pytest.raises(ValueError):
+        resolve_model(str(model), "q8_0")
+
+
+def test_pywhispercpp_model_and_coreml_encoder_are_linked(tmp_path, monkeypatch):
+    legacy = tmp_path / "pywhispercpp"
+    (legacy / "ggml-base.en-encoder.mlmodelc").mkdir(parents=True)
+    (legacy / "ggml-base.en-q5_1.bin").write_bytes(b"weights")
+    monkeypatch.setattr(models, 'pywhispercpp_models_dir', lambda: str(legacy))
+    monkeypatch.setattr(models, '_published_sha256', lambda name: None)
+    monkeypatch.setattr(models, '_download', lambda name, path: pytest.fail("downloaded an existing model"))
+
+    path = ensure_model("base.en-q5_1", str(tmp_path / "models"))
+
+    assert open(path, 'rb').read() == b"weights"
+    encoder = tmp_path / "models" / "ggml-base.en-encoder.mlmodelc"
+    assert encoder.is_dir() and os.path.realpath(encoder) == str(legacy / "ggml-base.en-encoder.mlmodelc")
+
+
+def test_unfetchable_checksum_is_only_looked_up_once(tmp_path, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(models, '_published_sha256', lambda name: lookups.append(name))
+    path = models.model_path("base", str(tmp_path))
+    with open(path, 'wb') as f:
+        f.write(b"weights")
+
+    assert ensure_model("base", str(tmp_path)) == path
+    assert ensure_model("base", str(tmp_path)) == path
+    assert lookups == ["base"]
+
+    # A forced re-check asks again, and records the published checksum once it's reachable
+    monkeypatch.setattr(models, '_published_sha256', lambda name: models._sha256_file(path))
+    assert ensure_model("base", str(tmp_path), rehash=True) == path
+    with open(models._sidecar_path(path), encoding='utf-8') as f:
+        assert 'unverified' not in f.read()
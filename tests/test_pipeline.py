@@ -0,0 +1,24 @@
+from autosub_mac.pipeline import expand_inputs, is_batch_input, output_collisions
+
+
+def test_file_name_with_glob_characters_is_a_single_input(tmp_path):
+    video = tmp_path / "Talk [1080p].mp4"
+    video.write_bytes(b"")
+
+    assert not is_batch_input(str(video))
+
+
+def test_directory_and_pattern_are_batch_inputs(tmp_path):
+    for name in ("a.mp4", "b.mkv", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+
+    assert is_batch_input(str(tmp_path))
+    assert is_batch_input(str(tmp_path / "*.mp4"))
+    assert expand_inputs(str(tmp_path)) == [str(tmp_path / "a.mp4"), str(tmp_path / "b.mkv")]
+    assert expand_inputs(str(tmp_path / "*.mp4")) == [str(tmp_path / "a.mp4")]
+
+
+def test_files_with_the_same_name_collide(tmp_path):
+    paths = [str(tmp_path / "a" / "intro.mp4"), str(tmp_path / "b" / "Intro.mkv"), str(tmp_path / "a" / "outro.mp4")]
+
+    assert output_collisions(paths) == {'intro': paths[:2]}
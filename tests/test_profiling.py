@@ -0,0 +1,39 @@
+import threading
+
+from autosub_mac.backends import register_translation_provider
+from autosub_mac.main import build_parser, translate_all
+from autosub_mac.metrics import metrics
+
+
+class OverlappingTranslator:
+    """Holds every language's translate stage open until two of them run at once."""
+    arrived = threading.Barrier(2, timeout=10)
+
+    def __init__(self, source, target, **kwargs):
+        self.target = target
+
+    def translate(self, text):
+        self.arrived.wait()
+        return f"[{self.target}] {text}"
+
+
+def test_profile_with_two_target_languages(tmp_path):
+    register_translation_provider('overlapping', OverlappingTranslator)
+    args = build_parser().parse_args([
+        "video.mp4", "--lang", "fr,de", "--provider", "overlapping", "--no-cache", "--no-batch-translate",
+        "--profile", str(tmp_path / "profile"),
+    ])
+    metrics.reset()
+    metrics.enable_profiling(args.profile)
+    try:
+        outputs = translate_all(args, [{'start': 0.0, 'end': 1.0, 'text': "hello"}])
+    finally:
+        metrics.profile_dir = None
+
+    assert {lang: store.to_dicts() for lang, store in outputs.items()} == {
+        'fr': [{'start': 0.0, 'end': 1.0, 'text': "[fr] hello"}],
+        'de': [{'start': 0.0, 'end': 1.0, 'text': "[de] hello"}],
+    }
+    assert {s['stage'] for s in metrics.report()['stages']} == {'translate:fr', 'translate:de'}
+    # Only one of the overlapping stages is profiled
+    assert len(list((tmp_path / "profile").glob("translate_*.prof"))) == 1
@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+
+from autosub_mac import progress as progress_module
+from autosub_mac.progress import ProgressReporter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(progress_module.time, 'time', clock)
+    return clock
+
+
+def _events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_rate_and_eta(clock):
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+
+    reporter.start_stage("transcribe", total=12, unit="chunk")
+    clock.now += 10
+    reporter.advance("transcribe", 3)
+    clock.now += 30
+    reporter.advance("transcribe", 12)
+    reporter.end_stage("transcribe")
+
+    start, first, last, end = _events(stream)
+    assert start == {'event': "stage_start", 'stage': "transcribe", 'total': 12, 'unit': "chunk", 'ts': 1000.0}
+    # 3 chunks in 10s: 0.3 per second, 9 to go
+    assert (first['rate'], first['eta_sec'], first['unit']) == (0.3, 30.0, "chunk")
+    assert (last['rate'], last['eta_sec']) == (0.3, 0.0)
+    assert end['elapsed_sec'] == 40.0
+
+
+def test_no_rate_before_time_passes_and_no_eta_without_total(clock):
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+
+    reporter.start_stage("live", unit="segment")
+    reporter.advance("live", 1)
+    clock.now += 4
+    reporter.advance("live", 2)
+
+    _, instant, later = _events(stream)
+    assert (instant['rate'], instant['eta_sec']) == (None, None)
+    assert (later['rate'], later['eta_sec'], later['total']) == (0.5, None, None)
+
+
+def test_total_given_with_the_update_overrides_the_stage_total(clock):
+    stream = io.StringIO()
+    reporter = ProgressReporter(stream)
+
+    reporter.start_stage("translate", total=100)
+    clock.now += 5
+    reporter.advance("translate", 10, total=20)
+
+    assert _events(stream)[-1]['eta_sec'] == 5.0
+
+
+def test_disabled_reporter_writes_nothing():
+    reporter = ProgressReporter()
+
+    reporter.start_stage("transcribe", total=3)
+    reporter.advance("transcribe", 1)
+    reporter.end_stage("transcribe")
+
+    assert not reporter.enabled
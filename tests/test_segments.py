@@ -0,0 +1,32 @@
+import io
+
+import pytest
+
+from autosub_mac.segments import SegmentStore, format_timestamps
+from autosub_mac.utils import SubtitleStreamWriter, format_timestamp
+
+# Zero, sub-millisecond values that must truncate rather than round, and an hour or more
+EDGE_TIMES = [0.0, 0.0004, 0.0009999, 0.001, 1.9999, 12.345, 59.99999, 60.0, 3599.9995, 3600.0, 3661.5, 36000.123]
+
+
+def _segments():
+    return [{'start': t, 'end': t + 0.0005, 'text': f" line {i} "} for i, t in enumerate(EDGE_TIMES)]
+
+
+def _stream(fmt):
+    buffer = io.StringIO()
+    writer = SubtitleStreamWriter(buffer, fmt)
+    for segment in _segments():
+        writer.write(segment)
+    return buffer.getvalue()
+
+
+def test_format_timestamps_matches_format_timestamp():
+    assert format_timestamps(EDGE_TIMES) == [format_timestamp(t) for t in EDGE_TIMES]
+
+
+@pytest.mark.parametrize("fmt", ["srt", "vtt"])
+def test_bulk_writer_matches_cue_by_cue_writer(fmt):
+    store = SegmentStore.from_dicts(_segments())
+
+    assert (store.to_srt() if fmt == "srt" else store.to_vtt()) == _stream(fmt)
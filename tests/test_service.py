@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from autosub_mac.service import _job_settings, job_args
+
+
+def _spec(tmp_path, **options):
+    return {'video_path': str(tmp_path / "talk.mp4"), 'options': options}
+
+
+def test_option_values_are_converted_like_the_command_line(tmp_path):
+    args = job_args(_spec(tmp_path, translate_concurrency="4", translate_rate=2, no_cache=True,
+                          cache_dir=str(tmp_path), output_dir=str(tmp_path)))
+
+    assert args.translate_concurrency == 4
+    assert args.translate_rate == 2.0
+    assert args.no_cache is True
+
+
+@pytest.mark.parametrize("options", [
+    {'translate_concurrency': "four"},
+    {'translate_concurrency': [4]},
+    {'provider': "carrier-pigeon"},
+    {'no_cache': "yes"},
+    {'threads': True},
+    {'colour': "blue"},
+    {'server': "http://elsewhere"},
+])
+def test_invalid_options_raise_value_error(tmp_path, options):
+    with pytest.raises(ValueError):
+        job_args(_spec(tmp_path, **options))
+
+
+class _Transcriber:
+    n_threads = None
+    cache = "resident cache"
+
+
+def test_job_settings_apply_while_the_lock_is_held():
+    transcriber, lock = _Transcriber(), threading.Lock()
+    args = type('Args', (), {'n_threads': 3, 'no_cache': True})()
+
+    with _job_settings(transcriber, lock, args):
+        assert lock.locked()
+        assert (transcriber.n_threads, transcriber.cache) == (3, None)
+    assert not lock.locked()
+    assert (transcriber.n_threads, transcriber.cache) == (None, "resident cache")
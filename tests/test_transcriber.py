@@ -0,0 +1,132 @@
+import time
+
+import numpy as np
+import pytest
+
+from autosub_mac.backends import register_transcription_backend
+from autosub_mac.main import build_parser, transcribe_inputs
+from autosub_mac.transcriber import WhisperTranscriber, merge_chunks, stitch_segments
+from benchmarks.fakes import SAMPLE_RATE, FakeModel, FakeSegment
+
+
+def test_stitch_cuts_the_overlap_at_its_midpoint():
+    # 10s chunks with 2s of overlap: chunk 1 starts at 8s, the cut is at 9s
+    chunk0 = [
+        {'start': 0.0, 'end': 4.0, 'text': "one"},
+        {'start': 4.0, 'end': 8.0, 'text': "two"},
+        {'start': 8.5, 'end': 9.8, 'text': "three"},
+    ]
+    chunk1 = [
+        {'start': 8.0, 'end': 8.6, 'text': "wo"},
+        {'start': 8.5, 'end': 9.8, 'text': "three"},
+        {'start': 9.8, 'end': 12.0, 'text': "four"},
+    ]
+
+    merged = stitch_segments([(0.0, chunk0), (8.0, chunk1)], overlap_seconds=2.0)
+
+    assert [s['text'] for s in merged] == ["one", "two", "three", "four"]
+
+
+def test_stitch_keeps_a_segment_repeated_across_the_cut_once():
+    # Both chunks heard "three", centred just before and just after the cut at 9s
+    chunk0 = [{'start': 4.0, 'end': 7.6, 'text': "two"}, {'start': 7.6, 'end': 9.8, 'text': " three"}]
+    chunk1 = [{'start': 8.4, 'end': 9.8, 'text': "three "}, {'start': 9.8, 'end': 12.0, 'text': "four"}]
+
+    merged = stitch_segments([(0.0, chunk0), (8.0, chunk1)], overlap_seconds=2.0)
+
+    assert [s['text'] for s in merged] == ["two", " three", "four"]
+
+
+def test_merge_chunks_shifts_and_stitches():
+    results = {
+        0: [{'start': 0.0, 'end': 4.0, 'text': "one"}, {'start': 8.5, 'end': 9.8, 'text': "three"}],
+        1: [{'start': 0.5, 'end': 1.8, 'text': "three"}, {'start': 1.8, 'end': 4.0, 'text': "four"}],
+    }
+
+    assert merge_chunks(results, [0.0, 8.0]).to_dicts() == [
+        {'start': 0.0, 'end': 4.0, 'text': "one"},
+        {'start': 8.5, 'end': 9.8, 'text': "three"},
+        {'start': 8.5, 'end': 9.8, 'text': "three"},
+        {'start': 9.8, 'end': 12.0, 'text': "four"},
+    ]
+    assert [s['text'] for s in merge_chunks(results, [0.0, 8.0], overlap_seconds=2.0).to_dicts()] == \
+        ["one", "three", "four"]
+
+
+def test_vad_chunks_are_not_stitched_as_overlapping():
+    register_transcription_backend('fake', FakeModel)
+    args = build_parser().parse_args(["video.mp4", "--vad", "--in-memory", "--overlap", "4", "--segment-duration", "10"])
+    args.threads = 1
+    transcriber = WhisperTranscriber(model_name="fake", load_model=False, backend='fake')
+    # Two 6s speech chunks with a 1s silence between them; the fake model says one segment every 3s
+    chunks = [np.zeros(6 * SAMPLE_RATE, dtype=np.float32)] * 2
+
+    segments = transcribe_inputs(args, transcriber, chunks, [0.0, 7.0])
+
+    assert [(s['start'], s['end']) for s in segments.to_dicts()] == [(0.0, 3.0), (3.0, 6.0), (7.0, 10.0), (10.0, 13.0)]
+
+
+class FirstSecondModel(FakeModel):
+    """Only ever hears the first second of its window, however long the window is."""
+    durations = []
+
+    def transcribe(self, media, n_threads=1, **params):
+        self.durations.append(len(media) / SAMPLE_RATE)
+        return [FakeSegment(0, 100, " word")]
+
+
+class SlowSilentModel(FakeModel):
+    """Takes 50ms per call, longer than the 25ms of audio between two decodes, and hears nothing."""
+    calls = 0
+
+    def transcribe(self, media, n_threads=1, **params):
+        SlowSilentModel.calls += 1
+        time.sleep(0.05)
+        return []
+
+
+def _stream(model_cls, seconds, block_sec, **kwargs):
+    register_transcription_backend('fake-stream', model_cls)
+    transcriber = WhisperTranscriber(model_name="fake", load_model=False, backend='fake-stream')
+    blocks = [np.zeros(int(block_sec * SAMPLE_RATE), dtype=np.float32)] * int(seconds / block_sec)
+    return [(s['start'], s['end']) for s in transcriber.transcribe_stream(blocks, **kwargs)]
+
+
+def test_stream_commits_each_segment_once_in_absolute_time():
+    # A segment is final once the next has started or it ended latency/2 before the audio did
+    assert _stream(FakeModel, 10.0, 0.5, latency_sec=4.0, window_sec=30.0) == \
+        [(0.0, 3.0), (3.0, 6.0), (6.0, 9.0), (9.0, 10.0)]
+
+
+def test_stream_window_never_outgrows_window_sec():
+    FirstSecondModel.durations = []
+
+    segments = _stream(FirstSecondModel, 60.0, 0.5, latency_sec=4.0, window_sec=10.0)
+
+    # Decoded every 2s (latency/2); a full window is forced out down to its last 2s
+    assert max(FirstSecondModel.durations) <= 10.0 + 2.0
+    assert segments == sorted(segments) and segments[-1][0] > 50.0
+
+
+def test_slow_decoding_decodes_less_often_instead_of_falling_behind():
+    SlowSilentModel.calls = 0
+
+    _stream(SlowSilentModel, 1.0, 0.0125, latency_sec=0.05, window_sec=30.0)
+
+    # Without backing off, 1s would be decoded 40 times, every 25ms of audio
+    assert SlowSilentModel.calls <= 21
+
+
+class UnloadableModel:
+    def __init__(self, model, **kwargs):
+        raise RuntimeError("model file is corrupt")
+
+
+@pytest.mark.parametrize("executor", ["sequential", "process"])
+def test_model_that_cannot_load_fails_the_run(executor):
+    register_transcription_backend('unloadable', UnloadableModel)
+    transcriber = WhisperTranscriber(model_name="fake", load_model=False, backend='unloadable')
+    chunks = [np.zeros(SAMPLE_RATE, dtype=np.float32)] * 2
+
+    with pytest.raises(RuntimeError):
+        transcriber.transcribe_batch(chunks, max_workers=2, executor=executor, offsets=[0.0, 1.0])
@@ -0,0 +1,88 @@
+import pytest
+
+from autosub_mac import translator as translator_module
+from autosub_mac.backends import register_translation_provider
+from autosub_mac.translator import MAX_BATCH_TEXTS, SubtitleTranslator, same_language
+
+
+class LineProvider:
+    """Translates each line of a request; `reshape` may merge or split the lines of packed requests."""
+    reshape = None
+
+    def __init__(self, source, target, **kwargs):
+        self.requests = []
+
+    def translate(self, text):
+        self.requests.append(text)
+        lines = [f"<{line}>" for line in text.split("\n")]
+        if len(lines) > 1 and self.reshape:
+            lines = self.reshape(lines)
+        return "\n".join(lines)
+
+
+class MergingProvider(LineProvider):
+    reshape = staticmethod(lambda lines: [lines[0] + " " + lines[1]] + lines[2:])
+
+
+class SplittingProvider(LineProvider):
+    reshape = staticmethod(lambda lines: [part for line in lines for part in line.split(" ", 1)])
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(translator_module, '_sleep', lambda seconds: None)
+
+
+def _translator(provider_cls):
+    register_translation_provider('lines', provider_cls)
+    return SubtitleTranslator(target_lang='fr', provider='lines')
+
+
+def _segments(texts):
+    return [{'start': float(i), 'end': float(i) + 1, 'text': text} for i, text in enumerate(texts)]
+
+
+def test_segments_are_packed_into_one_request():
+    translator = _translator(LineProvider)
+
+    store = translator.translate_segments(_segments(["good morning", "good night", "good morning"]))
+
+    assert store.texts == ["<good morning>", "<good night>", "<good morning>"]
+    assert translator.translator.requests == ["good morning\ngood night"]
+
+
+@pytest.mark.parametrize("provider_cls", [MergingProvider, SplittingProvider])
+def test_misaligned_batch_falls_back_to_one_request_per_segment(provider_cls):
+    translator = _translator(provider_cls)
+
+    store = translator.translate_segments(_segments(["good morning", "good night", "see you"]))
+
+    assert store.texts == ["<good morning>", "<good night>", "<see you>"]
+    assert translator.translator.requests == ["good morning\ngood night\nsee you",
+                                              "good morning", "good night", "see you"]
+
+
+def test_pack_batches_respects_the_limits_and_skips_empty_texts(monkeypatch):
+    translator = _translator(LineProvider)
+    monkeypatch.setitem(translator_module.MAX_BATCH_CHARS, 'lines', 12)
+    monkeypatch.setitem(MAX_BATCH_TEXTS, 'lines', 2)
+
+    # 'abcd' and 'efgh' take 5 characters each with their delimiter
+    batches = translator._pack_batches(["abcd", "  ", "efgh", "ijkl", "m", "n", "o"])
+
+    assert batches == [[0, 2], [3, 4], [5, 6]]
+
+
+@pytest.mark.parametrize("source, target, same", [
+    ("en", "en", True),
+    ("en", "en-US", True),
+    ("EN", "en-gb", True),
+    ("ja", "en", False),
+    ("zh", "zh", True),
+    ("zh", "zh-CN", False),
+    ("zh", "zh-TW", False),
+    ("zh-CN", "zh-cn", True),
+    ("zh-CN", "zh-TW", False),
+])
+def test_same_language(source, target, same):
+    assert same_language(source, target) is same
@@ -0,0 +1,59 @@
+from autosub_mac.webjobs import SubtitlePager, WorkDirPool
+
+
+def _job(pool, job_id, size):
+    path = pool.create(job_id)
+    with open(f"{path}/output.srt", 'wb') as f:
+        f.write(b"x" * size)
+
+
+def test_evict_stops_once_under_max_bytes(tmp_path):
+    pool = WorkDirPool(str(tmp_path), max_bytes=250)
+    for job_id in ("a", "b", "c"):
+        _job(pool, job_id, 100)
+    pool.release("a")
+    pool.release("b")
+
+    # 300 bytes: dropping the oldest finished job is enough
+    assert not pool.exists("a")
+    assert pool.exists("b") and pool.exists("c")
+    assert pool.evict() == []
+
+
+def test_evict_never_removes_running_jobs(tmp_path):
+    pool = WorkDirPool(str(tmp_path), max_bytes=0, max_dirs=0)
+    _job(pool, "running", 100)
+    _job(pool, "done", 100)
+    pool.release("done")
+
+    assert not pool.exists("done")
+    assert pool.evict() == []
+    assert pool.exists("running")
+
+
+def _cues(count):
+    return [f"{i}\n00:00:{i:02d},000 --> 00:00:{i:02d},500\nLine {i}\n\n" for i in range(1, count + 1)]
+
+
+def test_pager_splits_srt_cues_into_pages(tmp_path):
+    path = tmp_path / "movie.srt"
+    path.write_text("".join(_cues(5)), encoding='utf-8')
+
+    pager = SubtitlePager(str(path), page_size=2)
+
+    assert (len(pager.offsets), pager.pages) == (5, 3)
+    assert pager.page(0) == "".join(_cues(5)[:2])
+    assert pager.page(2) == _cues(5)[4]
+    assert pager.page(3) == ""
+
+
+def test_pager_skips_the_vtt_header(tmp_path):
+    cues = [f"00:00:{i:02d}.000 --> 00:00:{i:02d}.500\nLine {i}\n\n" for i in range(1, 5)]
+    path = tmp_path / "movie.vtt"
+    path.write_text("WEBVTT\nKind: captions\n\n" + "".join(cues), encoding='utf-8')
+
+    pager = SubtitlePager(str(path), page_size=2)
+
+    assert (len(pager.offsets), pager.pages) == (4, 2)
+    assert pager.page(0) == "".join(cues[:2])
+    assert pager.page(1) == "".join(cues[2:])